@@ -0,0 +1,28 @@
+"""add created_at indexes to users and client_applications
+
+Revision ID: 09d43442f929
+Revises: 6c7107f07ed2
+Create Date: 2026-10-19 02:03:41.284141
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migrations import add_created_at_indexes
+
+
+# revision identifiers, used by Alembic.
+revision = '09d43442f929'
+down_revision = '6c7107f07ed2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    add_created_at_indexes(op.get_bind())
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    for table, name in (("users", "ix_users_created_at"), ("client_applications", "ix_client_applications_created_at")):
+        if any(index["name"] == name for index in inspector.get_indexes(table)):
+            op.drop_index(name, table_name=table)
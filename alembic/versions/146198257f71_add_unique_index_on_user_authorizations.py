@@ -0,0 +1,28 @@
+"""add unique index on user_authorizations
+
+Revision ID: 146198257f71
+Revises: 
+Create Date: 2026-10-19 01:36:13.275896
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migrations import add_user_authorization_unique_index
+
+
+# revision identifiers, used by Alembic.
+revision = '146198257f71'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 先合并重复的 (user_id, client_id) 记录，再建唯一索引
+    add_user_authorization_unique_index(op.get_bind())
+
+
+def downgrade() -> None:
+    indexes = sa.inspect(op.get_bind()).get_indexes("user_authorizations")
+    if any(index["name"] == "unique_user_client_authorization" for index in indexes):
+        op.drop_index("unique_user_client_authorization", table_name="user_authorizations")
\ No newline at end of file
@@ -0,0 +1,29 @@
+"""add claims columns to client_applications
+
+Revision ID: 4b2b7f0a412c
+Revises: 146198257f71
+Create Date: 2026-10-19 01:39:05.861064
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migrations import add_client_claims_columns
+
+
+# revision identifiers, used by Alembic.
+revision = '4b2b7f0a412c'
+down_revision = '146198257f71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    add_client_claims_columns(op.get_bind())
+
+
+def downgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("client_applications")}
+    with op.batch_alter_table("client_applications") as batch_op:
+        for column in ("claims_max_staleness_seconds", "embed_claims_in_token"):
+            if column in columns:
+                batch_op.drop_column(column)
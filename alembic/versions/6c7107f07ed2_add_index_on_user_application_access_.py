@@ -0,0 +1,27 @@
+"""add index on user_application_access expires_at
+
+Revision ID: 6c7107f07ed2
+Revises: c13f0cd9ea62
+Create Date: 2026-10-19 01:55:25.052932
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migrations import add_access_expiry_index
+
+
+# revision identifiers, used by Alembic.
+revision = '6c7107f07ed2'
+down_revision = 'c13f0cd9ea62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    add_access_expiry_index(op.get_bind())
+
+
+def downgrade() -> None:
+    indexes = sa.inspect(op.get_bind()).get_indexes("user_application_access")
+    if any(index["name"] == "ix_user_application_access_expires_at" for index in indexes):
+        op.drop_index("ix_user_application_access_expires_at", table_name="user_application_access")
@@ -0,0 +1,41 @@
+"""add user search columns and full-text index
+
+Revision ID: c13f0cd9ea62
+Revises: 4b2b7f0a412c
+Create Date: 2026-10-19 01:45:02.141242
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.migrations import add_user_search_columns
+from app.models import USER_SEARCH_FIELDS
+
+
+# revision identifiers, used by Alembic.
+revision = 'c13f0cd9ea62'
+down_revision = '4b2b7f0a412c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 加列并回填，再建全文索引（SQLite: users_fts + 触发器，PostgreSQL: pg_trgm）
+    add_user_search_columns(op.get_bind())
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for trigger in ("users_fts_ai", "users_fts_ad", "users_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS users_fts")
+    elif bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_users_search_trgm")
+
+    columns = {column["name"] for column in sa.inspect(bind).get_columns("users")}
+    for field in USER_SEARCH_FIELDS:
+        op.execute(f"DROP INDEX IF EXISTS ix_users_{field}_lower")
+    with op.batch_alter_table("users") as batch_op:
+        for field in USER_SEARCH_FIELDS:
+            if f"{field}_lower" in columns:
+                batch_op.drop_column(f"{field}_lower")
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from app.core.database import get_db
 from app.core.security import security
+from app.core.login_throttle import login_throttle
+from app.core.metrics import TOKENS_ISSUED
+from app.core.serialization import FastJSONResponse, client_to_dict, model_json_response, stream_json_array
 from app.services import UserService, ClientService
 from app.models import ClientApplication
 from app.schemas import (
@@ -60,30 +65,33 @@ async def login(
     db: Session = Depends(get_db)
 ):
     """用户登录"""
-    user = UserService.authenticate_user(db, login_data.username, login_data.password)
-    if not user:
+    client_ip = request.client.host if request.client else None
+    # 在密码哈希和数据库查询之前检查失败次数
+    login_throttle.check(login_data.username, client_ip)
+    
+    from app.api.v1.dashboard import log_login
+    user = UserService.get_user_by_login(db, login_data.username)
+    if not user or not UserService.verify_user_password(db, user, login_data.password):
+        login_throttle.record_failure(login_data.username, client_ip)
         # 记录失败的登录尝试 - 归属到LAAA Dashboard应用
-        from app.api.v1.dashboard import log_login
-        from app.models import User
-        failed_user = db.query(User).filter(
-            (User.username == login_data.username) | (User.email == login_data.username)
-        ).first()
-        if failed_user:
-            await log_login(db, failed_user, request, success=False, failure_reason="密码错误")
+        if user:
+            await log_login(db, user, request, success=False, failure_reason="密码错误")
         
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码不正确"
         )
     
+    login_throttle.record_success(login_data.username)
+    
     # 记录成功的登录
-    from app.api.v1.dashboard import log_login
     await log_login(db, user, request, success=True)
     
     # 生成token
     from app.services import OAuth2Service
     access_token = security.create_access_token(data={"sub": user.id})
     refresh_token = security.create_refresh_token(data={"sub": user.id})
+    TOKENS_ISSUED.inc("password")
     
     return TokenResponse(
         access_token=access_token,
@@ -102,24 +110,35 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
 @router.get("/users/me", response_model=UserResponse)
 async def get_current_user_info(current_user = Depends(get_current_user)):
     """获取当前用户信息"""
-    return current_user
+    return model_json_response(UserResponse, current_user)
 
 
 @router.get("/users", response_model=List[UserResponse])
 async def list_users(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    is_active: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取所有用户列表（仅管理员）"""
+    """获取用户列表（仅管理员），结果以流式JSON数组分批输出"""
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="只有管理员才能访问用户列表"
         )
     
-    from app.models import User
-    users = db.query(User).all()
-    return users
+    stmt = UserService.build_user_list_query(
+        skip, limit,
+        is_active=is_active,
+        is_admin=is_admin,
+        created_after=created_after,
+        created_before=created_before
+    )
+    return StreamingResponse(stream_json_array(stmt), media_type="application/json")
 
 
 @router.get("/users/{user_id}", response_model=UserResponse)
@@ -201,77 +220,37 @@ async def create_client_application(
     db: Session = Depends(get_db)
 ):
     """创建OAuth客户端应用"""
-    import json
     created_client = ClientService.create_client(db, client, current_user.id)
-    
-    # 处理序列化问题
-    client_data = created_client.__dict__.copy()
-    
-    # 处理redirect_uris和contacts字段
-    if created_client.redirect_uris:
-        try:
-            client_data['redirect_uris'] = json.loads(created_client.redirect_uris)
-        except (json.JSONDecodeError, TypeError):
-            client_data['redirect_uris'] = []
-    else:
-        client_data['redirect_uris'] = []
-        
-    if created_client.contacts:
-        try:
-            client_data['contacts'] = json.loads(created_client.contacts)
-        except (json.JSONDecodeError, TypeError):
-            client_data['contacts'] = []
-    else:
-        client_data['contacts'] = []
-    
-    # 移除SQLAlchemy内部属性
-    client_data.pop('_sa_instance_state', None)
-    
-    return client_data
+    return FastJSONResponse(client_to_dict(created_client))
 
 
 @router.get("/clients", response_model=List[ClientApplicationResponse])
 async def list_all_clients(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    is_active: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取所有客户端应用列表（仅管理员）"""
+    """获取客户端应用列表（仅管理员），结果以流式JSON数组分批输出"""
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="只有管理员才能访问所有应用列表"
         )
     
-    import json
-    from app.models import ClientApplication
-    clients = db.query(ClientApplication).all()
-    
-    # 处理序列化问题
-    result = []
-    for client in clients:
-        client_data = client.__dict__.copy()
-        # 处理redirect_uris和contacts字段
-        if client.redirect_uris:
-            try:
-                client_data['redirect_uris'] = json.loads(client.redirect_uris)
-            except (json.JSONDecodeError, TypeError):
-                client_data['redirect_uris'] = []
-        else:
-            client_data['redirect_uris'] = []
-            
-        if client.contacts:
-            try:
-                client_data['contacts'] = json.loads(client.contacts)
-            except (json.JSONDecodeError, TypeError):
-                client_data['contacts'] = []
-        else:
-            client_data['contacts'] = []
-        
-        # 移除SQLAlchemy内部属性
-        client_data.pop('_sa_instance_state', None)
-        result.append(client_data)
-    
-    return result
+    stmt = ClientService.build_client_list_query(
+        skip, limit,
+        is_active=is_active,
+        created_after=created_after,
+        created_before=created_before
+    )
+    return StreamingResponse(
+        stream_json_array(stmt, ClientService.client_row_to_dict),
+        media_type="application/json"
+    )
 
 
 @router.put("/clients/{client_id}", response_model=ClientApplicationResponse)
@@ -293,7 +272,8 @@ async def update_client(
             detail="只能修改自己的应用"
         )
     
-    return ClientService.update_client(db, client_id, client_update)
+    updated_client = ClientService.update_client(db, client_id, client_update)
+    return FastJSONResponse(client_to_dict(updated_client))
 
 
 @router.delete("/clients/{client_id}")
@@ -327,38 +307,7 @@ async def list_my_client_applications(
     db: Session = Depends(get_db)
 ):
     """获取当前用户的客户端应用列表"""
-    import json
-    from app.models import ClientApplication
-    clients = db.query(ClientApplication).filter(
-        ClientApplication.owner_id == current_user.id
-    ).all()
-    
-    # 处理序列化问题：将JSON字符串转换为列表
-    result = []
-    for client in clients:
-        client_data = client.__dict__.copy()
-        # 处理redirect_uris和contacts字段
-        if client.redirect_uris:
-            try:
-                client_data['redirect_uris'] = json.loads(client.redirect_uris)
-            except (json.JSONDecodeError, TypeError):
-                client_data['redirect_uris'] = []
-        else:
-            client_data['redirect_uris'] = []
-            
-        if client.contacts:
-            try:
-                client_data['contacts'] = json.loads(client.contacts)
-            except (json.JSONDecodeError, TypeError):
-                client_data['contacts'] = []
-        else:
-            client_data['contacts'] = []
-        
-        # 移除SQLAlchemy内部属性
-        client_data.pop('_sa_instance_state', None)
-        result.append(client_data)
-    
-    return result
+    return FastJSONResponse(ClientService.list_clients(db, owner_id=current_user.id))
 
 
 @router.get("/clients/{client_id}", response_model=ClientApplicationPublic)
@@ -386,23 +335,23 @@ async def get_user_permissions(
     
     import json
     from app.models import UserApplicationAccess, ClientApplication
+    from app.services.permission_management_service import unexpired_access
     
-    permissions = db.query(UserApplicationAccess).filter(
-        UserApplicationAccess.user_id == user_id
+    # 关联的应用名称随权限一起查出，避免逐条查询应用
+    permissions = db.query(UserApplicationAccess, ClientApplication.client_name).outerjoin(
+        ClientApplication, ClientApplication.client_id == UserApplicationAccess.client_id
+    ).filter(
+        UserApplicationAccess.user_id == user_id,
+        unexpired_access()
     ).all()
     
     result = []
-    for perm in permissions:
-        # 获取关联的应用信息
-        client = db.query(ClientApplication).filter(
-            ClientApplication.client_id == perm.client_id
-        ).first()
-        
+    for perm, client_name in permissions:
         perm_data = {
             "id": perm.id,
             "user_id": perm.user_id,
             "client_id": perm.client_id,
-            "client_name": client.client_name if client else "未知应用",
+            "client_name": client_name or "未知应用",
             "access_type": perm.access_type,
             "custom_scopes": json.loads(perm.custom_scopes) if perm.custom_scopes else [],
             "expires_at": perm.expires_at,
@@ -495,6 +444,9 @@ async def grant_user_permission(
         db.refresh(new_permission)
         result = new_permission
     
+    from app.services.access_expiry_service import access_expiry_scheduler
+    access_expiry_scheduler.schedule(result.user_id, result.client_id, result.expires_at)
+    
     return {
         "message": "权限设置成功",
         "permission_id": result.id,
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional, Dict, Any
@@ -6,8 +7,11 @@ from datetime import datetime, timedelta
 from app.core.database import get_db
 from app.core.security import security
 from app.services import UserService, ClientService
+from app.services.userinfo_cache import userinfo_cache
+from app.services.sso_session import sso_sessions
+from app.core.serialization import FastJSONResponse
 from app.models import User, ClientApplication, LoginLog, UserApplicationAccess, ApplicationPermissionGroup
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 import json
 
 router = APIRouter(prefix="/api/v1/dashboard", tags=["仪表盘"])
@@ -59,6 +63,9 @@ class ClientUpdate(BaseModel):
     logo_uri: Optional[str] = None
     tos_uri: Optional[str] = None
     policy_uri: Optional[str] = None
+    embed_claims_in_token: Optional[bool] = None
+    # 令牌中claims的最长可用时间，最多1天
+    claims_max_staleness_seconds: Optional[int] = Field(None, ge=0, le=86400)
     is_active: Optional[bool] = None
 
 
@@ -206,6 +213,7 @@ async def update_profile(
     current_user.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(current_user)
+    userinfo_cache.invalidate(current_user.id)
     
     return {"message": "资料更新成功"}
 
@@ -225,9 +233,11 @@ async def change_password(
         )
     
     # 更新密码
-    current_user.hashed_password = UserService.get_password_hash(password_data.new_password)
+    current_user.hashed_password = security.get_password_hash(password_data.new_password)
     current_user.updated_at = datetime.utcnow()
     db.commit()
+    # 旧密码建立的SSO会话不再有效
+    sso_sessions.delete_user_sessions(current_user.id)
     
     return {"message": "密码修改成功"}
 
@@ -273,8 +283,19 @@ async def get_all_users(
     limit: int = 100
 ):
     """获取所有用户列表"""
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    return FastJSONResponse(UserService.list_users(db, skip=skip, limit=limit))
+
+
+@router.get("/admin/users/search")
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    current_user = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """按用户名、邮箱、姓名和昵称搜索用户，结果按匹配程度排序"""
+    from app.services.user_search_service import UserSearchService
+    return FastJSONResponse(UserSearchService.search_users(db, q, limit))
 
 
 @router.post("/admin/users")
@@ -312,6 +333,25 @@ async def create_user(
     return {"message": "用户创建成功", "user_id": new_user.id}
 
 
+@router.post("/admin/users/import")
+async def import_users(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    current_user = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """批量导入用户（CSV或NDJSON），返回导入统计和逐行错误"""
+    from app.services.bulk_import_service import BulkUserImporter, read_rows
+    import io
+    
+    if file_format is None:
+        file_format = "ndjson" if (file.filename or "").endswith((".ndjson", ".jsonl")) else "csv"
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    # 哈希和批量写入耗时较长，放到线程池中执行，不阻塞事件循环
+    report = await run_in_threadpool(BulkUserImporter(db).run, read_rows(stream, file_format))
+    return report.to_dict()
+
+
 @router.put("/admin/users/{user_id}")
 async def update_user(
     user_id: str,
@@ -347,6 +387,9 @@ async def update_user(
     
     user.updated_at = datetime.utcnow()
     db.commit()
+    userinfo_cache.invalidate(user_id)
+    if user_data.is_active is False:
+        sso_sessions.delete_user_sessions(user_id)
     
     return {"message": "用户更新成功"}
 
@@ -367,6 +410,7 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    userinfo_cache.invalidate(user_id)
     
     return {"message": "用户删除成功"}
 
@@ -380,10 +424,7 @@ async def get_all_clients(
     limit: int = 100
 ):
     """获取所有应用列表"""
-    clients = db.query(ClientApplication).options(
-        joinedload(ClientApplication.owner)
-    ).offset(skip).limit(limit).all()
-    return clients
+    return FastJSONResponse(ClientService.list_clients(db, skip=skip, limit=limit, with_owner=True))
 
 
 @router.put("/admin/clients/{client_id}")
@@ -412,6 +453,10 @@ async def update_client(
         client.tos_uri = client_data.tos_uri
     if client_data.policy_uri is not None:
         client.policy_uri = client_data.policy_uri
+    if client_data.embed_claims_in_token is not None:
+        client.embed_claims_in_token = client_data.embed_claims_in_token
+    if client_data.claims_max_staleness_seconds is not None:
+        client.claims_max_staleness_seconds = client_data.claims_max_staleness_seconds
     if client_data.is_active is not None:
         client.is_active = client_data.is_active
     
@@ -438,6 +483,79 @@ async def delete_client(
     return {"message": "应用删除成功"}
 
 
+# 限流统计
+@router.get("/admin/rate-limits")
+async def get_rate_limit_stats(current_user = Depends(require_admin)):
+    """获取本worker的OAuth端点限流计数"""
+    from app.core.rate_limit import rate_limiter
+    return [
+        {"endpoint": endpoint, "dimension": dimension, "outcome": outcome, "count": count}
+        for (endpoint, dimension, outcome), count in sorted(rate_limiter.stats().items())
+    ]
+
+
+
+# 按需性能分析（只分析处理本次请求的worker）
+def _require_profiler(seconds: float) -> None:
+    from app.core.config import settings
+    if not settings.profiler_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if seconds > settings.profiler_max_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"分析时间不能超过 {settings.profiler_max_seconds} 秒"
+        )
+
+
+@router.post("/admin/profiler/cpu")
+async def profile_cpu(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=1, le=100),
+    current_user = Depends(require_admin)
+):
+    """对本worker做CPU采样分析，返回折叠栈文件（可用 flamegraph.pl 或 speedscope 打开）"""
+    from fastapi.responses import PlainTextResponse
+    from app.core.profiler import ProfilerBusy, render_collapsed, sample_stacks
+    import time
+    
+    _require_profiler(seconds)
+    try:
+        result = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000)
+    except ProfilerBusy:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="本worker已有分析任务在运行")
+    
+    filename = f"profile-{result['pid']}-{int(time.time())}.collapsed"
+    return PlainTextResponse(render_collapsed(result["stacks"]), headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Profile-Pid": str(result["pid"]),
+        "X-Profile-Samples": str(result["samples"]),
+        "X-Profile-Seconds": str(result["seconds"])
+    })
+
+
+@router.post("/admin/profiler/memory")
+async def profile_memory(
+    seconds: float = Query(10, gt=0),
+    limit: int = Query(30, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    current_user = Depends(require_admin)
+):
+    """在 seconds 秒的窗口内跟踪本worker的内存分配，返回增长最多的分配位置"""
+    from app.core.profiler import MemoryDiff, ProfilerBusy
+    import asyncio
+    
+    _require_profiler(seconds)
+    diff = MemoryDiff()
+    try:
+        await run_in_threadpool(diff.start)
+    except ProfilerBusy:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="本worker已有分析任务在运行")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        result = await run_in_threadpool(diff.finish, limit, group_by)
+    return FastJSONResponse(result)
+
 # 登录日志管理
 @router.get("/admin/logs/login", response_model=List[LoginLogResponse])
 async def get_login_logs(
@@ -2,12 +2,19 @@ from fastapi import APIRouter, Depends, HTTPException, status, Form, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import RedirectResponse, JSONResponse
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from urllib.parse import urlencode, parse_qs
 from app.core.database import get_db
 from app.core.security import security
 from app.core.config import settings
+from app.core.rate_limit import rate_limit, limit_client
+from app.core.login_throttle import login_throttle
+from app.core.metrics import AUTHORIZATION_CODES, PERMISSION_DENIALS, TOKENS_ISSUED
+from app.core.discovery import get_discovery_document
+from app.core.serialization import FastJSONResponse, trusted_dump
 from app.services import OAuth2Service, ClientService, UserService
+from app.services.sso_session import sso_sessions
+from app.services.consent_service import consent_store
 from app.services.permission_management_service import PermissionManagementService
 from app.schemas import (
     AuthorizationRequest, TokenRequest, TokenResponse, 
@@ -21,15 +28,12 @@ security_scheme = HTTPBearer()
 
 
 @router.get("/.well-known/openid_configuration", response_model=WellKnownConfiguration)
-async def openid_configuration():
+@router.get("/.well-known/openid-configuration", response_model=WellKnownConfiguration, include_in_schema=False)
+async def openid_configuration(request: Request):
     """OpenID Connect Discovery endpoint"""
-    base_url = settings.jwt_issuer
-    return WellKnownConfiguration(
-        issuer=base_url,
-        authorization_endpoint=f"{base_url}/oauth/authorize",
-        token_endpoint=f"{base_url}/oauth/token",
-        userinfo_endpoint=f"{base_url}/oauth/userinfo",
-        jwks_uri=f"{base_url}/oauth/jwks"
+    # 文档在启动时预先生成并压缩，这里只做条件请求判断
+    return get_discovery_document().response(
+        request, f"public, max-age={settings.discovery_cache_max_age}"
     )
 
 
@@ -50,6 +54,7 @@ async def authorize(
     code_challenge: Optional[str] = None,
     code_challenge_method: Optional[str] = "S256",
     nonce: Optional[str] = None,
+    prompt: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """OAuth 2.0 Authorization Endpoint"""
@@ -89,6 +94,26 @@ async def authorize(
     if not scope:
         scope = "openid"
     
+    # 已有SSO会话时无需再次验证密码：已同意过这些作用域则直接签发授权码，否则直接进入同意页面
+    prompts = (prompt or "").split()
+    if response_type == "code" and "login" not in prompts:
+        sso_token = request.cookies.get(settings.sso_cookie_name)
+        user_id = sso_sessions.get_user_id(sso_token)
+        user = UserService.get_user_by_id(db, user_id) if user_id else None
+        if user and user.is_active:
+            if "consent" not in prompts and consent_store.covers(
+                db, user.id, client.client_id, security.parse_scope(scope)
+            ):
+                return _issue_authorization_code(
+                    db, user, client, redirect_uri, scope, state,
+                    code_challenge, code_challenge_method, nonce
+                )
+            consent_token = sso_sessions.create_consent_ticket(user.id, sso_token, client.client_id, scope)
+            return RedirectResponse(_consent_page_url(
+                client_id, redirect_uri, scope, state, code_challenge, code_challenge_method, nonce,
+                consent_token
+            ))
+    
     # 重定向到前端登录页面，带上所有OAuth参数
     login_params = {
         "response_type": response_type,
@@ -111,8 +136,8 @@ async def authorize(
 @router.post("/authorize")
 async def handle_authorization(
     request: Request,
-    username: str = Form(...),
-    password: str = Form(...),
+    username: Optional[str] = Form(None),
+    password: Optional[str] = Form(None),
     client_id: str = Form(...),
     redirect_uri: str = Form(...),
     scope: str = Form(default="openid"),
@@ -120,19 +145,48 @@ async def handle_authorization(
     code_challenge: Optional[str] = Form(None),
     code_challenge_method: str = Form(default="S256"),
     nonce: Optional[str] = Form(None),
-    consent: bool = Form(False),
+    consent: Optional[bool] = Form(None),
+    consent_token: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
-    """处理用户授权请求"""
-    
-    # 验证用户
-    user = UserService.authenticate_user(db, username, password)
-    if not user:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    
-    # 记录登录日志
-    from app.api.v1.dashboard import log_login
-    await log_login(db, user, request, success=True, client_id=client_id)
+    """处理用户授权请求
+
+    未提交 consent 时，若用户此前已同意过全部请求的作用域则直接签发授权码，
+    否则重定向到同意页面。提交 consent 时必须带上同意页面地址中的一次性同意票据。
+    """
+    session_token = None
+    # 同意票据绑定的浏览器会话：SSO会话cookie或待同意句柄
+    consent_session = None
+    pending_token = request.cookies.get(sso_sessions.pending_cookie_name)
+    if username and password:
+        client_ip = request.client.host if request.client else None
+        # 在密码哈希和数据库查询之前检查失败次数
+        login_throttle.check(username, client_ip)
+        
+        # 验证用户
+        user = UserService.authenticate_user(db, username, password)
+        if not user:
+            login_throttle.record_failure(username, client_ip)
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        login_throttle.record_success(username)
+        
+        # 记录登录日志
+        from app.api.v1.dashboard import log_login
+        await log_login(db, user, request, success=True, client_id=client_id)
+        
+        if settings.sso_session_enabled:
+            session_token = sso_sessions.create(user.id)
+            consent_session = session_token
+    else:
+        # 未提交密码时使用已有的SSO会话，或密码登录后签发的一次性待同意句柄
+        consent_session = request.cookies.get(settings.sso_cookie_name)
+        user_id = sso_sessions.get_user_id(consent_session)
+        if not user_id and consent is not None:
+            user_id = sso_sessions.pop_pending_user_id(pending_token)
+            consent_session = pending_token
+        user = UserService.get_user_by_id(db, user_id) if user_id else None
+        if not user or not user.is_active:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # 验证客户端
     client = ClientService.get_client_by_id(db, client_id)
@@ -149,6 +203,110 @@ async def handle_authorization(
     if not ClientService.validate_redirect_uri(client, redirect_uri):
         raise HTTPException(status_code=400, detail="Invalid redirect_uri")
     
+    # 同意只能由服务端签发的同意页面提交，票据与当前会话、客户端和作用域绑定且只能使用一次
+    if consent is not None and sso_sessions.pop_consent_ticket(
+        consent_token, consent_session, client.client_id, scope
+    ) != user.id:
+        raise HTTPException(status_code=400, detail="Invalid consent_token")
+    
+    requested_scopes = security.parse_scope(scope)
+    consented_scopes = None
+    if consent is None:
+        if not consent_store.covers(db, user.id, client.client_id, requested_scopes):
+            pending_handle = None
+            if username and password and not session_token:
+                # 未启用SSO会话：同意页面提交时凭服务端的待同意句柄识别用户，URL中不带密码
+                pending_handle = sso_sessions.create_pending(user.id)
+                consent_session = pending_handle
+            consent_token = sso_sessions.create_consent_ticket(
+                user.id, consent_session, client.client_id, scope
+            )
+            # 需要用户确认，303让浏览器以GET打开同意页面
+            response = RedirectResponse(_consent_page_url(
+                client_id, redirect_uri, scope, state, code_challenge, code_challenge_method, nonce,
+                consent_token
+            ), status_code=status.HTTP_303_SEE_OTHER)
+            if session_token:
+                sso_sessions.set_cookie(response, session_token)
+            elif pending_handle:
+                sso_sessions.set_pending_cookie(response, pending_handle)
+            return response
+    elif consent:
+        consented_scopes = requested_scopes
+    
+    if consent is False:
+        error_params = {
+            "error": "access_denied",
+            "error_description": "The user denied the request"
+        }
+        if state:
+            error_params["state"] = state
+        response = RedirectResponse(f"{redirect_uri}?{urlencode(error_params)}")
+    else:
+        response = _issue_authorization_code(
+            db, user, client, redirect_uri, scope, state,
+            code_challenge, code_challenge_method, nonce, consented_scopes
+        )
+    
+    if session_token:
+        sso_sessions.set_cookie(response, session_token)
+    if pending_token:
+        response.delete_cookie(sso_sessions.pending_cookie_name, path=sso_sessions.pending_cookie_path)
+    return response
+
+
+@router.post("/logout")
+async def sso_logout(request: Request):
+    """结束SSO会话，之后的授权请求需要重新输入密码"""
+    sso_sessions.delete(request.cookies.get(settings.sso_cookie_name))
+    response = JSONResponse({"logged_out": True})
+    response.delete_cookie(settings.sso_cookie_name, path="/")
+    return response
+
+
+def _consent_page_url(
+    client_id: str,
+    redirect_uri: str,
+    scope: str,
+    state: Optional[str],
+    code_challenge: Optional[str],
+    code_challenge_method: Optional[str],
+    nonce: Optional[str],
+    consent_token: str
+) -> str:
+    """前端授权同意页面的地址，带上全部OAuth参数和同意票据"""
+    params = {
+        "response_type": "code",
+        "client_id": client_id,
+        "redirect_uri": redirect_uri,
+        "scope": scope
+    }
+    if state:
+        params["state"] = state
+    if code_challenge:
+        params["code_challenge"] = code_challenge
+        params["code_challenge_method"] = code_challenge_method
+    if nonce:
+        params["nonce"] = nonce
+    params["consent_token"] = consent_token
+    return f"/authorize?{urlencode(params)}"
+
+
+def _issue_authorization_code(
+    db: Session,
+    user,
+    client,
+    redirect_uri: str,
+    scope: str,
+    state: Optional[str],
+    code_challenge: Optional[str],
+    code_challenge_method: str,
+    nonce: Optional[str],
+    consented_scopes: Optional[List[str]] = None
+) -> RedirectResponse:
+    """检查用户权限后签发授权码并重定向回客户端，consented_scopes 为本次新同意的作用域"""
+    client_id = client.client_id
+    
     # 确保应用有权限组，如果没有则自动创建
     from app.models import ApplicationPermissionGroup
     import json
@@ -178,6 +336,7 @@ async def handle_authorization(
     
     if not permission_check.has_permission:
         # 用户没有权限
+        PERMISSION_DENIALS.inc()
         error_params = {
             "error": "access_denied",
             "error_description": permission_check.reason or "用户没有权限使用此应用"
@@ -187,14 +346,8 @@ async def handle_authorization(
         
         return RedirectResponse(f"{redirect_uri}?{urlencode(error_params)}")
     
-    if not consent:
-        error_params = {
-            "error": "access_denied",
-            "error_description": "The user denied the request"
-        }
-        if state:
-            error_params["state"] = state
-        return RedirectResponse(f"{redirect_uri}?{urlencode(error_params)}")
+    if consented_scopes:
+        consent_store.grant(db, user.id, client_id, consented_scopes)
     
     # 使用允许的作用域（而不是请求的所有作用域）
     allowed_scope = " ".join(permission_check.allowed_scopes)
@@ -210,6 +363,7 @@ async def handle_authorization(
         code_challenge_method=code_challenge_method,
         nonce=nonce
     )
+    AUTHORIZATION_CODES.inc("issued")
     
     # 重定向回客户端
     params = {"code": auth_code.code}
@@ -219,7 +373,7 @@ async def handle_authorization(
     return RedirectResponse(f"{redirect_uri}?{urlencode(params)}")
 
 
-@router.post("/token", response_model=TokenResponse)
+@router.post("/token", response_model=TokenResponse, dependencies=[Depends(rate_limit("token"))])
 async def token_endpoint(
     grant_type: str = Form(...),
     code: Optional[str] = Form(None),
@@ -241,6 +395,7 @@ async def token_endpoint(
             client = ClientService.authenticate_client(db, client_id, client_secret)
             if not client:
                 raise HTTPException(status_code=401, detail="Invalid client credentials")
+            limit_client("token", client_id)
         else:
             client = ClientService.get_client_by_id(db, client_id)
             if not client:
@@ -252,10 +407,13 @@ async def token_endpoint(
             code=code,
             client_id=client_id,
             redirect_uri=redirect_uri,
-            code_verifier=code_verifier
+            code_verifier=code_verifier,
+            client=client
         )
+        AUTHORIZATION_CODES.inc("redeemed")
+        TOKENS_ISSUED.inc("authorization_code")
         
-        return TokenResponse(**tokens)
+        return FastJSONResponse(trusted_dump(TokenResponse, tokens))
     
     elif grant_type == "refresh_token":
         if not all([refresh_token, client_id]):
@@ -266,23 +424,29 @@ async def token_endpoint(
             client = ClientService.authenticate_client(db, client_id, client_secret)
             if not client:
                 raise HTTPException(status_code=401, detail="Invalid client credentials")
+            limit_client("token", client_id)
         
         tokens = OAuth2Service.refresh_token(db, refresh_token, client_id)
-        return TokenResponse(**tokens)
+        TOKENS_ISSUED.inc("refresh_token")
+        return FastJSONResponse(trusted_dump(TokenResponse, tokens))
     
     else:
         raise HTTPException(status_code=400, detail="Unsupported grant type")
 
 
-@router.get("/userinfo", response_model=UserInfo)
+@router.get("/userinfo", response_model=UserInfo, dependencies=[Depends(rate_limit("userinfo"))])
 async def userinfo(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security_scheme),
     db: Session = Depends(get_db)
 ):
     """OpenID Connect UserInfo Endpoint"""
     access_token = credentials.credentials
-    user_info = OAuth2Service.get_user_info(db, access_token)
-    return UserInfo(**user_info)
+    payload = OAuth2Service.verify_access_token(access_token)
+    limit_client("userinfo", payload.get("client_id"))
+    user_info = OAuth2Service.get_user_info_body(db, access_token, payload)
+    # 客户端每次都需要携带 If-None-Match 重新验证，未变化时返回304
+    return user_info.response(request, "private, no-cache")
 
 
 @router.post("/revoke")
@@ -314,7 +478,7 @@ async def revoke_token(
     return {"revoked": True}
 
 
-@router.get("/introspect")
+@router.get("/introspect", dependencies=[Depends(rate_limit("introspect"))])
 async def introspect_token(
     token: str = Form(...),
     token_type_hint: Optional[str] = Form(None),
@@ -329,6 +493,7 @@ async def introspect_token(
         client = ClientService.authenticate_client(db, client_id, client_secret)
         if not client:
             raise HTTPException(status_code=401, detail="Invalid client credentials")
+        limit_client("introspect", client_id)
     
     try:
         payload = security.verify_token(token)
@@ -343,7 +508,7 @@ async def introspect_token(
         if not token_record:
             return {"active": False}
         
-        return {
+        return FastJSONResponse({
             "active": True,
             "client_id": payload.get("client_id"),
             "sub": payload.get("sub"),
@@ -352,7 +517,7 @@ async def introspect_token(
             "iat": payload.get("iat"),
             "iss": payload.get("iss"),
             "aud": payload.get("aud")
-        }
+        })
     
     except HTTPException:
         return {"active": False}
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import validator
 import os
@@ -6,6 +6,7 @@ import os
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///./oauth.db"  # 默认使用SQLite用于开发
+    auto_create_tables: bool = True  # 启动时执行create_all；表结构由Alembic管理时关闭以加快worker启动
     secret_key: str = "dev-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
@@ -14,6 +15,56 @@ class Settings(BaseSettings):
     jwt_audience: str = "oauth-client"
     cors_origins: List[str] = ["http://localhost:3000", "http://localhost:8080"]
     laaa_dashboard_client_id: str = "laaa-dashboard"  # LAAA Dashboard的默认Client ID
+    access_expiry_scheduler_enabled: bool = True  # 是否在本进程内运行授权过期调度器
+    access_expiry_rescan_seconds: int = 3600  # 过期调度器重新扫描数据库的间隔
+    authorization_code_expire_minutes: int = 10
+    authorization_code_store: str = "sql"  # sql, memory（仅单worker）, redis（多worker共享）
+    redis_url: Optional[str] = None
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # memory（每个worker独立）, redis（多worker共享）
+    rate_limit_client_per_second: float = 50.0
+    rate_limit_client_burst: int = 100
+    rate_limit_ip_per_second: float = 100.0
+    rate_limit_ip_burst: int = 200
+    login_throttle_enabled: bool = True
+    login_throttle_window_seconds: int = 900  # 失败次数统计的滑动窗口
+    login_throttle_username_free_failures: int = 5  # 窗口内超过该次数后开始锁定
+    login_throttle_ip_free_failures: int = 20
+    login_throttle_base_delay_seconds: float = 1.0  # 锁定时长按2的幂递增
+    login_throttle_max_delay_seconds: float = 900.0
+    login_throttle_max_keys: int = 100000
+    discovery_cache_max_age: int = 86400  # 发现文档的 Cache-Control max-age（秒）
+    userinfo_cache_ttl_seconds: int = 60  # 多worker时其它进程缓存的最长陈旧时间
+    userinfo_cache_max_entries: int = 100000
+    sso_session_enabled: bool = True
+    sso_session_backend: str = "memory"  # memory（每个worker独立）, redis（多worker共享）
+    sso_cookie_name: str = "laaa_sso"
+    sso_cookie_secure: bool = False  # 生产环境使用HTTPS时应开启
+    sso_idle_timeout_seconds: int = 1800  # 无访问超过该时间后会话失效
+    sso_absolute_timeout_seconds: int = 43200  # 会话自创建起的最长有效期
+    sso_session_max_entries: int = 100000
+    consent_pending_timeout_seconds: int = 600  # 未启用SSO会话时，密码登录后等待用户同意的最长时间
+    consent_cache_max_entries: int = 100000
+    bulk_import_batch_size: int = 1000
+    bulk_import_hash_workers: Optional[int] = None  # 密码哈希进程数，默认使用CPU核数
+    static_cache_max_bytes: int = 64 * 1024 * 1024  # 前端静态资源（含压缩变体）常驻内存的上限
+    static_cache_max_file_bytes: int = 2 * 1024 * 1024  # 超过该大小的文件直接从磁盘读取
+    static_brotli_quality: int = 5  # 每个worker启动时压缩；quality 11 压缩率略高但慢数十倍
+    server_workers: Optional[int] = None  # serve.py 启动的worker数量，默认1；多worker要求会话、限流和授权码使用redis后端
+    server_backlog: int = 2048  # 监听socket的连接队列长度
+    server_limit_concurrency: Optional[int] = None  # 每个worker同时处理的连接上限，超出返回503
+    server_graceful_timeout_seconds: int = 30  # 收到SIGTERM后等待处理中请求完成的时间
+    metrics_enabled: bool = True  # 记录请求延迟直方图并提供 /metrics
+    metrics_token: Optional[str] = None  # 抓取 /metrics 需要 Authorization: Bearer <token>；未设置时不提供 /metrics
+    metrics_dir: Optional[str] = None  # 多worker交换指标快照的目录，serve.py 多worker时未设置则自动创建临时目录
+    metrics_snapshot_interval_seconds: float = 5.0  # 每个worker写入快照的间隔，即其它worker样本的最大陈旧时间
+    query_stats_enabled: bool = True  # 按请求统计SQL语句数量和耗时
+    server_timing_enabled: bool = False  # 在 Server-Timing 响应头中返回服务端耗时；查询数和bcrypt耗时可推断用户名是否存在，只在调试时开启
+    query_repeat_threshold: int = 5  # 同一请求内相同语句执行达到该次数时记录N+1警告
+    tracing_sample_rate: float = 0.0  # 记录bcrypt/JWT/权限检查等阶段耗时的请求比例（0关闭，1全部）
+    trace_log_enabled: bool = False  # 被采样的请求输出一行JSON日志（logger: app.trace）
+    profiler_enabled: bool = True  # 管理员按需CPU采样/内存分配分析接口
+    profiler_max_seconds: int = 60  # 单次分析的最长时间（秒）
 
     @validator('cors_origins', pre=True)
     def assemble_cors_origins(cls, v):
@@ -24,6 +75,14 @@ class Settings(BaseSettings):
             return [i.strip() for i in v] if isinstance(v, str) else v
         raise ValueError(v)
 
+    @validator('rate_limit_client_per_second', 'rate_limit_ip_per_second',
+               'rate_limit_client_burst', 'rate_limit_ip_burst')
+    def validate_rate_limit(cls, v):
+        # 速率为0时无法计算 Retry-After，容量为0时所有请求都会被拒绝
+        if v <= 0:
+            raise ValueError("must be greater than 0")
+        return v
+
     class Config:
         env_file = ".env"
         case_sensitive = False
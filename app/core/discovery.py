@@ -0,0 +1,67 @@
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.core.http_cache import PrecomputedBody
+from app.schemas import WellKnownConfiguration
+import json
+
+_document: Optional[PrecomputedBody] = None
+_fingerprint: Optional[Tuple] = None
+
+
+def _current_fingerprint() -> Tuple:
+    """影响发现文档内容的配置项"""
+    return (settings.jwt_issuer, settings.algorithm)
+
+
+def build_discovery_document() -> WellKnownConfiguration:
+    """根据当前配置生成完整的OpenID Connect发现文档"""
+    base_url = settings.jwt_issuer
+    return WellKnownConfiguration(
+        issuer=base_url,
+        authorization_endpoint=f"{base_url}/oauth/authorize",
+        token_endpoint=f"{base_url}/oauth/token",
+        userinfo_endpoint=f"{base_url}/oauth/userinfo",
+        jwks_uri=f"{base_url}/oauth/jwks",
+        revocation_endpoint=f"{base_url}/oauth/revoke",
+        introspection_endpoint=f"{base_url}/oauth/introspect",
+        scopes_supported=["openid", "profile", "email", "phone"],
+        response_types_supported=["code"],
+        response_modes_supported=["query"],
+        grant_types_supported=["authorization_code", "refresh_token"],
+        subject_types_supported=["public"],
+        id_token_signing_alg_values_supported=[settings.algorithm],
+        token_endpoint_auth_methods_supported=["client_secret_post", "none"],
+        revocation_endpoint_auth_methods_supported=["client_secret_post", "none"],
+        introspection_endpoint_auth_methods_supported=["client_secret_post", "none"],
+        claims_supported=[
+            "sub", "iss", "aud", "exp", "iat", "auth_time", "nonce",
+            "name", "given_name", "family_name", "middle_name", "nickname",
+            "preferred_username", "profile", "picture", "website", "gender",
+            "birthdate", "zoneinfo", "locale", "updated_at",
+            "email", "email_verified", "phone_number", "phone_number_verified"
+        ],
+        code_challenge_methods_supported=["S256", "plain"],
+        claims_parameter_supported=False,
+        request_parameter_supported=False,
+        request_uri_parameter_supported=False
+    )
+
+
+def refresh_discovery_document() -> PrecomputedBody:
+    """重新生成并缓存发现文档（配置或密钥变化时调用）"""
+    global _document, _fingerprint
+    fingerprint = _current_fingerprint()
+    document = build_discovery_document().model_dump(exclude_none=True)
+    _document = PrecomputedBody(
+        json.dumps(document, separators=(",", ":")).encode("utf-8"),
+        media_type="application/json"
+    )
+    _fingerprint = fingerprint
+    return _document
+
+
+def get_discovery_document() -> PrecomputedBody:
+    """返回预先计算好的发现文档，配置变化时自动重新生成"""
+    if _document is None or _fingerprint != _current_fingerprint():
+        return refresh_discovery_document()
+    return _document
@@ -0,0 +1,80 @@
+from typing import Optional, Set
+from fastapi import Request, Response
+import gzip
+import hashlib
+
+try:
+    import brotli
+except ImportError:  # brotli 是可选依赖，未安装时只提供gzip变体
+    brotli = None
+
+
+def accepted_encodings(header: Optional[str]) -> Set[str]:
+    """解析 Accept-Encoding，返回客户端接受的编码（忽略 q=0）"""
+    encodings = set()
+    for item in (header or "").split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q=") and params[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        encodings.add(name)
+    return encodings
+
+
+class PrecomputedBody:
+    """预先计算好的响应体：原始字节、压缩变体和强ETag"""
+
+    # 太小的响应压缩后反而更大
+    min_compress_size = 256
+
+    def __init__(self, content: bytes, media_type: str, compress: bool = True,
+                 brotli_quality: Optional[int] = None):
+        self.content = content
+        self.media_type = media_type
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip: Optional[bytes] = None
+        self.gzip_etag = f'"{digest}-gz"'
+        self.br: Optional[bytes] = None
+        self.br_etag = f'"{digest}-br"'
+        if compress and len(content) >= self.min_compress_size:
+            compressed = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(compressed) < len(content):
+                self.gzip = compressed
+            if brotli is not None and brotli_quality is not None:
+                compressed = brotli.compress(content, quality=brotli_quality)
+                if len(compressed) < len(content):
+                    self.br = compressed
+
+    @property
+    def size(self) -> int:
+        """所有变体占用的内存字节数"""
+        return len(self.content) + len(self.gzip or b"") + len(self.br or b"")
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """判断 If-None-Match 是否命中任一变体的ETag"""
+        if not if_none_match:
+            return False
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in candidates or bool(candidates & {self.etag, self.gzip_etag, self.br_etag})
+
+    def response(self, request: Request, cache_control: str) -> Response:
+        """根据条件请求和 Accept-Encoding 返回304或合适的变体（优先br，其次gzip）"""
+        headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        encodings = accepted_encodings(request.headers.get("accept-encoding"))
+        if self.br is not None and "br" in encodings:
+            encoding, body, headers["ETag"] = "br", self.br, self.br_etag
+        elif self.gzip is not None and "gzip" in encodings:
+            encoding, body, headers["ETag"] = "gzip", self.gzip, self.gzip_etag
+        else:
+            encoding, body, headers["ETag"] = None, self.content, self.etag
+
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=self.media_type, headers=headers)
@@ -0,0 +1,109 @@
+from collections import OrderedDict, deque
+from typing import Optional
+from fastapi import HTTPException, status
+from app.core.config import settings
+from app.core.metrics import LOGINS
+import math
+import threading
+import time
+
+
+class FailureWindow:
+    """滑动窗口内的登录失败计数，超过免费次数后按指数退避锁定
+
+    每个key只保存最近的若干个失败时间戳和锁定截止时间，key的总数有上限，
+    超出时淘汰最久未更新的记录。
+    """
+
+    def __init__(self, free_failures: int, window_seconds: int, base_delay: float,
+                 max_delay: float, max_keys: int):
+        self.free_failures = free_failures
+        self.window_seconds = window_seconds
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 指数退避在超过这个次数后已达到 max_delay，更早的时间戳无需保留
+        self._history = free_failures + max(int(math.log2(max(max_delay / base_delay, 1))) + 1, 1)
+
+    def retry_after(self, key: str) -> float:
+        """返回距离允许下一次尝试的秒数，0表示允许"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0.0
+            return max(entry[0] - time.monotonic(), 0.0)
+
+    def record_failure(self, key: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                entry = [0.0, deque(maxlen=self._history)]
+            failures = entry[1]
+            while failures and failures[0] <= now - self.window_seconds:
+                failures.popleft()
+            failures.append(now)
+
+            excess = len(failures) - self.free_failures
+            if excess >= 0:
+                entry[0] = now + min(self.base_delay * (2 ** excess), self.max_delay)
+
+            self._entries[key] = entry
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class LoginThrottle:
+    """按用户名和来源IP限制密码登录失败，在任何密码哈希和数据库操作之前检查"""
+
+    def __init__(self):
+        self.by_username = FailureWindow(
+            settings.login_throttle_username_free_failures,
+            settings.login_throttle_window_seconds,
+            settings.login_throttle_base_delay_seconds,
+            settings.login_throttle_max_delay_seconds,
+            settings.login_throttle_max_keys
+        )
+        self.by_ip = FailureWindow(
+            settings.login_throttle_ip_free_failures,
+            settings.login_throttle_window_seconds,
+            settings.login_throttle_base_delay_seconds,
+            settings.login_throttle_max_delay_seconds,
+            settings.login_throttle_max_keys
+        )
+
+    def check(self, username: str, client_ip: Optional[str]) -> None:
+        """处于锁定期时抛出429"""
+        if not settings.login_throttle_enabled:
+            return
+        wait = self.by_username.retry_after(username.lower())
+        if client_ip:
+            wait = max(wait, self.by_ip.retry_after(client_ip))
+        if wait > 0:
+            LOGINS.inc("throttled")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="登录失败次数过多，请稍后再试",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+    def record_failure(self, username: str, client_ip: Optional[str]) -> None:
+        LOGINS.inc("failure")
+        if not settings.login_throttle_enabled:
+            return
+        self.by_username.record_failure(username.lower())
+        if client_ip:
+            self.by_ip.record_failure(client_ip)
+
+    def record_success(self, username: str) -> None:
+        LOGINS.inc("success")
+        self.by_username.reset(username.lower())
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,350 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 请求延迟直方图的默认分桶（秒）
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class _ThreadShards:
+    """每个线程写自己的字典，热路径上不加锁；导出时汇总所有线程的分片
+
+    只有注册新线程的分片时才需要加锁，事件循环线程和线程池线程各自只写一次注册。
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def all(self) -> List[dict]:
+        with self._lock:
+            return list(self._shards)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """单调递增计数器"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._shards = _ThreadShards()
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        shard = self._shards.get()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def collect(self) -> Iterable[Sample]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._shards.all():
+            for labelvalues, value in list(shard.items()):
+                totals[labelvalues] = totals.get(labelvalues, 0) + value
+        for labelvalues, value in sorted(totals.items()):
+            yield f"{self.name}_total", dict(zip(self.labelnames, labelvalues)), value
+
+
+class Histogram:
+    """固定分桶直方图，每个分片按标签记录 [各桶计数..., 总和, 总数]"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _ThreadShards()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        shard = self._shards.get()
+        state = shard.get(labelvalues)
+        if state is None:
+            state = shard[labelvalues] = [0] * (len(self.buckets) + 3)
+        # 最后一个桶之外的值落在 +Inf 桶
+        state[bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def collect(self) -> Iterable[Sample]:
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in self._shards.all():
+            for labelvalues, state in list(shard.items()):
+                total = totals.setdefault(labelvalues, [0] * len(state))
+                for i, value in enumerate(list(state)):
+                    total[i] += value
+        for labelvalues, state in sorted(totals.items()):
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-2]):
+                cumulative += count
+                yield f"{self.name}_bucket", dict(labels, le=_format_value(bound)), cumulative
+            yield f"{self.name}_sum", labels, state[-2]
+            yield f"{self.name}_count", labels, state[-1]
+
+
+class CallbackMetric:
+    """导出时才读取的指标（连接池状态、缓存命中数等已由其它对象维护的数值）"""
+
+    def __init__(self, name: str, documentation: str, type: str,
+                 callback: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self.callback = callback
+
+    def collect(self) -> Iterable[Sample]:
+        suffix = "_total" if self.type == "counter" else ""
+        for labels, value in self.callback():
+            yield f"{self.name}{suffix}", labels, value
+
+
+class MetricsRegistry:
+    """本进程内的指标集合，按Prometheus文本格式导出
+
+    多worker部署时每个worker各自统计，导出的样本带有 worker 标签（进程ID），
+    其它worker的样本通过 WorkerSnapshots 交换后合并到同一次导出中。
+    """
+
+    def __init__(self, prefix: str = "laaa"):
+        self.prefix = prefix
+        self._metrics: List = []
+        self.started_at = time.time()
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(f"{self.prefix}_{name}", documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_callback(self, name: str, documentation: str, type: str,
+                          callback: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+        self._metrics.append(CallbackMetric(f"{self.prefix}_{name}", documentation, type, callback))
+
+    def samples(self) -> Dict[str, List[str]]:
+        """本进程的样本行（带 worker 标签），按指标名分组"""
+        worker = str(os.getpid())
+        samples = {}
+        for metric in self._metrics:
+            samples[metric.name] = [
+                f"{name}{_format_labels(dict(labels, worker=worker))} {_format_value(value)}"
+                for name, labels, value in metric.collect()
+            ]
+        return samples
+
+    def render(self, peers: Iterable[Dict[str, List[str]]] = ()) -> str:
+        """导出本进程的指标，peers 为其它worker的样本快照"""
+        own = self.samples()
+        peers = list(peers)
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(own[metric.name])
+            for peer in peers:
+                lines.extend(peer.get(metric.name, ()))
+        return "\n".join(lines) + "\n"
+
+
+class WorkerSnapshots:
+    """多worker时通过共享目录交换各worker的样本
+
+    每个worker定期把自己的样本写入 <目录>/<pid>.json，抓取 /metrics 时处理请求的worker
+    读取其它存活worker的快照一起导出，其它worker的样本最多陈旧一个写入间隔。
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.directory: Optional[str] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def write(self) -> None:
+        """原子地替换本worker的快照文件"""
+        path = self._path(os.getpid())
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.registry.samples(), f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    def peers(self) -> List[Dict[str, List[str]]]:
+        """其它存活worker的快照；已退出的worker留下的文件直接删除"""
+        if not self.directory:
+            return []
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            pid, ext = os.path.splitext(filename)
+            if ext != ".json" or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            except PermissionError:
+                pass
+            try:
+                with open(path, encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # 文件正在被替换或已被删除，跳过这一次
+                continue
+        return snapshots
+
+    def start(self, directory: str, interval: float) -> None:
+        """开始定期写入本worker的快照"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.directory = directory
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name="metrics-snapshots", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止写入并删除本worker的快照"""
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+        if self.directory:
+            try:
+                os.remove(self._path(os.getpid()))
+            except FileNotFoundError:
+                pass
+
+    def _run(self, interval: float) -> None:
+        while True:
+            try:
+                self.write()
+            except OSError:
+                logger.exception("Failed to write metrics snapshot")
+            if self._stopped.wait(interval):
+                return
+
+
+class MetricsMiddleware:
+    """记录每个请求的延迟，标签使用路由模板（如 /api/v1/clients/{client_id}）避免高基数"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code)
+            )
+
+
+metrics = MetricsRegistry()
+worker_snapshots = WorkerSnapshots(metrics)
+
+REQUEST_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route and status",
+    ("method", "route", "status")
+)
+TOKENS_ISSUED = metrics.counter("tokens_issued", "Access tokens issued by grant type", ("grant_type",))
+AUTHORIZATION_CODES = metrics.counter(
+    "authorization_codes", "Authorization codes issued and redeemed", ("event",)
+)
+LOGINS = metrics.counter("logins", "Password logins by result (success, failure, throttled)", ("result",))
+PERMISSION_DENIALS = metrics.counter("permission_denials", "Authorization requests denied by application access rules")
+CACHE_REQUESTS = metrics.counter("cache_requests", "Cache lookups by cache and result (hit, miss)", ("cache", "result"))
+DB_QUERIES = metrics.histogram(
+    "db_queries_per_request", "SQL statements executed per request by route", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+)
+DB_TIME = metrics.histogram("db_time_per_request_seconds", "Time spent in SQL statements per request by route", ("route",))
+SPAN_DURATION = metrics.histogram(
+    "span_duration_seconds", "Duration of traced phases (bcrypt, JWT, permission checks) in sampled requests", ("span",)
+)
+RATE_LIMIT_DECISIONS = metrics.counter(
+    "rate_limit_decisions", "OAuth endpoint admission decisions by endpoint, dimension (ip, client) and outcome",
+    ("endpoint", "dimension", "outcome")
+)
+REPEATED_QUERIES = metrics.counter(
+    "repeated_queries", "Statements executed repeatedly within one request (possible N+1) by route", ("route",)
+)
+
+
+def _db_pool_samples():
+    from app.core.database import engine
+    pool = engine.pool
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        value = getattr(pool, name, None)
+        if callable(value):
+            yield {"state": name}, value()
+
+
+metrics.register_callback("db_pool_connections", "SQLAlchemy connection pool state", "gauge", _db_pool_samples)
+metrics.register_callback(
+    "process_start_time_seconds", "Start time of the worker since unix epoch", "gauge",
+    lambda: [({}, metrics.started_at)]
+)
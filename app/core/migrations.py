@@ -0,0 +1,178 @@
+"""已有数据库的增量表结构升级
+
+create_all 只会创建缺少的表，不会给已有的表加列、加约束或建索引。这里的每个步骤都先检查表结构，
+只在缺少时执行，可以重复运行：启动时（AUTO_CREATE_TABLES）在 create_all 之后执行全部步骤，
+alembic/versions 中的迁移调用对应的单个步骤。表还不存在时跳过，由 create_all 按最新模型创建。
+"""
+
+from typing import Callable, Iterable, List
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _has_table(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def _create_index(conn: Connection, table: str, name: str, columns: Iterable[str]) -> None:
+    """表存在且还没有同名索引时创建普通索引"""
+    if not _has_table(conn, table) or any(index["name"] == name for index in inspect(conn).get_indexes(table)):
+        return
+    conn.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+    logger.info(f"Added index {name}")
+
+
+def _has_unique(conn: Connection, table: str, columns: Iterable[str]) -> bool:
+    """表上是否已有覆盖这些列的唯一约束或唯一索引"""
+    inspector = inspect(conn)
+    columns = set(columns)
+    for constraint in inspector.get_unique_constraints(table):
+        if set(constraint["column_names"]) == columns:
+            return True
+    for index in inspector.get_indexes(table):
+        if index.get("unique") and set(index["column_names"]) == columns:
+            return True
+    return False
+
+
+def add_user_authorization_unique_index(conn: Connection) -> None:
+    """user_authorizations (user_id, client_id) 唯一索引，同意记录的 ON CONFLICT 写入依赖它
+
+    建索引之前合并重复记录：保留最新的一条，作用域取所有重复记录的并集。
+    """
+    if not _has_table(conn, "user_authorizations") or \
+            _has_unique(conn, "user_authorizations", ("user_id", "client_id")):
+        return
+
+    duplicates = conn.execute(text(
+        "SELECT user_id, client_id FROM user_authorizations "
+        "GROUP BY user_id, client_id HAVING COUNT(*) > 1"
+    )).all()
+    for user_id, client_id in duplicates:
+        rows = conn.execute(text(
+            "SELECT id, scope FROM user_authorizations WHERE user_id = :user_id AND client_id = :client_id "
+            "ORDER BY created_at DESC, id"
+        ), {"user_id": user_id, "client_id": client_id}).all()
+        scopes = sorted({scope for row in rows for scope in (row.scope or "").split()})
+        conn.execute(text("UPDATE user_authorizations SET scope = :scope WHERE id = :id"),
+                     {"scope": " ".join(scopes), "id": rows[0].id})
+        for row in rows[1:]:
+            conn.execute(text("DELETE FROM user_authorizations WHERE id = :id"), {"id": row.id})
+    if duplicates:
+        logger.info(f"Merged duplicate user_authorizations rows for {len(duplicates)} user/client pairs")
+
+    conn.execute(text(
+        "CREATE UNIQUE INDEX unique_user_client_authorization ON user_authorizations (user_id, client_id)"
+    ))
+    logger.info("Added unique index unique_user_client_authorization")
+
+
+def add_client_claims_columns(conn: Connection) -> None:
+    """client_applications 的 embed_claims_in_token / claims_max_staleness_seconds 列"""
+    if not _has_table(conn, "client_applications"):
+        return
+    columns = (
+        ("embed_claims_in_token", "BOOLEAN DEFAULT FALSE"),
+        ("claims_max_staleness_seconds", "INTEGER DEFAULT 300"),
+    )
+    for column, definition in columns:
+        if _has_column(conn, "client_applications", column):
+            continue
+        conn.execute(text(f"ALTER TABLE client_applications ADD COLUMN {column} {definition}"))
+        logger.info(f"Added column client_applications.{column}")
+
+
+def add_user_search_columns(conn: Connection) -> None:
+    """users 表搜索用的小写规范化列及其索引，SQLite的FTS5全文索引或PostgreSQL的三元组索引
+
+    新增的列按批回填；FTS5表是新建的时候从 users 表重建一次索引。
+    """
+    from app.models import (
+        USER_SEARCH_FIELDS, SQLITE_USER_SEARCH_DDL, POSTGRESQL_USER_SEARCH_DDL, user_search_values
+    )
+
+    if not _has_table(conn, "users"):
+        return
+    for field in USER_SEARCH_FIELDS:
+        if not _has_column(conn, "users", f"{field}_lower"):
+            conn.execute(text(f"ALTER TABLE users ADD COLUMN {field}_lower VARCHAR"))
+            logger.info(f"Added column users.{field}_lower")
+
+    # username_lower 为空说明这一行还没有回填；空用户名回填后仍为空，所以按id翻页而不是反复查询空值
+    backfilled = 0
+    last_id = ""
+    while True:
+        rows = conn.execute(text(
+            f"SELECT id, {', '.join(USER_SEARCH_FIELDS)} FROM users "
+            "WHERE username_lower IS NULL AND id > :last_id ORDER BY id LIMIT 1000"
+        ), {"last_id": last_id}).mappings().all()
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+        conn.execute(
+            text(f"UPDATE users SET {', '.join(f'{field}_lower = :{field}_lower' for field in USER_SEARCH_FIELDS)} "
+                 "WHERE id = :id"),
+            [{"id": row["id"], **user_search_values(row)} for row in rows]
+        )
+        backfilled += len(rows)
+    if backfilled:
+        logger.info(f"Backfilled search columns for {backfilled} users")
+
+    for field in USER_SEARCH_FIELDS:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_users_{field}_lower ON users ({field}_lower)"))
+
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        statements = SQLITE_USER_SEARCH_DDL
+        rebuild = not _has_table(conn, "users_fts")
+    elif dialect == "postgresql":
+        statements = POSTGRESQL_USER_SEARCH_DDL
+        rebuild = False
+    else:
+        return
+    try:
+        # 全文索引不可用（没有FTS5或没有创建扩展的权限）时搜索退回 LIKE，不影响启动
+        with conn.begin_nested():
+            for statement in statements:
+                conn.execute(text(statement))
+            if rebuild:
+                conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+                logger.info("Created and rebuilt users_fts")
+    except DBAPIError as e:
+        logger.warning(f"User full-text search index unavailable, search falls back to LIKE: {e}")
+
+
+def add_access_expiry_index(conn: Connection) -> None:
+    """user_application_access.expires_at 索引，过期调度器按过期时间扫描和删除依赖它"""
+    _create_index(conn, "user_application_access", "ix_user_application_access_expires_at", ("expires_at",))
+
+
+def add_created_at_indexes(conn: Connection) -> None:
+    """users 和 client_applications 的 created_at 索引，列表接口按创建时间筛选和排序依赖它们"""
+    _create_index(conn, "users", "ix_users_created_at", ("created_at",))
+    _create_index(conn, "client_applications", "ix_client_applications_created_at", ("created_at",))
+
+
+# 按顺序执行，新的步骤追加在末尾
+UPGRADE_STEPS: List[Callable[[Connection], None]] = [
+    add_user_authorization_unique_index,
+    add_client_claims_columns,
+    add_user_search_columns,
+    add_access_expiry_index,
+    add_created_at_indexes,
+]
+
+
+def upgrade_schema(engine) -> None:
+    """执行全部升级步骤（每一步都是幂等的）"""
+    with engine.begin() as conn:
+        for step in UPGRADE_STEPS:
+            step(conn)
@@ -0,0 +1,125 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional
+import linecache
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# 同一个worker同时只运行一个分析任务
+_busy = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """本worker已经有一个分析任务在运行"""
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds: float, interval: float) -> Dict[str, Any]:
+    """统计采样：每隔 interval 秒读取一次所有线程的调用栈，返回折叠格式的栈计数
+
+    在调用线程中阻塞运行 seconds 秒（应放在线程池中执行），自身所在线程不计入结果。
+    """
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        own_thread = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                labels.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            time.sleep(interval)
+        return {
+            "pid": os.getpid(),
+            "seconds": round(time.perf_counter() - started, 3),
+            "samples": samples,
+            "stacks": stacks
+        }
+    finally:
+        _busy.release()
+
+
+def render_collapsed(stacks: Counter) -> str:
+    """flamegraph.pl / speedscope 可以直接读取的折叠栈格式：栈帧以分号分隔，最后是采样次数"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class MemoryDiff:
+    """tracemalloc 快照差异：开始一个窗口，结束时返回增长最多的分配位置"""
+
+    def __init__(self, frames: int = 10):
+        self.frames = frames
+        self._started_tracing = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> None:
+        if not _busy.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self._started_tracing = True
+            self._baseline = tracemalloc.take_snapshot()
+        except BaseException:
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+            _busy.release()
+            raise
+
+    def finish(self, limit: int = 30, group_by: str = "lineno") -> Dict[str, Any]:
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            # 排除 tracemalloc 自身和导入机制的分配
+            filters = [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            ]
+            snapshot = snapshot.filter_traces(filters)
+            baseline = self._baseline.filter_traces(filters)
+            top: List[Dict[str, Any]] = []
+            for stat in snapshot.compare_to(baseline, group_by)[:limit]:
+                frame = stat.traceback[0]
+                top.append({
+                    "location": f"{frame.filename}:{frame.lineno}",
+                    "source": linecache.getline(frame.filename, frame.lineno).strip(),
+                    "size_diff": stat.size_diff,
+                    "size": stat.size,
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                    "traceback": [f"{f.filename}:{f.lineno}" for f in stat.traceback] if group_by == "traceback" else None
+                })
+            return {
+                "pid": os.getpid(),
+                "traced_memory": current,
+                "traced_memory_peak": peak,
+                "top": top
+            }
+        finally:
+            self._baseline = None
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+            _busy.release()
@@ -0,0 +1,119 @@
+from collections import Counter as StatementCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Set, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.metrics import DB_QUERIES, DB_TIME, REPEATED_QUERIES
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """一次请求（或一段代码）内执行的SQL语句数量、耗时和每条语句的重复次数"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: StatementCounter = StatementCounter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """相同语句（参数不同）执行次数达到阈值的，通常是循环里的逐条查询"""
+        return [(statement, times) for statement, times in self.statements.most_common() if times >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# assert_max_queries 注册的收集器；TestClient 在另一个线程里运行应用，上下文变量传不过去
+_collectors: Set[QueryStats] = set()
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None or _collectors:
+        context._query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    for collector in list(_collectors):
+        collector.record(statement, elapsed)
+
+
+class QueryStatsMiddleware:
+    """为每个请求统计SQL：写入 Server-Timing 响应头和指标，同一语句重复过多时记录警告
+
+    同步的路由和依赖在线程池中执行，会复制当前上下文，因此共享同一个 QueryStats。
+    Server-Timing 只包含响应头发出之前的查询；流式响应体中的查询计入指标。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.server_timing_enabled:
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(
+                    b"server-timing",
+                    f'db;dur={stats.seconds * 1000:.1f};desc="{stats.count} queries"'.encode("latin-1")
+                )]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            DB_QUERIES.observe(stats.count, route)
+            DB_TIME.observe(stats.seconds, route)
+            repeated = stats.repeated(settings.query_repeat_threshold)
+            if repeated:
+                REPEATED_QUERIES.inc(route, amount=len(repeated))
+                for statement, times in repeated:
+                    logger.warning(f"Possible N+1 on {scope['method']} {route}: statement executed "
+                                   f"{times} times in one request: {' '.join(statement.split())[:200]}")
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """测试辅助：代码块（包括通过 TestClient 发出的请求）执行的SQL不能超过 max_queries 条
+
+        with assert_max_queries(3):
+            client.get("/api/v1/users/me", headers=headers)
+    """
+    stats = QueryStats()
+    _collectors.add(stats)
+    try:
+        yield stats
+    finally:
+        _collectors.discard(stats)
+    if stats.count > max_queries:
+        details = "\n".join(f"  {times}x {' '.join(statement.split())[:200]}"
+                            for statement, times in stats.statements.most_common())
+        raise AssertionError(f"Expected at most {max_queries} queries, executed {stats.count}:\n{details}")
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+from fastapi import HTTPException, Request, status
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_DECISIONS
+import math
+import threading
+import time
+
+
+class MemoryTokenBucket:
+    """进程内令牌桶，按key记录 (剩余令牌, 上次更新时间)，超出容量时淘汰最久未使用的key"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> float:
+        """消耗一个令牌；成功返回0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisTokenBucket:
+    """基于Redis的令牌桶，多个worker共享同一份配额"""
+
+    script = """
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or burst
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(burst, tokens + math.max(now - ts, 0) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, rate: float, burst: int, name: str, client=None):
+        if client is None:
+            from app.core.redis_client import get_redis
+            client = get_redis()
+        self.rate = rate
+        self.burst = burst
+        self.key_prefix = f"laaa:ratelimit:{name}:"
+        self._script = client.register_script(self.script)
+
+    def acquire(self, key: str) -> float:
+        return float(self._script(keys=[self.key_prefix + key], args=[self.rate, self.burst, time.time()]))
+
+
+class RateLimiter:
+    """OAuth端点的准入控制：按客户端IP和client_id分别限流"""
+
+    def __init__(self):
+        self._buckets: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, dimension: str):
+        bucket = self._buckets.get(dimension)
+        if bucket is not None:
+            return bucket
+        # 并发的第一次请求只能创建一个桶，否则先创建的桶里的消耗会丢失
+        with self._lock:
+            bucket = self._buckets.get(dimension)
+            if bucket is None:
+                if dimension == "client":
+                    rate, burst = settings.rate_limit_client_per_second, settings.rate_limit_client_burst
+                else:
+                    rate, burst = settings.rate_limit_ip_per_second, settings.rate_limit_ip_burst
+                if rate <= 0 or burst <= 0:
+                    raise ValueError(f"Rate limit for {dimension} must have a positive rate and burst")
+                if settings.rate_limit_backend == "redis":
+                    bucket = RedisTokenBucket(rate, burst, dimension)
+                else:
+                    bucket = MemoryTokenBucket(rate, burst)
+                self._buckets[dimension] = bucket
+        return bucket
+
+    def check(self, endpoint: str, dimension: str, key: Optional[str]) -> None:
+        """超出配额时抛出429"""
+        if not key:
+            return
+        wait = self._bucket(dimension).acquire(key)
+        RATE_LIMIT_DECISIONS.inc(endpoint, dimension, "limited" if wait > 0 else "allowed")
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+
+    def stats(self) -> Dict[Tuple[str, str, str], int]:
+        """返回本worker各端点的放行/限流计数（与 /metrics 中的 rate_limit_decisions 相同）"""
+        return {
+            (labels["endpoint"], labels["dimension"], labels["outcome"]): int(value)
+            for _, labels, value in RATE_LIMIT_DECISIONS.collect()
+        }
+
+
+rate_limiter = RateLimiter()
+
+
+def rate_limit(endpoint: str):
+    """生成按来源IP对指定端点限流的依赖
+
+    此时客户端还没有认证，请求中的 client_id 可以随意伪造，按它限流会让别人耗尽该客户端的配额；
+    按客户端限流在认证之后由 limit_client 进行。
+    """
+    async def dependency(request: Request):
+        if not settings.rate_limit_enabled:
+            return
+        client_ip = request.client.host if request.client else None
+        rate_limiter.check(endpoint, "ip", client_ip)
+    return dependency
+
+
+def limit_client(endpoint: str, client_id: Optional[str]) -> None:
+    """按已认证的客户端（client_secret 校验通过或来自已验证的令牌）限流"""
+    if settings.rate_limit_enabled:
+        rate_limiter.check(endpoint, "client", client_id)
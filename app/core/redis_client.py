@@ -0,0 +1,17 @@
+from app.core.config import settings
+
+_client = None
+
+
+def get_redis():
+    """获取共享的Redis客户端（多worker部署时用于共享状态）"""
+    global _client
+    if _client is None:
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("Redis backend requires the 'redis' package: pip install redis") from e
+        if not settings.redis_url:
+            raise RuntimeError("REDIS_URL must be configured to use a Redis backend")
+        _client = redis.Redis.from_url(settings.redis_url)
+    return _client
@@ -1,15 +1,17 @@
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.core.tracing import traced
 import secrets
 import hashlib
 import base64
 import json
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 新密码使用bcrypt；其余方案仅用于验证从旧系统批量导入的密码哈希
+pwd_context = CryptContext(schemes=["bcrypt", "pbkdf2_sha256", "sha512_crypt"], deprecated="auto")
 
 
 class SecurityManager:
@@ -19,14 +21,22 @@ class SecurityManager:
         self.access_token_expire_minutes = settings.access_token_expire_minutes
         self.refresh_token_expire_days = settings.refresh_token_expire_days
 
+    @traced("bcrypt")
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """验证密码"""
         return pwd_context.verify(plain_password, hashed_password)
 
+    @traced("bcrypt")
+    def verify_and_update_password(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """验证密码；哈希使用了已弃用的算法（如批量导入的旧系统哈希）时同时返回新的bcrypt哈希"""
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
+    @traced("bcrypt")
     def get_password_hash(self, password: str) -> str:
         """生成密码哈希"""
         return pwd_context.hash(password)
 
+    @traced("jwt-encode")
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         """创建访问令牌"""
         to_encode = data.copy()
@@ -45,6 +55,7 @@ class SecurityManager:
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
 
+    @traced("jwt-encode")
     def create_refresh_token(self, data: Dict[str, Any]) -> str:
         """创建刷新令牌"""
         to_encode = data.copy()
@@ -57,6 +68,7 @@ class SecurityManager:
         encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
         return encoded_jwt
 
+    @traced("jwt-encode")
     def create_id_token(self, user_data: Dict[str, Any], client_id: str, nonce: Optional[str] = None) -> str:
         """创建OIDC ID令牌"""
         now = datetime.utcnow()
@@ -86,6 +98,7 @@ class SecurityManager:
             
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
 
+    @traced("jwt-decode")
     def verify_token(self, token: str) -> Dict[str, Any]:
         """验证令牌"""
         try:
@@ -0,0 +1,143 @@
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, Optional, Type
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from app.schemas import ClientApplicationResponse
+import datetime
+import itertools
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选加速依赖
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _default(value: Any) -> Any:
+    """标准库json回退时处理orjson原生支持的类型"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """把内部构造的数据直接编码为JSON字节"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """使用orjson编码的JSON响应，跳过FastAPI对返回值的二次校验和编码"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+@lru_cache(maxsize=None)
+def _field_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    """模型字段及默认值，按字段声明顺序"""
+    return {name: field.get_default(call_default_factory=True) for name, field in model.model_fields.items()}
+
+
+@lru_cache(maxsize=None)
+def _required_fields(model: Type[BaseModel]) -> FrozenSet[str]:
+    return frozenset(name for name, field in model.model_fields.items() if field.is_required())
+
+
+def trusted_dump(model: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """服务层自己生成的数据无需校验，与 model_construct 一样补齐默认值，但不创建模型实例
+
+    缺少必填字段时没有可补的默认值，改为 model_validate，由 ValidationError 指出缺少的字段。
+    """
+    if not _required_fields(model).issubset(data):
+        return model.model_validate(data).model_dump()
+    return {name: data.get(name, default) for name, default in _field_defaults(model).items()}
+
+
+def trusted_json(model: Type[BaseModel], data: Dict[str, Any]) -> bytes:
+    return dumps(trusted_dump(model, data))
+
+
+@lru_cache(maxsize=None)
+def get_adapter(tp: Any) -> TypeAdapter:
+    """每种响应类型只构建一次 TypeAdapter"""
+    return TypeAdapter(tp)
+
+
+def model_json_response(tp: Any, value: Any, status_code: int = 200) -> Response:
+    """ORM对象按 from_attributes 校验后由pydantic-core直接输出JSON字节"""
+    adapter = get_adapter(tp)
+    content = adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+    return Response(content=content, status_code=status_code, media_type="application/json")
+
+
+def _json_list(value: Any) -> list:
+    """客户端表中以JSON字符串保存的列表字段"""
+    if not value:
+        return []
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return []
+
+
+CLIENT_RESPONSE_FIELDS = tuple(ClientApplicationResponse.model_fields)
+
+
+def client_to_dict(client: Any) -> Dict[str, Any]:
+    """ClientApplication 实体或查询行 -> ClientApplicationResponse 结构的字典"""
+    data = {field: getattr(client, field, None) for field in CLIENT_RESPONSE_FIELDS}
+    data["redirect_uris"] = _json_list(data["redirect_uris"])
+    data["contacts"] = _json_list(data["contacts"])
+    return data
+
+
+def stream_json_array(
+    stmt,
+    convert: Optional[Callable[[Any], Dict[str, Any]]] = None,
+    batch_size: int = 1000
+) -> Iterator[bytes]:
+    """通过服务端游标分批读取查询结果，逐批输出JSON数组片段
+
+    使用独立的数据库会话，生成器在响应发送完毕后才结束；
+    内存占用只与 batch_size 有关，与结果总行数无关。
+    查询和第一批读取在返回之前完成，这时出错仍能返回正常的500响应。
+    """
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        partitions = db.execute(stmt.execution_options(yield_per=batch_size)).partitions()
+        first_batch = next(partitions, [])
+    except Exception:
+        db.close()
+        raise
+    return _stream_batches(db, itertools.chain([first_batch], partitions), convert)
+
+
+def _stream_batches(db, batches: Iterable[Any], convert: Optional[Callable[[Any], Dict[str, Any]]]) -> Iterator[bytes]:
+    try:
+        yield b"["
+        first = True
+        for rows in batches:
+            if not rows:
+                continue
+            items = [convert(row) for row in rows] if convert else [row._asdict() for row in rows]
+            if not first:
+                yield b","
+            yield dumps(items)[1:-1]
+            first = False
+        yield b"]"
+    except Exception:
+        # 响应头已经发出，无法再改状态码；不输出结尾的 "]"，重新抛出让服务器中断连接，
+        # 客户端收到的是不完整的响应，而不是被截断但格式正确的数组
+        logger.exception("Streaming JSON array failed mid-response, aborting connection")
+        raise
+    finally:
+        db.close()
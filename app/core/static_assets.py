@@ -0,0 +1,95 @@
+from typing import Dict, Optional, Union
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from app.core.config import settings
+from app.core.http_cache import PrecomputedBody
+import logging
+import mimetypes
+import os
+
+logger = logging.getLogger(__name__)
+
+# Next.js 构建产物中带内容哈希的文件，内容变化时文件名也会变化，可以永久缓存
+IMMUTABLE_PREFIX = "_next/static/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# HTML等文件名固定的资源每次都用ETag重新验证
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# 值得压缩的类型；图片、字体（woff2）等本身已经压缩过
+COMPRESSIBLE_TYPES = {
+    "application/javascript", "application/json", "application/xml",
+    "application/manifest+json", "image/svg+xml", "image/x-icon"
+}
+
+
+def _media_type(path: str) -> str:
+    media_type, _ = mimetypes.guess_type(path)
+    return media_type or "application/octet-stream"
+
+
+def _compressible(media_type: str) -> bool:
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+class StaticAssetIndex:
+    """前端静态资源索引
+
+    启动时遍历一次构建目录：内存预算内的文件连同gzip/br压缩变体常驻内存，
+    超出预算的大文件只记录路径，请求时不再访问文件系统判断文件是否存在。
+    """
+
+    def __init__(self, root: str, max_memory_bytes: Optional[int] = None,
+                 max_file_bytes: Optional[int] = None, brotli_quality: Optional[int] = None):
+        self.root = root
+        self.max_memory_bytes = max_memory_bytes if max_memory_bytes is not None else settings.static_cache_max_bytes
+        self.max_file_bytes = max_file_bytes if max_file_bytes is not None else settings.static_cache_max_file_bytes
+        self.brotli_quality = brotli_quality if brotli_quality is not None else settings.static_brotli_quality
+        self._assets: Dict[str, Union[PrecomputedBody, str]] = {}
+        self.memory_bytes = 0
+        self.loaded = False
+
+    def load(self) -> None:
+        """遍历构建目录建立索引（重复调用会重新加载）"""
+        assets: Dict[str, Union[PrecomputedBody, str]] = {}
+        memory_bytes = 0
+        for directory, _, filenames in os.walk(self.root):
+            for filename in sorted(filenames):
+                full_path = os.path.join(directory, filename)
+                relative_path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                size = os.path.getsize(full_path)
+                if size > self.max_file_bytes or memory_bytes + size > self.max_memory_bytes:
+                    assets[relative_path] = full_path
+                    continue
+                media_type = _media_type(filename)
+                with open(full_path, "rb") as f:
+                    body = PrecomputedBody(f.read(), media_type, compress=_compressible(media_type),
+                                           brotli_quality=self.brotli_quality)
+                memory_bytes += body.size
+                assets[relative_path] = body
+
+        self._assets = assets
+        self.memory_bytes = memory_bytes
+        self.loaded = True
+        in_memory = sum(isinstance(asset, PrecomputedBody) for asset in assets.values())
+        logger.info(f"Indexed {len(assets)} static assets from {self.root} "
+                    f"({in_memory} in memory, {memory_bytes / 1024 / 1024:.1f}MiB)")
+
+    def resolve(self, path: str) -> Optional[str]:
+        """把请求路径解析为索引中的文件（兼容 trailingSlash 导出的 index.html）"""
+        path = path.strip("/")
+        for candidate in (path, f"{path}/index.html" if path else "index.html", f"{path}.html"):
+            if candidate in self._assets:
+                return candidate
+        return None
+
+    def response(self, request: Request, path: str) -> Response:
+        """返回静态资源，不存在时返回404"""
+        relative_path = self.resolve(path)
+        if relative_path is None:
+            raise HTTPException(status_code=404, detail="Not found")
+
+        cache_control = IMMUTABLE_CACHE_CONTROL if relative_path.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE_CONTROL
+        asset = self._assets[relative_path]
+        if isinstance(asset, PrecomputedBody):
+            return asset.response(request, cache_control)
+        return FileResponse(asset, media_type=_media_type(asset), headers={"Cache-Control": cache_control})
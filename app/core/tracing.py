@@ -0,0 +1,113 @@
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import SPAN_DURATION
+import functools
+import json
+import logging
+import random
+import time
+
+trace_logger = logging.getLogger("app.trace")
+
+
+class Trace:
+    """一次被采样请求内记录的耗时片段（片段可以嵌套，例如换取令牌中包含JWT签名）"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []  # (名称, 开始时间, 结束时间)
+
+    def add(self, name: str, started: float, finished: float) -> None:
+        self.spans.append((name, started, finished))
+
+    def totals(self) -> Dict[str, Tuple[float, int]]:
+        """按名称汇总：(总耗时秒数, 次数)"""
+        totals: Dict[str, Tuple[float, int]] = {}
+        for name, started, finished in self.spans:
+            seconds, count = totals.get(name, (0.0, 0))
+            totals[name] = (seconds + finished - started, count + 1)
+        return totals
+
+    def server_timing(self) -> str:
+        entries = [f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}"]
+        for name, (seconds, count) in self.totals().items():
+            entries.append(f'{name};dur={seconds * 1000:.1f};desc="x{count}"')
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+def traced(name: str):
+    """把函数调用记录为一个片段；当前请求未被采样时只多一次上下文变量读取"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                trace.add(name, started, time.perf_counter())
+        return wrapper
+    return decorator
+
+
+def _sampled() -> bool:
+    rate = settings.tracing_sample_rate
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+class TracingMiddleware:
+    """按 TRACING_SAMPLE_RATE 采样请求，把片段耗时写入 Server-Timing 和指标，可选输出结构化日志
+
+    Server-Timing 会向客户端暴露内部各阶段的耗时，默认关闭采样，只在排查问题时开启。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _sampled():
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        token = _current.set(trace)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.server_timing_enabled:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", trace.server_timing().encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            for name, started, finished in trace.spans:
+                SPAN_DURATION.observe(finished - started, name)
+            if settings.trace_log_enabled:
+                trace_logger.info(json.dumps({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(scope.get("route"), "path", None),
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - trace.started) * 1000, 3),
+                    "spans": [
+                        {
+                            "name": name,
+                            "start_ms": round((started - trace.started) * 1000, 3),
+                            "duration_ms": round((finished - started) * 1000, 3)
+                        }
+                        for name, started, finished in trace.spans
+                    ]
+                }, ensure_ascii=False))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, UniqueConstraint, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -15,7 +15,7 @@ class User(Base):
     full_name = Column(String)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # OIDC fields
@@ -35,6 +35,12 @@ class User(Base):
     zoneinfo = Column(String)
     locale = Column(String)
 
+    # 搜索用的小写规范化列，由ORM事件维护（批量写入时使用 user_search_values）
+    username_lower = Column(String, index=True)
+    email_lower = Column(String, index=True)
+    full_name_lower = Column(String, index=True)
+    nickname_lower = Column(String, index=True)
+
     # Relationships
     client_applications = relationship("ClientApplication", back_populates="owner")
     authorizations = relationship("UserAuthorization", back_populates="user")
@@ -67,12 +73,16 @@ class ClientApplication(Base):
     token_endpoint_auth_method = Column(String, default="client_secret_basic")
     jwks_uri = Column(String)
     
+    # 在访问令牌中携带用户claims，UserInfo端点可直接从令牌应答
+    embed_claims_in_token = Column(Boolean, default=False)
+    claims_max_staleness_seconds = Column(Integer, default=300)  # 令牌中claims的最长可用时间
+    
     # Owner
     owner_id = Column(String, ForeignKey("users.id"))
     owner = relationship("User", back_populates="client_applications")
     
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Status
@@ -98,6 +108,11 @@ class UserAuthorization(Base):
     user = relationship("User", back_populates="authorizations")
     client = relationship("ClientApplication", back_populates="authorizations")
 
+    # 唯一约束：每个用户对每个应用只保留一条授权记录
+    __table_args__ = (
+        UniqueConstraint('user_id', 'client_id', name='unique_user_client_authorization'),
+    )
+
 
 class AuthorizationCode(Base):
     __tablename__ = "authorization_codes"
@@ -162,8 +177,8 @@ class UserApplicationAccess(Base):
     granted_at = Column(DateTime(timezone=True), server_default=func.now())
     notes = Column(Text)  # 备注
     
-    # 过期时间
-    expires_at = Column(DateTime(timezone=True))
+    # 过期时间（由过期调度器按时间顺序清理）
+    expires_at = Column(DateTime(timezone=True), index=True)
     
     # 时间戳
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -228,4 +243,63 @@ class LoginLog(Base):
     
     # 关系
     user = relationship("User", back_populates="login_logs")
-    client = relationship("ClientApplication")
\ No newline at end of file
+    client = relationship("ClientApplication")
+
+
+# 参与用户搜索的字段
+USER_SEARCH_FIELDS = ("username", "email", "full_name", "nickname")
+
+# PostgreSQL 三元组索引和搜索查询共用的表达式，两处必须完全一致才能命中索引
+USER_SEARCH_TEXT_SQL = (
+    "(coalesce(username_lower, '') || ' ' || coalesce(email_lower, '') || ' ' || "
+    "coalesce(full_name_lower, '') || ' ' || coalesce(nickname_lower, ''))"
+)
+
+
+def user_search_values(values: dict) -> dict:
+    """根据原始字段计算搜索用的小写规范化列"""
+    return {
+        f"{field}_lower": values[field].strip().lower() if values.get(field) else None
+        for field in USER_SEARCH_FIELDS
+    }
+
+
+@event.listens_for(User, "before_insert")
+@event.listens_for(User, "before_update")
+def _normalize_user_search_fields(mapper, connection, target):
+    values = user_search_values({field: getattr(target, field) for field in USER_SEARCH_FIELDS})
+    for column, value in values.items():
+        setattr(target, column, value)
+
+
+# SQLite：外部内容的FTS5索引（按词切分，带2~8字符前缀索引），由触发器随 users 表同步
+# 新建表时由下面的 after_create 事件执行，已有的表由 app.core.migrations 补建
+SQLITE_USER_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "username_lower, email_lower, full_name_lower, nickname_lower, "
+    "content='users', content_rowid='rowid', prefix='2 3 4 5 6 7 8')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, username_lower, email_lower, full_name_lower, nickname_lower) "
+    "VALUES (new.rowid, new.username_lower, new.email_lower, new.full_name_lower, new.nickname_lower); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username_lower, email_lower, full_name_lower, nickname_lower) "
+    "VALUES ('delete', old.rowid, old.username_lower, old.email_lower, old.full_name_lower, old.nickname_lower); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF "
+    "username_lower, email_lower, full_name_lower, nickname_lower ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username_lower, email_lower, full_name_lower, nickname_lower) "
+    "VALUES ('delete', old.rowid, old.username_lower, old.email_lower, old.full_name_lower, old.nickname_lower); "
+    "INSERT INTO users_fts(rowid, username_lower, email_lower, full_name_lower, nickname_lower) "
+    "VALUES (new.rowid, new.username_lower, new.email_lower, new.full_name_lower, new.nickname_lower); END",
+]
+
+# PostgreSQL：pg_trgm 的GIN表达式索引，写入时由数据库自动维护
+POSTGRESQL_USER_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_users_search_trgm ON users USING gin ({USER_SEARCH_TEXT_SQL} gin_trgm_ops)",
+]
+
+for _statement in SQLITE_USER_SEARCH_DDL:
+    event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+for _statement in POSTGRESQL_USER_SEARCH_DDL:
+    event.listen(User.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
@@ -109,6 +109,9 @@ class ClientApplicationResponse(ClientApplicationBase):
     client_secret: str
     owner_id: str
     is_active: bool
+    # 只能由管理员在后台修改
+    embed_claims_in_token: Optional[bool] = False
+    claims_max_staleness_seconds: Optional[int] = 300
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -189,6 +192,8 @@ class WellKnownConfiguration(BaseModel):
     userinfo_endpoint: str
     jwks_uri: str
     registration_endpoint: Optional[str] = None
+    revocation_endpoint: Optional[str] = None
+    introspection_endpoint: Optional[str] = None
     scopes_supported: List[str] = ["openid", "profile", "email"]
     response_types_supported: List[str] = ["code", "id_token", "token id_token"]
     grant_types_supported: List[str] = ["authorization_code", "refresh_token"]
@@ -201,6 +206,12 @@ class WellKnownConfiguration(BaseModel):
         "updated_at", "aud", "exp", "iat", "nonce"
     ]
     code_challenge_methods_supported: List[str] = ["plain", "S256"]
+    response_modes_supported: Optional[List[str]] = None
+    revocation_endpoint_auth_methods_supported: Optional[List[str]] = None
+    introspection_endpoint_auth_methods_supported: Optional[List[str]] = None
+    claims_parameter_supported: Optional[bool] = None
+    request_parameter_supported: Optional[bool] = None
+    request_uri_parameter_supported: Optional[bool] = None
 
 
 # 权限管理相关 schemas
@@ -1,11 +1,35 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from app.models import User, ClientApplication, AuthorizationCode, OAuth2Token, UserAuthorization
-from app.schemas import UserCreate, UserUpdate, ClientApplicationCreate, ClientApplicationUpdate
+from app.models import User, ClientApplication, OAuth2Token
+from app.schemas import (
+    UserCreate, UserUpdate, UserResponse, ClientApplicationCreate, ClientApplicationUpdate,
+    ClientApplicationResponse, UserInfo
+)
 from app.core.security import security
+from app.core.config import settings
+from app.services.authorization_code_store import AuthorizationCodeData, get_authorization_code_store
+from app.services.userinfo_cache import userinfo_cache
+from app.core.http_cache import PrecomputedBody
+from app.core.serialization import client_to_dict
+from app.core.tracing import traced
 import json
+import time
+
+# 生成ID令牌和UserInfo claims所需的用户列
+ID_TOKEN_USER_COLUMNS = (
+    User.id, User.username, User.email, User.full_name, User.given_name,
+    User.family_name, User.middle_name, User.nickname, User.preferred_username,
+    User.profile, User.picture, User.website, User.phone_number,
+    User.phone_number_verified, User.email_verified, User.gender,
+    User.birthdate, User.zoneinfo, User.locale, User.updated_at
+)
+
+# 列表接口只查询响应中需要的列，不加载密码哈希等内部字段，也不经过ORM实体和identity map
+USER_LIST_COLUMNS = tuple(getattr(User, name) for name in UserResponse.model_fields)
+CLIENT_LIST_COLUMNS = tuple(getattr(ClientApplication, name) for name in ClientApplicationResponse.model_fields)
 
 
 class UserService:
@@ -36,15 +60,29 @@ class UserService:
         return db_user
 
     @staticmethod
-    def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-        """验证用户"""
-        user = db.query(User).filter(
+    def get_user_by_login(db: Session, username: str) -> Optional[User]:
+        """根据用户名或邮箱获取用户"""
+        return db.query(User).filter(
             (User.username == username) | (User.email == username)
         ).first()
-        if not user or not security.verify_password(password, user.hashed_password):
+
+    @staticmethod
+    def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+        """验证用户"""
+        user = UserService.get_user_by_login(db, username)
+        if not user or not UserService.verify_user_password(db, user, password):
             return None
         return user
 
+    @staticmethod
+    def verify_user_password(db: Session, user: User, password: str) -> bool:
+        """验证用户密码，旧算法的哈希在验证成功后升级为bcrypt；所有密码登录都应经过这里"""
+        verified, new_hash = security.verify_and_update_password(password, user.hashed_password)
+        if verified and new_hash:
+            user.hashed_password = new_hash
+            db.commit()
+        return verified
+
     @staticmethod
     def get_user_by_id(db: Session, user_id: str) -> Optional[User]:
         """根据ID获取用户"""
@@ -68,6 +106,7 @@ class UserService:
         
         db.commit()
         db.refresh(user)
+        userinfo_cache.invalidate(user_id)
         return user
 
     @staticmethod
@@ -79,8 +118,39 @@ class UserService:
         
         db.delete(user)
         db.commit()
+        userinfo_cache.invalidate(user_id)
         return True
 
+    @staticmethod
+    def build_user_list_query(
+        skip: int = 0,
+        limit: Optional[int] = None,
+        is_active: Optional[bool] = None,
+        is_admin: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None
+    ):
+        """按 UserResponse 的列投影构建用户列表查询，按创建时间排序以保证分页稳定"""
+        stmt = select(*USER_LIST_COLUMNS)
+        if is_active is not None:
+            stmt = stmt.where(User.is_active == is_active)
+        if is_admin is not None:
+            stmt = stmt.where(User.is_admin == is_admin)
+        if created_after is not None:
+            stmt = stmt.where(User.created_at >= created_after)
+        if created_before is not None:
+            stmt = stmt.where(User.created_at < created_before)
+        stmt = stmt.order_by(User.created_at, User.id).offset(skip)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+    @staticmethod
+    def list_users(db: Session, skip: int = 0, limit: Optional[int] = None, **filters) -> List[Dict[str, Any]]:
+        """查询用户列表，返回普通字典"""
+        stmt = UserService.build_user_list_query(skip, limit, **filters)
+        return [row._asdict() for row in db.execute(stmt)]
+
     @staticmethod
     def get_user_info_claims(user: User, scopes: List[str]) -> Dict[str, Any]:
         """根据作用域获取用户信息"""
@@ -160,6 +230,58 @@ class ClientService:
         ).first()
 
     @staticmethod
+    def build_client_list_query(
+        skip: int = 0,
+        limit: Optional[int] = None,
+        owner_id: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+        with_owner: bool = False
+    ):
+        """按 ClientApplicationResponse 的列投影构建客户端列表查询
+
+        with_owner 为真时通过外连接附带所有者的用户名和邮箱。
+        """
+        columns = CLIENT_LIST_COLUMNS
+        if with_owner:
+            columns += (User.username.label("owner_username"), User.email.label("owner_email"))
+        stmt = select(*columns)
+        if with_owner:
+            stmt = stmt.outerjoin(User, User.id == ClientApplication.owner_id)
+        if owner_id is not None:
+            stmt = stmt.where(ClientApplication.owner_id == owner_id)
+        if is_active is not None:
+            stmt = stmt.where(ClientApplication.is_active == is_active)
+        if created_after is not None:
+            stmt = stmt.where(ClientApplication.created_at >= created_after)
+        if created_before is not None:
+            stmt = stmt.where(ClientApplication.created_at < created_before)
+        stmt = stmt.order_by(ClientApplication.created_at, ClientApplication.id).offset(skip)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return stmt
+
+    @staticmethod
+    def client_row_to_dict(row) -> Dict[str, Any]:
+        """列表查询行 -> 响应字典，带所有者列时附带 owner"""
+        data = client_to_dict(row)
+        if "owner_username" in row._fields:
+            data["owner"] = {
+                "id": row.owner_id,
+                "username": row.owner_username,
+                "email": row.owner_email
+            } if row.owner_username is not None else None
+        return data
+
+    @staticmethod
+    def list_clients(db: Session, skip: int = 0, limit: Optional[int] = None, **filters) -> List[Dict[str, Any]]:
+        """查询客户端列表，返回普通字典"""
+        stmt = ClientService.build_client_list_query(skip, limit, **filters)
+        return [ClientService.client_row_to_dict(row) for row in db.execute(stmt)]
+
+    @staticmethod
+    @traced("client-auth")
     def authenticate_client(db: Session, client_id: str, client_secret: str) -> Optional[ClientApplication]:
         """验证客户端"""
         client = ClientService.get_client_by_id(db, client_id)
@@ -213,6 +335,7 @@ class ClientService:
 
 class OAuth2Service:
     @staticmethod
+    @traced("code-issue")
     def create_authorization_code(
         db: Session,
         user_id: str,
@@ -222,13 +345,10 @@ class OAuth2Service:
         code_challenge: Optional[str] = None,
         code_challenge_method: str = "S256",
         nonce: Optional[str] = None
-    ) -> AuthorizationCode:
+    ) -> AuthorizationCodeData:
         """创建授权码"""
-        code = security.generate_authorization_code()
-        expires_at = datetime.utcnow() + timedelta(minutes=10)  # 授权码10分钟过期
-        
-        auth_code = AuthorizationCode(
-            code=code,
+        auth_code = AuthorizationCodeData(
+            code=security.generate_authorization_code(),
             user_id=user_id,
             client_id=client_id,
             redirect_uri=redirect_uri,
@@ -236,122 +356,90 @@ class OAuth2Service:
             code_challenge=code_challenge,
             code_challenge_method=code_challenge_method,
             nonce=nonce,
-            expires_at=expires_at
+            expires_at=datetime.utcnow() + timedelta(minutes=settings.authorization_code_expire_minutes)
         )
         
-        db.add(auth_code)
-        db.commit()
-        db.refresh(auth_code)
+        get_authorization_code_store().save(db, auth_code)
         return auth_code
 
     @staticmethod
+    @traced("code-exchange")
     def exchange_code_for_tokens(
         db: Session,
         code: str,
         client_id: str,
         redirect_uri: str,
-        code_verifier: Optional[str] = None
+        code_verifier: Optional[str] = None,
+        client: Optional[ClientApplication] = None
     ) -> Dict[str, Any]:
-        """授权码换取令牌"""
-        # 查找授权码
-        auth_code = db.query(AuthorizationCode).filter(
-            AuthorizationCode.code == code,
-            AuthorizationCode.used == False
-        ).first()
+        """授权码换取令牌
+
+        令牌端点已经加载过客户端时可以通过 client 传入，避免重复查询。
+        授权码作废、令牌写入和用户授权记录在同一个事务中提交。
+        """
+        # 原子地取出并作废授权码，并发请求中只有一个能拿到
+        auth_code = get_authorization_code_store().consume(db, code)
         
         if not auth_code:
             raise HTTPException(status_code=400, detail="Invalid authorization code")
         
         if auth_code.expires_at < datetime.utcnow():
-            raise HTTPException(status_code=400, detail="Authorization code expired")
+            OAuth2Service._reject_code(db, "Authorization code expired")
         
-        # 获取客户端信息以比较
-        client = db.query(ClientApplication).filter(ClientApplication.client_id == client_id).first()
+        if client is None:
+            client = ClientService.get_client_by_id(db, client_id)
         if not client:
-            raise HTTPException(status_code=400, detail="Invalid client")
+            OAuth2Service._reject_code(db, "Invalid client")
         
         if auth_code.client_id != client.client_id:
-            raise HTTPException(status_code=400, detail="Client mismatch")
+            OAuth2Service._reject_code(db, "Client mismatch")
         
         if auth_code.redirect_uri != redirect_uri:
-            raise HTTPException(status_code=400, detail="Redirect URI mismatch")
+            OAuth2Service._reject_code(db, "Redirect URI mismatch")
+        
+        # 提交后ORM对象会过期，之后只使用本地变量
+        client_id = client.client_id
         
         # 验证PKCE
         if auth_code.code_challenge and not code_verifier:
-            raise HTTPException(status_code=400, detail="Code verifier required")
+            OAuth2Service._reject_code(db, "Code verifier required")
         
         if auth_code.code_challenge:
             if not security.verify_pkce(code_verifier, auth_code.code_challenge, auth_code.code_challenge_method):
-                raise HTTPException(status_code=400, detail="Invalid code verifier")
+                OAuth2Service._reject_code(db, "Invalid code verifier")
         
-        # 标记授权码为已使用
-        auth_code.used = True
-        db.commit()
+        # 只加载ID令牌和claims需要的列
+        user_row = db.execute(
+            select(*ID_TOKEN_USER_COLUMNS).where(User.id == auth_code.user_id)
+        ).first()
         
-        # 获取用户信息
-        user = db.query(User).filter(User.id == auth_code.user_id).first()
-        
-        if not user:
-            raise HTTPException(status_code=400, detail="Invalid user")
+        if not user_row:
+            OAuth2Service._reject_code(db, "Invalid user")
         
         # 生成令牌
         scopes = security.parse_scope(auth_code.scope)
-        user_data = {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "full_name": user.full_name,
-            "given_name": user.given_name,
-            "family_name": user.family_name,
-            "middle_name": user.middle_name,
-            "nickname": user.nickname,
-            "preferred_username": user.preferred_username,
-            "profile": user.profile,
-            "picture": user.picture,
-            "website": user.website,
-            "phone_number": user.phone_number,
-            "phone_number_verified": user.phone_number_verified,
-            "email_verified": user.email_verified,
-            "gender": user.gender,
-            "birthdate": user.birthdate,
-            "zoneinfo": user.zoneinfo,
-            "locale": user.locale
-        }
-        
+        user_id = user_row.id
         access_token_data = {
-            "sub": user.id,
+            "sub": user_id,
             "client_id": client_id,
             "scope": auth_code.scope
         }
+        if client.embed_claims_in_token:
+            OAuth2Service._embed_claims(access_token_data, client, user_row, scopes)
         
         access_token = security.create_access_token(access_token_data)
-        refresh_token = security.create_refresh_token({"sub": user.id, "client_id": client_id})
+        refresh_token = security.create_refresh_token({"sub": user_id, "client_id": client_id})
         
         # 保存令牌到数据库
         expires_at = datetime.utcnow() + timedelta(minutes=security.access_token_expire_minutes)
-        oauth_token = OAuth2Token(
+        db.add(OAuth2Token(
             access_token=access_token,
             refresh_token=refresh_token,
             scope=auth_code.scope,
-            user_id=user.id,
-            client_id=client.client_id,
+            user_id=user_id,
+            client_id=client_id,
             expires_at=expires_at
-        )
-        db.add(oauth_token)
-        
-        # 创建或更新用户授权
-        existing_auth = db.query(UserAuthorization).filter(
-            UserAuthorization.user_id == user.id,
-            UserAuthorization.client_id == client.client_id
-        ).first()
-        
-        if not existing_auth:
-            user_auth = UserAuthorization(
-                user_id=user.id,
-                client_id=client.client_id,
-                scope=auth_code.scope
-            )
-            db.add(user_auth)
+        ))
         
         db.commit()
         
@@ -365,12 +453,27 @@ class OAuth2Service:
         
         # 如果scope包含openid，生成ID令牌
         if "openid" in scopes:
-            id_token = security.create_id_token(user_data, client_id, auth_code.nonce)
+            id_token = security.create_id_token(user_row._mapping, client_id, auth_code.nonce)
             result["id_token"] = id_token
         
         return result
 
     @staticmethod
+    def _embed_claims(token_data: Dict[str, Any], client: ClientApplication, user, scopes: List[str]) -> None:
+        """把按作用域过滤后的claims写入访问令牌，并记录允许UserInfo直接使用的时长"""
+        claims = UserService.get_user_info_claims(user, scopes)
+        claims.pop("sub", None)
+        token_data["claims"] = claims
+        token_data["claims_max_age"] = client.claims_max_staleness_seconds or 0
+
+    @staticmethod
+    def _reject_code(db: Session, detail: str):
+        """提交授权码的作废状态后拒绝请求"""
+        db.commit()
+        raise HTTPException(status_code=400, detail=detail)
+
+    @staticmethod
+    @traced("token-refresh")
     def refresh_token(db: Session, refresh_token: str, client_id: str) -> Dict[str, Any]:
         """刷新令牌"""
         try:
@@ -398,6 +501,10 @@ class OAuth2Service:
         if not original_token:
             raise HTTPException(status_code=400, detail="Token not found")
         
+        client = db.query(ClientApplication).filter(ClientApplication.client_id == client_id).first()
+        if not client:
+            raise HTTPException(status_code=401, detail="invalid_client")
+        
         # 撤销原有令牌
         original_token.revoked = True
         
@@ -408,11 +515,15 @@ class OAuth2Service:
             "scope": original_token.scope
         }
         
+        if client.embed_claims_in_token:
+            OAuth2Service._embed_claims(
+                access_token_data, client, user, security.parse_scope(original_token.scope)
+            )
+        
         new_access_token = security.create_access_token(access_token_data)
         new_refresh_token = security.create_refresh_token({"sub": user_id, "client_id": client_id})
         
         # 保存新令牌
-        client = db.query(ClientApplication).filter(ClientApplication.client_id == client_id).first()
         expires_at = datetime.utcnow() + timedelta(minutes=security.access_token_expire_minutes)
         new_token = OAuth2Token(
             access_token=new_access_token,
@@ -449,4 +560,40 @@ class OAuth2Service:
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        return UserService.get_user_info_claims(user, scopes)
\ No newline at end of file
+        return UserService.get_user_info_claims(user, scopes)
+
+    @staticmethod
+    def verify_access_token(access_token: str) -> Dict[str, Any]:
+        """验证访问令牌，返回payload；无效时返回401"""
+        try:
+            return security.verify_token(access_token)
+        except HTTPException:
+            raise HTTPException(status_code=401, detail="Invalid access token")
+
+    @staticmethod
+    def get_user_info_body(db: Session, access_token: str, payload: Optional[Dict[str, Any]] = None) -> PrecomputedBody:
+        """获取序列化后的用户信息，优先使用缓存，命中时不访问数据库；payload 为调用方已验证过的令牌内容"""
+        if payload is None:
+            payload = OAuth2Service.verify_access_token(access_token)
+        
+        user_id = payload.get("sub")
+        scopes = security.parse_scope(payload.get("scope", ""))
+        
+        # 令牌自带claims且仍在客户端配置的陈旧时间内，直接应答
+        claims = payload.get("claims")
+        if claims is not None and payload.get("iat", 0) + payload.get("claims_max_age", 0) >= time.time():
+            return PrecomputedBody(
+                UserInfo(sub=user_id, **claims).model_dump_json().encode("utf-8"),
+                media_type="application/json",
+                compress=False
+            )
+        
+        body = userinfo_cache.get(user_id, scopes)
+        if body is not None:
+            return body
+        
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        return userinfo_cache.put(user_id, scopes, UserService.get_user_info_claims(user, scopes))
\ No newline at end of file
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Tuple, Callable
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from app.models import UserApplicationAccess
+from app.core.config import settings
+import heapq
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _to_naive_utc(value: datetime) -> datetime:
+    """统一为无时区的UTC时间，与 datetime.utcnow() 保持可比较"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class AccessExpiryScheduler:
+    """按过期时间顺序清理 UserApplicationAccess 记录的调度器
+
+    内存中维护一个按 expires_at 排序的最小堆，后台线程睡眠到最近的过期时间后
+    删除对应记录。每隔 rescan_interval 秒会基于 expires_at 索引重新扫描一次
+    数据库，补充其它进程写入的授权，并清理遗漏的过期记录。
+    """
+
+    def __init__(self, rescan_interval: int = 3600):
+        self.rescan_interval = rescan_interval
+        self._heap: List[Tuple[datetime, str, str]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._next_rescan = datetime.min
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def schedule(self, user_id: str, client_id: str, expires_at: Optional[datetime]) -> None:
+        """登记一条授权的过期时间
+
+        没有运行清理线程的进程（serve.py 的其它worker、关闭了调度器）不登记，否则堆只增不减；
+        这些授权由运行线程的进程定期重新扫描数据库时补充。
+        """
+        if not expires_at or not self.running:
+            return
+        expires_at = _to_naive_utc(expires_at)
+        with self._lock:
+            heapq.heappush(self._heap, (expires_at, user_id, client_id))
+            is_earliest = self._heap[0][0] == expires_at
+        if is_earliest:
+            self._wakeup.set()
+
+    def start(self, session_factory: Callable[[], Session]) -> None:
+        """启动后台清理线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._session_factory = session_factory
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="access-expiry-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止后台清理线程"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def sweep(self, db: Session) -> int:
+        """删除所有已过期的访问记录，并预加载下一个扫描周期内将要过期的记录"""
+        now = datetime.utcnow()
+        result = db.execute(
+            delete(UserApplicationAccess).where(UserApplicationAccess.expires_at <= now)
+        )
+        db.commit()
+
+        horizon = now + timedelta(seconds=self.rescan_interval)
+        upcoming = db.execute(
+            select(
+                UserApplicationAccess.expires_at,
+                UserApplicationAccess.user_id,
+                UserApplicationAccess.client_id
+            ).where(
+                UserApplicationAccess.expires_at > now,
+                UserApplicationAccess.expires_at <= horizon
+            )
+        ).all()
+        for expires_at, user_id, client_id in upcoming:
+            self.schedule(user_id, client_id, expires_at)
+
+        self._next_rescan = now + timedelta(seconds=self.rescan_interval)
+        return result.rowcount or 0
+
+    def expire_due(self, db: Session) -> int:
+        """删除堆中已到期的记录，返回删除数量"""
+        now = datetime.utcnow()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+
+        removed = 0
+        for _, user_id, client_id in due:
+            # 授权可能已被续期，因此以数据库中当前的 expires_at 为准
+            result = db.execute(
+                delete(UserApplicationAccess).where(
+                    UserApplicationAccess.user_id == user_id,
+                    UserApplicationAccess.client_id == client_id,
+                    UserApplicationAccess.expires_at <= now
+                )
+            )
+            removed += result.rowcount or 0
+        if due:
+            db.commit()
+        return removed
+
+    def _seconds_until_next(self) -> float:
+        now = datetime.utcnow()
+        deadline = self._next_rescan
+        with self._lock:
+            if self._heap and self._heap[0][0] < deadline:
+                deadline = self._heap[0][0]
+        return max((deadline - now).total_seconds(), 0.0)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            db = self._session_factory()
+            try:
+                if datetime.utcnow() >= self._next_rescan:
+                    swept = self.sweep(db)
+                    if swept:
+                        logger.info(f"Removed {swept} expired application access records")
+                removed = self.expire_due(db)
+                if removed:
+                    logger.info(f"Expired {removed} application access records")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Access expiry sweep failed: {e}")
+                self._next_rescan = datetime.utcnow() + timedelta(seconds=60)
+            finally:
+                db.close()
+
+            self._wakeup.wait(self._seconds_until_next())
+            self._wakeup.clear()
+
+
+access_expiry_scheduler = AccessExpiryScheduler(settings.access_expiry_rescan_seconds)
@@ -0,0 +1,187 @@
+from dataclasses import dataclass, asdict, fields
+from datetime import datetime, timezone
+from typing import Optional, Dict, List, Set
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.models import AuthorizationCode
+from app.core.config import settings
+import json
+import threading
+import time
+
+
+@dataclass
+class AuthorizationCodeData:
+    """授权码在各存储后端之间传递的数据"""
+    code: str
+    user_id: str
+    client_id: str
+    redirect_uri: str
+    scope: str
+    expires_at: datetime  # 无时区的UTC时间
+    code_challenge: Optional[str] = None
+    code_challenge_method: Optional[str] = "S256"
+    nonce: Optional[str] = None
+
+    @property
+    def expires_at_timestamp(self) -> float:
+        return self.expires_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+CODE_FIELDS = tuple(field.name for field in fields(AuthorizationCodeData))
+
+
+class AuthorizationCodeStore:
+    """授权码存储接口
+
+    consume 必须是原子操作：同一个授权码在并发请求下最多只能被取出一次。
+    SQL后端的 consume 不提交事务，调用方需要在同一事务中提交。
+    """
+
+    def save(self, db: Session, data: AuthorizationCodeData) -> None:
+        raise NotImplementedError
+
+    def consume(self, db: Session, code: str) -> Optional[AuthorizationCodeData]:
+        """取出并作废授权码；不存在或已被使用时返回None"""
+        raise NotImplementedError
+
+
+class SQLAuthorizationCodeStore(AuthorizationCodeStore):
+    """基于 authorization_codes 表的存储（默认）"""
+
+    def save(self, db: Session, data: AuthorizationCodeData) -> None:
+        db.add(AuthorizationCode(**asdict(data)))
+        db.commit()
+
+    def consume(self, db: Session, code: str) -> Optional[AuthorizationCodeData]:
+        """条件更新作废授权码，不提交事务，由调用方与令牌写入一起提交"""
+        columns = [getattr(AuthorizationCode, name) for name in CODE_FIELDS]
+        if db.get_bind().dialect.update_returning:
+            # 单条 UPDATE ... WHERE used = false RETURNING
+            row = db.execute(
+                update(AuthorizationCode)
+                .where(AuthorizationCode.code == code, AuthorizationCode.used == False)
+                .values(used=True)
+                .returning(*columns)
+            ).first()
+            return AuthorizationCodeData(*row) if row else None
+
+        row = db.execute(
+            select(AuthorizationCode.id, *columns).where(
+                AuthorizationCode.code == code,
+                AuthorizationCode.used == False
+            )
+        ).first()
+        if not row:
+            return None
+
+        # 条件更新保证并发请求中只有一个能够成功标记为已使用
+        updated = db.execute(
+            update(AuthorizationCode)
+            .where(AuthorizationCode.id == row[0], AuthorizationCode.used == False)
+            .values(used=True)
+        ).rowcount
+        return AuthorizationCodeData(*row[1:]) if updated else None
+
+
+class MemoryAuthorizationCodeStore(AuthorizationCodeStore):
+    """进程内TTL字典存储，仅适用于单worker部署
+
+    过期淘汰使用时间轮：每个槽位对应 slot_seconds 秒，授权码按过期时间放入槽位，
+    每次读写时推进指针并清理经过的槽位，不需要后台线程。
+    """
+
+    def __init__(self, slot_seconds: int = 1, slot_count: int = 1024):
+        self.slot_seconds = slot_seconds
+        self.slot_count = slot_count
+        self._codes: Dict[str, AuthorizationCodeData] = {}
+        self._wheel: List[Set[str]] = [set() for _ in range(slot_count)]
+        self._last_tick = int(time.time() // slot_seconds)
+        self._lock = threading.Lock()
+
+    def save(self, db: Session, data: AuthorizationCodeData) -> None:
+        tick = int(data.expires_at_timestamp // self.slot_seconds) + 1
+        with self._lock:
+            self._advance(time.time())
+            self._codes[data.code] = data
+            self._wheel[tick % self.slot_count].add(data.code)
+
+    def consume(self, db: Session, code: str) -> Optional[AuthorizationCodeData]:
+        with self._lock:
+            self._advance(time.time())
+            return self._codes.pop(code, None)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def _advance(self, now: float) -> None:
+        current_tick = int(now // self.slot_seconds)
+        ticks = range(self._last_tick + 1, current_tick + 1)
+        if len(ticks) > self.slot_count:
+            ticks = range(current_tick - self.slot_count + 1, current_tick + 1)
+
+        for tick in ticks:
+            slot = self._wheel[tick % self.slot_count]
+            if not slot:
+                continue
+            alive = set()
+            for code in slot:
+                data = self._codes.get(code)
+                if data is None:
+                    continue
+                if data.expires_at_timestamp <= now:
+                    del self._codes[code]
+                else:
+                    # 过期时间超过一圈的授权码留到下一圈
+                    alive.add(code)
+            self._wheel[tick % self.slot_count] = alive
+        self._last_tick = max(self._last_tick, current_tick)
+
+
+class RedisAuthorizationCodeStore(AuthorizationCodeStore):
+    """基于Redis的共享存储，适用于多worker部署"""
+
+    key_prefix = "laaa:authcode:"
+
+    def __init__(self, client=None):
+        if client is None:
+            from app.core.redis_client import get_redis
+            client = get_redis()
+        self.client = client
+
+    def save(self, db: Session, data: AuthorizationCodeData) -> None:
+        payload = asdict(data)
+        payload["expires_at"] = data.expires_at.isoformat()
+        ttl = max(int(data.expires_at_timestamp - time.time()), 1)
+        self.client.set(self.key_prefix + data.code, json.dumps(payload), ex=ttl)
+
+    def consume(self, db: Session, code: str) -> Optional[AuthorizationCodeData]:
+        # MULTI/EXEC 中的 GET + DEL 保证只有一个请求能取到值
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self.key_prefix + code)
+        pipe.delete(self.key_prefix + code)
+        raw, _ = pipe.execute()
+        if raw is None:
+            return None
+        payload = json.loads(raw)
+        payload["expires_at"] = datetime.fromisoformat(payload["expires_at"])
+        return AuthorizationCodeData(**payload)
+
+
+_store: Optional[AuthorizationCodeStore] = None
+
+
+def get_authorization_code_store() -> AuthorizationCodeStore:
+    """根据配置返回授权码存储后端"""
+    global _store
+    if _store is None:
+        backend = settings.authorization_code_store
+        if backend == "memory":
+            _store = MemoryAuthorizationCodeStore()
+        elif backend == "redis":
+            _store = RedisAuthorizationCodeStore()
+        elif backend == "sql":
+            _store = SQLAuthorizationCodeStore()
+        else:
+            raise ValueError(f"Unknown authorization code store: {backend}")
+    return _store
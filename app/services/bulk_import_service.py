@@ -0,0 +1,230 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple, TextIO
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.security import pwd_context
+from app.models import User, user_search_values
+import csv
+import json
+import multiprocessing
+import uuid
+
+# 导入文件中允许出现的用户字段（密码二选一：password 明文或 password_hash 旧系统哈希）
+IMPORT_FIELDS = (
+    "username", "email", "full_name", "given_name", "family_name", "middle_name",
+    "nickname", "preferred_username", "profile", "picture", "website",
+    "phone_number", "gender", "birthdate", "zoneinfo", "locale"
+)
+BOOLEAN_FIELDS = ("is_active", "is_admin", "email_verified", "phone_number_verified")  # 除 is_active 外默认为False
+
+_email_adapter = TypeAdapter(EmailStr)
+
+
+def _hash_password(password: str) -> str:
+    """在进程池中执行的密码哈希（必须是模块级函数才能被pickle）"""
+    return pwd_context.hash(password)
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def read_rows(stream: TextIO, fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """逐行读取CSV或NDJSON，返回 (行号, 原始字段)；解析失败的行以 None 表示"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "ndjson":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                data = None
+            yield line_number, data if isinstance(data, dict) else None
+    else:
+        raise ValueError(f"不支持的导入格式: {fmt}")
+
+
+@dataclass
+class ImportReport:
+    """导入结果：成功数量、重复跳过数量和逐行错误"""
+    total: int = 0
+    created: int = 0
+    duplicates: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, row: int, error: str, **extra) -> None:
+        self.errors.append({"row": row, "error": error, **extra})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "failed": len(self.errors) - self.duplicates,
+            "errors": self.errors
+        }
+
+
+class BulkUserImporter:
+    """流式批量导入用户
+
+    每批先在内存中校验，再用一次 IN 查询与已有用户名/邮箱去重，
+    明文密码在进程池中并行哈希，最后以一条多行 INSERT 写入并提交。
+    """
+
+    def __init__(self, db: Session, batch_size: Optional[int] = None, workers: Optional[int] = None):
+        self.db = db
+        self.batch_size = batch_size or settings.bulk_import_batch_size
+        self.workers = workers or settings.bulk_import_hash_workers
+        self.report = ImportReport()
+        # 已处理过的用户名和邮箱（小写），用于发现文件内部的重复
+        self._seen_usernames = set()
+        self._seen_emails = set()
+
+    def _validate(self, row_number: int, data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """把原始字段转换为待插入的用户数据，失败时记录错误并返回None"""
+        if data is None:
+            self.report.add_error(row_number, "无法解析的行")
+            return None
+
+        values = {name: (str(data[name]).strip() or None) if data.get(name) is not None else None
+                  for name in IMPORT_FIELDS}
+        if not values["username"] or not values["email"]:
+            self.report.add_error(row_number, "缺少 username 或 email")
+            return None
+        try:
+            values["email"] = _email_adapter.validate_python(values["email"])
+        except ValidationError:
+            self.report.add_error(row_number, "邮箱格式不正确", email=values["email"])
+            return None
+
+        password = str(data["password"]) if data.get("password") else None
+        password_hash = str(data["password_hash"]) if data.get("password_hash") else None
+        if password_hash:
+            if pwd_context.identify(password_hash) is None:
+                self.report.add_error(row_number, "无法识别的密码哈希格式", username=values["username"])
+                return None
+            values["hashed_password"] = password_hash
+        elif password:
+            if len(password) < 8:
+                self.report.add_error(row_number, "密码长度至少8位", username=values["username"])
+                return None
+            values["password"] = password
+        else:
+            self.report.add_error(row_number, "缺少 password 或 password_hash", username=values["username"])
+            return None
+
+        # 多行INSERT要求每行的列相同，未提供的布尔字段也填上默认值
+        for name in BOOLEAN_FIELDS:
+            default = name == "is_active"
+            values[name] = _parse_bool(data[name]) if data.get(name) not in (None, "") else default
+        values["_row"] = row_number
+        return values
+
+    def _deduplicate(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """与数据库和之前的行去重（不区分大小写），每批只查询一次数据库"""
+        keys = [(values["username"].strip().lower(), values["email"].strip().lower()) for values in batch]
+        usernames = [username for username, _ in keys]
+        emails = [email for _, email in keys]
+        existing = self.db.execute(
+            select(User.username_lower, User.email_lower).where(
+                User.username_lower.in_(usernames) | User.email_lower.in_(emails)
+            )
+        ).all()
+        existing_usernames = {row.username_lower for row in existing}
+        existing_emails = {row.email_lower for row in existing}
+
+        unique = []
+        for values, (username, email) in zip(batch, keys):
+            if username in existing_usernames or username in self._seen_usernames:
+                reason = "用户名已存在"
+            elif email in existing_emails or email in self._seen_emails:
+                reason = "邮箱已存在"
+            else:
+                self._seen_usernames.add(username)
+                self._seen_emails.add(email)
+                unique.append(values)
+                continue
+            self.report.duplicates += 1
+            self.report.add_error(values["_row"], reason, username=values["username"], email=values["email"])
+        return unique
+
+    def _insert(self, batch: List[Dict[str, Any]]) -> None:
+        """多行INSERT写入一批用户；唯一约束冲突时退回逐行写入以定位出错的行"""
+        now = datetime.utcnow()
+        rows = []
+        for values in batch:
+            row = {key: value for key, value in values.items() if key != "_row"}
+            row["id"] = str(uuid.uuid4())
+            row["created_at"] = now
+            row.update(user_search_values(row))
+            rows.append(row)
+
+        try:
+            self.db.execute(insert(User), rows)
+            self.db.commit()
+            self.report.created += len(rows)
+            return
+        except IntegrityError:
+            self.db.rollback()
+
+        for values, row in zip(batch, rows):
+            try:
+                self.db.execute(insert(User), [row])
+                self.db.commit()
+                self.report.created += 1
+            except IntegrityError:
+                self.db.rollback()
+                self.report.duplicates += 1
+                self.report.add_error(values["_row"], "用户名或邮箱已存在",
+                                      username=values["username"], email=values["email"])
+
+    def _flush(self, batch: List[Dict[str, Any]], pool: Optional[ProcessPoolExecutor]) -> None:
+        batch = self._deduplicate(batch)
+        if not batch:
+            return
+        plain = [values for values in batch if "password" in values]
+        if plain:
+            passwords = [values.pop("password") for values in plain]
+            if pool is not None:
+                hashes = pool.map(_hash_password, passwords, chunksize=max(len(passwords) // (self.workers or 4), 1))
+            else:
+                hashes = map(_hash_password, passwords)
+            for values, hashed in zip(plain, hashes):
+                values["hashed_password"] = hashed
+        self._insert(batch)
+
+    def run(self, rows: Iterable[Tuple[int, Optional[Dict[str, Any]]]]) -> ImportReport:
+        """处理全部输入行并返回导入结果"""
+        # Web worker是多线程的，fork会把其它线程持有的锁一起复制到子进程中导致死锁，因此使用spawn
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        ) if self.workers != 1 else None
+        try:
+            batch = []
+            for row_number, data in rows:
+                self.report.total += 1
+                values = self._validate(row_number, data)
+                if values is None:
+                    continue
+                batch.append(values)
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, pool)
+                    batch = []
+            if batch:
+                self._flush(batch, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self.report
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from typing import FrozenSet, Iterable, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
+from app.models import UserAuthorization
+import threading
+import uuid
+
+
+class ConsentStore:
+    """记录用户向每个客户端授权过的作用域集合
+
+    数据保存在 user_authorizations 表（(user_id, client_id) 唯一索引），每次同意时与已有集合合并。
+    授权集合只增不减，因此进程内缓存即使落后于数据库也只会多显示一次同意页，不会越权。
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, str], FrozenSet[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: Tuple[str, str], scopes: FrozenSet[str]) -> None:
+        with self._lock:
+            self._cache[key] = scopes
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def get_granted_scopes(self, db: Session, user_id: str, client_id: str) -> FrozenSet[str]:
+        """返回用户已向该客户端授权的作用域"""
+        key = (user_id, client_id)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            CACHE_REQUESTS.inc("consent", "hit")
+            return cached
+        CACHE_REQUESTS.inc("consent", "miss")
+
+        row = db.query(UserAuthorization.scope).filter(
+            UserAuthorization.user_id == user_id,
+            UserAuthorization.client_id == client_id
+        ).first()
+        scopes = frozenset(row.scope.split()) if row else frozenset()
+        if scopes:
+            self._remember(key, scopes)
+        return scopes
+
+    def covers(self, db: Session, user_id: str, client_id: str, scopes: Iterable[str]) -> bool:
+        """请求的作用域是否都已经被用户同意过"""
+        granted = self.get_granted_scopes(db, user_id, client_id)
+        return bool(granted) and set(scopes) <= granted
+
+    def grant(self, db: Session, user_id: str, client_id: str, scopes: Iterable[str]) -> None:
+        """记录用户同意的作用域，与已有授权合并后写入"""
+        key = (user_id, client_id)
+        merged = self.get_granted_scopes(db, user_id, client_id) | frozenset(scopes)
+        scope = " ".join(sorted(merged))
+
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(UserAuthorization).values(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                client_id=client_id,
+                scope=scope
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "client_id"],
+                set_={"scope": stmt.excluded.scope}
+            )
+            db.execute(stmt)
+        else:
+            existing = db.query(UserAuthorization).filter(
+                UserAuthorization.user_id == user_id,
+                UserAuthorization.client_id == client_id
+            ).first()
+            if existing:
+                existing.scope = scope
+            else:
+                db.add(UserAuthorization(user_id=user_id, client_id=client_id, scope=scope))
+        db.commit()
+        self._remember(key, merged)
+
+
+consent_store = ConsentStore(settings.consent_cache_max_entries)
@@ -1,17 +1,26 @@
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List, Tuple
+from sqlalchemy import or_
 from sqlalchemy.orm import Session, joinedload
 from fastapi import HTTPException, status
 from app.models import (
     ApplicationPermissionGroup, UserApplicationAccess, User, ClientApplication
 )
 from app.schemas import PermissionCheckResponse
+from app.core.tracing import traced
+from app.services.access_expiry_service import access_expiry_scheduler
 import json
 
 
+def unexpired_access():
+    """未过期访问记录的查询条件：过期记录在被 access_expiry_scheduler 清理之前仍留在表中"""
+    return or_(UserApplicationAccess.expires_at.is_(None), UserApplicationAccess.expires_at > datetime.utcnow())
+
+
 class PermissionManagementService:
     
     @staticmethod
+    @traced("permission-check")
     def check_user_access(
         db: Session, 
         user_id: str, 
@@ -55,11 +64,8 @@ class PermissionManagementService:
             UserApplicationAccess.client_id == client_app.client_id
         ).first()
         
-        # 检查权限是否过期
+        # 检查权限是否过期（只读判断，过期记录由 access_expiry_scheduler 清理）
         if user_access and user_access.expires_at and user_access.expires_at < datetime.utcnow():
-            # 权限已过期，删除记录
-            db.delete(user_access)
-            db.commit()
             user_access = None
         
         # 确定最终的访问权限
@@ -222,6 +228,7 @@ class PermissionManagementService:
             
             db.commit()
             db.refresh(existing_access)
+            access_expiry_scheduler.schedule(user_id, client_id, expires_at)
             return existing_access
         else:
             # 创建新记录
@@ -239,6 +246,7 @@ class PermissionManagementService:
             db.add(new_access)
             db.commit()
             db.refresh(new_access)
+            access_expiry_scheduler.schedule(user_id, client_id, expires_at)
             return new_access
     
     @staticmethod
@@ -268,7 +276,7 @@ class PermissionManagementService:
         user_accesses = db.query(UserApplicationAccess).options(
             joinedload(UserApplicationAccess.user),
             joinedload(UserApplicationAccess.grantor)
-        ).filter(UserApplicationAccess.client_id == client_id).all()
+        ).filter(UserApplicationAccess.client_id == client_id, unexpired_access()).all()
         
         return {
             "permission_group": permission_group,
@@ -283,7 +291,8 @@ class PermissionManagementService:
             joinedload(UserApplicationAccess.client)
         ).filter(
             UserApplicationAccess.user_id == user_id,
-            UserApplicationAccess.access_type == "allowed"
+            UserApplicationAccess.access_type == "allowed",
+            unexpired_access()
         ).all()
         
         direct_clients = [access.client for access in direct_access]
@@ -295,17 +304,18 @@ class PermissionManagementService:
             ApplicationPermissionGroup.default_allowed == True
         ).all()
         
-        default_clients = []
-        for group in default_allowed_groups:
-            # 检查用户是否被明确拒绝
-            denied = db.query(UserApplicationAccess).filter(
+        # 用户被明确拒绝的应用（一次查出，不在循环里逐个查询）
+        denied_client_ids = {
+            client_id for (client_id,) in db.query(UserApplicationAccess.client_id).filter(
                 UserApplicationAccess.user_id == user_id,
-                UserApplicationAccess.client_id == group.client_id,
-                UserApplicationAccess.access_type == "denied"
-            ).first()
-            
-            if not denied:
-                default_clients.append(group.client)
+                UserApplicationAccess.access_type == "denied",
+                unexpired_access()
+            )
+        }
+        default_clients = [
+            group.client for group in default_allowed_groups
+            if group.client_id not in denied_client_ids
+        ]
         
         # 合并并去重
         all_clients = direct_clients + default_clients
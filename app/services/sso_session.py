@@ -0,0 +1,247 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from app.core.config import settings
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+
+
+def _session_key(token: str) -> str:
+    """会话存储只保存cookie值的哈希，泄露存储内容不会泄露可用的cookie"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class MemorySSOSessionStore:
+    """进程内SSO会话存储：key为cookie哈希，值为 (user_id, 创建时间, 最近访问时间)
+
+    另按用户记录会话key，修改密码或停用账号时可以结束该用户的全部会话。
+    """
+
+    def __init__(self, idle_timeout: int, absolute_timeout: int, max_entries: int):
+        self.idle_timeout = idle_timeout
+        self.absolute_timeout = absolute_timeout
+        self.max_entries = max_entries
+        self._sessions: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._user_keys: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, key: str) -> None:
+        """删除会话及其用户索引，调用方需持有锁"""
+        session = self._sessions.pop(key, None)
+        if session is None:
+            return
+        keys = self._user_keys.get(session[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[session[0]]
+
+    def create(self, user_id: str) -> str:
+        token = secrets.token_urlsafe(32)
+        key = _session_key(token)
+        now = time.time()
+        with self._lock:
+            self._sessions[key] = (user_id, now, now)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            if len(self._sessions) > self.max_entries:
+                self._drop(next(iter(self._sessions)))
+        return token
+
+    def get(self, token: str) -> Optional[str]:
+        """返回会话对应的user_id，并刷新空闲计时；过期时返回None"""
+        key = _session_key(token)
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                return None
+            user_id, created_at, last_seen = session
+            if now - last_seen > self.idle_timeout or now - created_at > self.absolute_timeout:
+                self._drop(key)
+                return None
+            self._sessions[key] = (user_id, created_at, now)
+            self._sessions.move_to_end(key)
+            return user_id
+
+    def delete(self, token: str) -> None:
+        with self._lock:
+            self._drop(_session_key(token))
+
+    def delete_user(self, user_id: str) -> None:
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._drop(key)
+
+
+class RedisSSOSessionStore:
+    """基于Redis的SSO会话存储，多个worker共享登录状态"""
+
+    key_prefix = "laaa:sso:"
+
+    def __init__(self, idle_timeout: int, absolute_timeout: int, client=None, key_prefix: Optional[str] = None):
+        if key_prefix:
+            self.key_prefix = key_prefix
+        if client is None:
+            from app.core.redis_client import get_redis
+            client = get_redis()
+        self.idle_timeout = idle_timeout
+        self.absolute_timeout = absolute_timeout
+        self.client = client
+
+    def _user_index(self, user_id: str) -> str:
+        return f"{self.key_prefix}user:{user_id}"
+
+    def create(self, user_id: str) -> str:
+        token = secrets.token_urlsafe(32)
+        key = self.key_prefix + _session_key(token)
+        value = f"{user_id}|{int(time.time())}"
+        pipe = self.client.pipeline()
+        pipe.set(key, value, ex=self.idle_timeout)
+        # 用户的会话索引：成员在会话过期后可能残留，最长保留一个绝对超时
+        pipe.sadd(self._user_index(user_id), key)
+        pipe.expire(self._user_index(user_id), self.absolute_timeout)
+        pipe.execute()
+        return token
+
+    def get(self, token: str) -> Optional[str]:
+        key = self.key_prefix + _session_key(token)
+        value = self.client.get(key)
+        if value is None:
+            return None
+        user_id, created_at = value.decode("utf-8").rsplit("|", 1)
+        remaining = self.absolute_timeout - (time.time() - int(created_at))
+        if remaining <= 0:
+            self.client.delete(key)
+            return None
+        # 空闲超时随访问顺延，但不超过绝对超时
+        self.client.expire(key, int(min(self.idle_timeout, remaining)) or 1)
+        return user_id
+
+    def delete(self, token: str) -> None:
+        self.client.delete(self.key_prefix + _session_key(token))
+
+    def delete_user(self, user_id: str) -> None:
+        index = self._user_index(user_id)
+        keys = self.client.smembers(index)
+        self.client.delete(index, *keys)
+
+
+class SSOSessionManager:
+    """授权端点使用的SSO会话入口，根据配置选择存储后端
+
+    未启用SSO会话时，密码登录后需要同意的授权请求使用一次性的待同意句柄：
+    只在同意页面提交回授权端点时有效，避免把密码带到同意页面。
+
+    提交同意还需要服务端签发的一次性同意票据。票据随同意页面地址下发，
+    并与浏览器的会话cookie、client_id和作用域绑定，仅凭cookie无法替用户同意。
+    """
+
+    pending_cookie_name = "laaa_consent"
+    pending_cookie_path = "/oauth/authorize"
+
+    def __init__(self):
+        self._store = None
+        self._pending_store = None
+
+    @property
+    def store(self):
+        if self._store is None:
+            if settings.sso_session_backend == "redis":
+                self._store = RedisSSOSessionStore(
+                    settings.sso_idle_timeout_seconds, settings.sso_absolute_timeout_seconds
+                )
+            else:
+                self._store = MemorySSOSessionStore(
+                    settings.sso_idle_timeout_seconds,
+                    settings.sso_absolute_timeout_seconds,
+                    settings.sso_session_max_entries
+                )
+        return self._store
+
+    @property
+    def pending_store(self):
+        if self._pending_store is None:
+            timeout = settings.consent_pending_timeout_seconds
+            if settings.sso_session_backend == "redis":
+                self._pending_store = RedisSSOSessionStore(timeout, timeout, key_prefix="laaa:consent:")
+            else:
+                self._pending_store = MemorySSOSessionStore(timeout, timeout, settings.sso_session_max_entries)
+        return self._pending_store
+
+    def create(self, user_id: str) -> str:
+        return self.store.create(user_id)
+
+    def get_user_id(self, token: Optional[str]) -> Optional[str]:
+        if not settings.sso_session_enabled or not token:
+            return None
+        return self.store.get(token)
+
+    def delete(self, token: Optional[str]) -> None:
+        if token:
+            self.store.delete(token)
+
+    def delete_user_sessions(self, user_id: str) -> None:
+        """结束用户的全部SSO会话和待同意句柄（修改密码、停用账号时调用）"""
+        self.store.delete_user(user_id)
+        self.pending_store.delete_user(user_id)
+
+    def set_cookie(self, response, token: str) -> None:
+        response.set_cookie(
+            settings.sso_cookie_name,
+            token,
+            max_age=settings.sso_absolute_timeout_seconds,
+            httponly=True,
+            secure=settings.sso_cookie_secure,
+            samesite="lax",
+            path="/"
+        )
+
+    def create_pending(self, user_id: str) -> str:
+        return self.pending_store.create(user_id)
+
+    def pop_pending_user_id(self, token: Optional[str]) -> Optional[str]:
+        """返回待同意句柄对应的user_id，句柄只能使用一次"""
+        if not token:
+            return None
+        user_id = self.pending_store.get(token)
+        self.pending_store.delete(token)
+        return user_id
+
+    @staticmethod
+    def _consent_signature(handle: str, session_token: Optional[str], client_id: str, scope: str) -> str:
+        scopes = " ".join(sorted(set(scope.split())))
+        message = "|".join([handle, session_token or "", client_id, scopes]).encode("utf-8")
+        return hmac.new(settings.secret_key.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+    def create_consent_ticket(self, user_id: str, session_token: Optional[str], client_id: str, scope: str) -> str:
+        """签发同意票据，session_token 为同意页面提交时浏览器携带的SSO会话或待同意句柄"""
+        handle = self.pending_store.create(user_id)
+        return f"{handle}.{self._consent_signature(handle, session_token, client_id, scope)}"
+
+    def pop_consent_ticket(
+        self, ticket: Optional[str], session_token: Optional[str], client_id: str, scope: str
+    ) -> Optional[str]:
+        """校验同意票据并返回签发时的user_id，票据只能使用一次"""
+        if not ticket or "." not in ticket:
+            return None
+        handle, signature = ticket.rsplit(".", 1)
+        expected = self._consent_signature(handle, session_token, client_id, scope)
+        if not hmac.compare_digest(signature, expected):
+            return None
+        return self.pop_pending_user_id(handle)
+
+    def set_pending_cookie(self, response, token: str) -> None:
+        response.set_cookie(
+            self.pending_cookie_name,
+            token,
+            max_age=settings.consent_pending_timeout_seconds,
+            httponly=True,
+            secure=settings.sso_cookie_secure,
+            samesite="lax",
+            path=self.pending_cookie_path
+        )
+
+
+sso_sessions = SSOSessionManager()
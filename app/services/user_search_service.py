@@ -0,0 +1,144 @@
+from typing import Dict, Any, List, Tuple
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+from app.models import User, USER_SEARCH_TEXT_SQL
+from app.services import USER_LIST_COLUMNS
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+# 前缀匹配按字段排序的优先级
+PREFIX_COLUMNS = (
+    ("username", User.username_lower),
+    ("email", User.email_lower),
+    ("full_name", User.full_name_lower),
+    ("nickname", User.nickname_lower),
+)
+
+# 全文匹配的最短查询长度（SQLite前缀索引从2个字符开始，pg_trgm需要3个字符）
+FULLTEXT_MIN_LENGTH = 2
+
+# 全文匹配最多取这么多候选再按相关度排序，避免宽泛查询对全部命中行打分
+FULLTEXT_CANDIDATES = 500
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    """前缀区间的上界：把最后一个字符加一，range查询可以直接使用B树索引"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class UserSearchService:
+
+    @staticmethod
+    def _prefix_matches(db: Session, query: str, limit: int) -> List[Tuple[str, str, bool]]:
+        """在各规范化列上做前缀匹配，返回 (user_id, 匹配字段, 是否完全匹配)"""
+        upper = _prefix_upper_bound(query)
+        matches = []
+        for field, column in PREFIX_COLUMNS:
+            rows = db.execute(
+                select(User.id, column.label("value"))
+                .where(column >= query, column < upper)
+                .order_by(column)
+                .limit(limit)
+            )
+            matches.extend((row.id, field, row.value == query) for row in rows)
+        return matches
+
+    @staticmethod
+    def _fulltext_matches(db: Session, query: str, limit: int) -> List[str]:
+        """模糊匹配，按相关度排序
+
+        SQLite使用FTS5：每个词按词前缀匹配（"smi" 可以找到 "Bob Smith"、"smith@corp.com"），
+        多个词需同时命中；PostgreSQL使用pg_trgm相似度。全文索引不存在时退回 LIKE 子串匹配。
+        """
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            try:
+                # 在保存点中查询，PostgreSQL上失败的语句不会使整个事务失效
+                with db.begin_nested():
+                    if dialect == "sqlite":
+                        return UserSearchService._fts5_matches(db, query, limit)
+                    return UserSearchService._trigram_matches(db, query, limit)
+            except (OperationalError, ProgrammingError) as e:
+                logger.warning(f"User full-text index unavailable, falling back to LIKE: {e}")
+        return UserSearchService._like_matches(db, query, limit)
+
+    @staticmethod
+    def _fts5_matches(db: Session, query: str, limit: int) -> List[str]:
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"*' for term in terms)
+        rows = db.execute(text(
+            "SELECT users.id, bm25(users_fts, 10.0, 5.0, 3.0, 3.0) AS score "
+            "FROM users_fts JOIN users ON users.rowid = users_fts.rowid "
+            "WHERE users_fts MATCH :match LIMIT :candidates"
+        ), {"match": match, "candidates": FULLTEXT_CANDIDATES}).all()
+        # bm25 越小越相关
+        rows.sort(key=lambda row: row.score)
+        return [row.id for row in rows[:limit]]
+
+    @staticmethod
+    def _trigram_matches(db: Session, query: str, limit: int) -> List[str]:
+        if len(query) < 3:
+            return []
+        rows = db.execute(text(
+            f"SELECT id FROM users WHERE {USER_SEARCH_TEXT_SQL} % :query "
+            f"ORDER BY similarity({USER_SEARCH_TEXT_SQL}, :query) DESC LIMIT :limit"
+        ), {"query": query, "limit": limit})
+        return [row.id for row in rows]
+
+    @staticmethod
+    def _like_matches(db: Session, query: str, limit: int) -> List[str]:
+        pattern = f"%{query}%"
+        rows = db.execute(
+            select(User.id).where(
+                User.username_lower.like(pattern) | User.email_lower.like(pattern) |
+                User.full_name_lower.like(pattern) | User.nickname_lower.like(pattern)
+            ).limit(limit)
+        )
+        return [row.id for row in rows]
+
+    @staticmethod
+    def search_users(db: Session, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """按用户名、邮箱、姓名和昵称搜索用户
+
+        排序：完全匹配 > 用户名/邮箱/姓名/昵称前缀匹配 > 全文模糊匹配（按相关度）。
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        ranked: Dict[str, Tuple[int, int, str]] = {}
+        has_exact = False
+        for position, (user_id, field, exact) in enumerate(UserSearchService._prefix_matches(db, query, limit)):
+            # 任一字段与查询完全相同时排在最前
+            tier = 0 if exact else [name for name, _ in PREFIX_COLUMNS].index(field) + 1
+            has_exact = has_exact or exact
+            if user_id not in ranked or tier < ranked[user_id][0]:
+                ranked[user_id] = (tier, position, field)
+
+        # 已经完全匹配到用户（如输入了完整邮箱）时不再做模糊匹配
+        if not has_exact and len(ranked) < limit and len(query) >= FULLTEXT_MIN_LENGTH:
+            for position, user_id in enumerate(UserSearchService._fulltext_matches(db, query, limit)):
+                ranked.setdefault(user_id, (len(PREFIX_COLUMNS) + 1, position, "fulltext"))
+
+        if not ranked:
+            return []
+
+        order = sorted(ranked, key=lambda user_id: ranked[user_id][:2])[:limit]
+        rows = {
+            row.id: row._asdict()
+            for row in db.execute(select(*USER_LIST_COLUMNS).where(User.id.in_(order)))
+        }
+
+        results = []
+        for user_id in order:
+            row = rows.get(user_id)
+            if row is not None:
+                row["match"] = ranked[user_id][2]
+                results.append(row)
+        return results
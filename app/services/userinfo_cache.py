@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Set, Tuple
+from app.core.config import settings
+from app.core.http_cache import PrecomputedBody
+from app.core.metrics import CACHE_REQUESTS
+from app.core.serialization import trusted_json
+from app.schemas import UserInfo
+import threading
+import time
+
+
+class UserInfoCache:
+    """序列化后的UserInfo响应缓存
+
+    key为 (sub, 作用域集合)。资料更新时调用 invalidate 删除该用户的全部条目，
+    按用户索引的key集合随条目一起淘汰，内存占用只与 max_entries 有关。
+    其它worker中的条目最多在 ttl_seconds 后过期。
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, PrecomputedBody]]" = OrderedDict()
+        self._keys_by_user: Dict[str, Set[Tuple]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, sub: str, scopes: List[str]) -> Tuple:
+        return (sub, frozenset(scopes))
+
+    def _forget(self, key: Tuple) -> None:
+        """从按用户的索引中移除key（调用方持有锁）"""
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def get(self, sub: str, scopes: List[str]) -> Optional[PrecomputedBody]:
+        now = time.monotonic()
+        with self._lock:
+            key = self._key(sub, scopes)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                    self._forget(key)
+                self.misses += 1
+                CACHE_REQUESTS.inc("userinfo", "miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            CACHE_REQUESTS.inc("userinfo", "hit")
+            return entry[1]
+
+    def put(self, sub: str, scopes: List[str], claims: Dict[str, Any]) -> PrecomputedBody:
+        body = PrecomputedBody(
+            trusted_json(UserInfo, claims),
+            media_type="application/json",
+            compress=False
+        )
+        key = self._key(sub, scopes)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, body)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(sub, set()).add(key)
+            if len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._forget(evicted)
+        return body
+
+    def invalidate(self, sub: str) -> None:
+        """用户资料变化后使该用户的所有缓存条目失效"""
+        with self._lock:
+            for key in self._keys_by_user.pop(sub, ()):
+                self._entries.pop(key, None)
+
+
+userinfo_cache = UserInfoCache(settings.userinfo_cache_max_entries, settings.userinfo_cache_ttl_seconds)
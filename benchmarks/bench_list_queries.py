@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+列表接口的内存与延迟基准测试：完整ORM实体 vs 列投影查询
+
+在临时SQLite文件中批量生成数据，分别测量从查询到JSON字节的耗时和 tracemalloc 峰值：
+
+    python benchmarks/bench_list_queries.py --users 100000 --clients 10000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker, joinedload
+from app.core.database import Base
+from app.core.security import security
+from app.core.serialization import dumps
+from app.models import User, ClientApplication
+from app.schemas import UserResponse, ClientApplicationResponse
+from app.services import UserService, ClientService
+
+
+def populate(session_factory, users: int, clients: int) -> None:
+    """批量写入测试数据，所有用户共用一个密码哈希"""
+    hashed_password = security.get_password_hash("benchmark-password")
+    start = datetime(2024, 1, 1)
+    user_ids = []
+    with session_factory() as db:
+        batch = []
+        for i in range(users):
+            user_id = str(uuid.uuid4())
+            user_ids.append(user_id)
+            batch.append({
+                "id": user_id,
+                "email": f"user{i}@example.com",
+                "username": f"user{i}",
+                "full_name": f"User {i}",
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "is_admin": i % 1000 == 0,
+                "email_verified": i % 3 == 0,
+                "locale": "zh-CN",
+                "created_at": start + timedelta(minutes=i)
+            })
+            if len(batch) == 5000:
+                db.execute(insert(User), batch)
+                batch = []
+        if batch:
+            db.execute(insert(User), batch)
+
+        batch = []
+        for i in range(clients):
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "client_id": uuid.uuid4().hex,
+                "client_secret": uuid.uuid4().hex,
+                "client_name": f"app-{i}",
+                "redirect_uris": json.dumps([f"https://app{i}.example.com/callback"]),
+                "owner_id": user_ids[i % len(user_ids)],
+                "is_active": True,
+                "created_at": start + timedelta(minutes=i)
+            })
+        if batch:
+            db.execute(insert(ClientApplication), batch)
+        db.commit()
+
+
+def fastapi_encode(adapter: TypeAdapter, value) -> bytes:
+    """FastAPI 默认的 response_model 校验 + json.dumps"""
+    validated = adapter.validate_python(value, from_attributes=True)
+    return json.dumps(adapter.dump_python(validated, mode="json"), ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def measure(name: str, session_factory, func) -> None:
+    """先不开启 tracemalloc 测量耗时，再单独测量内存峰值"""
+    gc.collect()
+    started = time.perf_counter()
+    with session_factory() as db:
+        body = func(db)
+    elapsed = time.perf_counter() - started
+    size = len(body)
+    del body
+
+    gc.collect()
+    tracemalloc.start()
+    with session_factory() as db:
+        func(db)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<28} time={elapsed * 1000:9.1f}ms  peak={peak / 1024 / 1024:8.1f}MiB  body={size / 1024 / 1024:6.1f}MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表查询基准测试")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--clients", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        populate(session_factory, args.users, args.clients)
+
+        users_adapter = TypeAdapter(List[UserResponse])
+        clients_adapter = TypeAdapter(List[ClientApplicationResponse])
+
+        def orm_clients(db):
+            clients = db.query(ClientApplication).options(joinedload(ClientApplication.owner)).all()
+            data = []
+            for client in clients:
+                client_data = client.__dict__.copy()
+                client_data["redirect_uris"] = json.loads(client.redirect_uris) if client.redirect_uris else []
+                client_data["contacts"] = json.loads(client.contacts) if client.contacts else []
+                data.append(client_data)
+            return fastapi_encode(clients_adapter, data)
+
+        print(f"users={args.users} clients={args.clients}")
+        measure("users: ORM entities", session_factory,
+                lambda db: fastapi_encode(users_adapter, db.query(User).all()))
+        measure("users: column projection", session_factory,
+                lambda db: dumps(UserService.list_users(db)))
+        measure("clients: ORM + joinedload", session_factory, orm_clients)
+        measure("clients: column projection", session_factory,
+                lambda db: dumps(ClientService.list_clients(db, with_owner=True)))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+热点JSON响应的序列化开销基准测试
+
+"before" 模拟FastAPI对返回值的默认处理：按 response_model 校验、导出为JSON兼容对象，
+再由 JSONResponse 调用 json.dumps；"after" 为 app.core.serialization 中的路径。
+不需要数据库，直接运行：
+
+    python benchmarks/bench_serialization.py --iterations 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from app.core import serialization
+from app.core.serialization import FastJSONResponse, client_to_dict, trusted_dump, trusted_json
+from app.schemas import TokenResponse, UserInfo, ClientApplicationResponse
+
+
+def starlette_render(content) -> bytes:
+    """starlette.responses.JSONResponse.render 的等价实现"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def fastapi_default(adapter: TypeAdapter, value) -> bytes:
+    """FastAPI serialize_response：校验 -> dump_python(mode="json") -> json.dumps"""
+    validated = adapter.validate_python(value, from_attributes=True)
+    return starlette_render(adapter.dump_python(validated, mode="json"))
+
+
+def legacy_client_dict(client) -> dict:
+    """重构前各端点中重复的 __dict__ 拷贝与JSON字段解析"""
+    client_data = client.__dict__.copy()
+    client_data["redirect_uris"] = json.loads(client.redirect_uris) if client.redirect_uris else []
+    client_data["contacts"] = json.loads(client.contacts) if client.contacts else []
+    client_data.pop("_sa_instance_state", None)
+    return client_data
+
+
+def sample_tokens() -> dict:
+    return {
+        "access_token": "a" * 420,
+        "token_type": "Bearer",
+        "expires_in": 1800,
+        "refresh_token": "r" * 300,
+        "scope": "openid profile email",
+        "id_token": "i" * 600
+    }
+
+
+def sample_claims() -> dict:
+    return {
+        "sub": str(uuid.uuid4()),
+        "name": "张三",
+        "preferred_username": "zhangsan",
+        "email": "zhangsan@example.com",
+        "email_verified": True,
+        "locale": "zh-CN",
+        "updated_at": 1700000000
+    }
+
+
+def sample_clients(count: int) -> list:
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(
+            id=str(uuid.uuid4()),
+            client_id=uuid.uuid4().hex,
+            client_secret=uuid.uuid4().hex * 2,
+            client_name=f"应用 {i}",
+            client_description="示例应用",
+            redirect_uris=json.dumps([f"https://app{i}.example.com/callback"]),
+            response_types="code",
+            grant_types="authorization_code,refresh_token",
+            scope="openid profile email",
+            client_uri=None, logo_uri=None, tos_uri=None, policy_uri=None,
+            contacts=json.dumps([f"admin{i}@example.com"]),
+            token_endpoint_auth_method="client_secret_post",
+            jwks_uri=None,
+            embed_claims_in_token=False,
+            claims_max_staleness_seconds=300,
+            owner_id=str(uuid.uuid4()),
+            is_active=True,
+            created_at=now,
+            updated_at=now
+        )
+        for i in range(count)
+    ]
+
+
+def report(name: str, before, after, iterations: int) -> None:
+    before_us = min(timeit.repeat(before, number=iterations, repeat=3)) / iterations * 1e6
+    after_us = min(timeit.repeat(after, number=iterations, repeat=3)) / iterations * 1e6
+    print(f"{name:<22} before={before_us:9.2f}us  after={after_us:9.2f}us  speedup={before_us / after_us:5.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON响应序列化基准测试")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=100, help="客户端列表的长度")
+    args = parser.parse_args()
+
+    print(f"orjson: {'enabled' if serialization.orjson is not None else 'not installed, using json fallback'}")
+
+    tokens = sample_tokens()
+    token_adapter = TypeAdapter(TokenResponse)
+    report(
+        "/oauth/token",
+        lambda: fastapi_default(token_adapter, TokenResponse(**tokens)),
+        lambda: FastJSONResponse(trusted_dump(TokenResponse, tokens)).body,
+        args.iterations
+    )
+
+    claims = sample_claims()
+    userinfo_adapter = TypeAdapter(UserInfo)
+    report(
+        "/oauth/userinfo",
+        lambda: fastapi_default(userinfo_adapter, UserInfo(**claims)),
+        lambda: trusted_json(UserInfo, claims),
+        args.iterations
+    )
+
+    clients = sample_clients(args.clients)
+    list_adapter = TypeAdapter(List[ClientApplicationResponse])
+    list_iterations = max(args.iterations // args.clients, 10)
+    report(
+        f"/clients (n={args.clients})",
+        lambda: fastapi_default(list_adapter, [legacy_client_dict(c) for c in clients]),
+        lambda: FastJSONResponse([client_to_dict(c) for c in clients]).body,
+        list_iterations
+    )
+
+
+if __name__ == "__main__":
+    main()
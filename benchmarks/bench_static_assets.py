@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+前端静态资源基准测试：逐个 FileResponse vs 内存索引 + 预压缩变体
+
+模拟一次登录页加载（HTML + 全部 _next 资源），比较单次加载的耗时和传输字节数：
+
+    python benchmarks/bench_static_assets.py --loads 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from fastapi.testclient import TestClient
+from app.core.static_assets import StaticAssetIndex
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend", "dist")
+
+
+def file_response_app() -> FastAPI:
+    """原来的实现：每个请求检查文件是否存在并从磁盘读取"""
+    app = FastAPI()
+
+    @app.get("/login")
+    async def serve_login():
+        return FileResponse(os.path.join(STATIC_DIR, "login", "index.html"))
+
+    @app.get("/_next/{file_path:path}")
+    async def serve_next_assets(file_path: str):
+        asset_path = os.path.join(STATIC_DIR, "_next", file_path)
+        if os.path.exists(asset_path):
+            return FileResponse(asset_path)
+        return {"error": "Not found"}, 404
+
+    return app
+
+
+def indexed_app(brotli_quality: int) -> FastAPI:
+    app = FastAPI()
+    assets = StaticAssetIndex(STATIC_DIR, brotli_quality=brotli_quality)
+    assets.load()
+
+    @app.get("/login")
+    async def serve_login(request: Request):
+        return assets.response(request, "login")
+
+    @app.get("/_next/{file_path:path}")
+    async def serve_next_assets(request: Request, file_path: str):
+        return assets.response(request, f"_next/{file_path}")
+
+    return app
+
+
+def page_load_paths() -> list:
+    """登录页及其引用的全部 _next 资源"""
+    paths = ["/login"]
+    for directory, _, filenames in os.walk(os.path.join(STATIC_DIR, "_next")):
+        for filename in filenames:
+            relative_path = os.path.relpath(os.path.join(directory, filename), STATIC_DIR)
+            paths.append("/" + relative_path.replace(os.sep, "/"))
+    return paths
+
+
+def measure(name: str, app: FastAPI, paths: list, loads: int) -> None:
+    headers = {"Accept-Encoding": "br, gzip"}
+    with TestClient(app) as client:
+        wire_bytes = 0
+        for path in paths:
+            response = client.get(path, headers=headers)
+            assert response.status_code == 200, path
+            wire_bytes += len(response.read()) if response.headers.get("content-encoding") is None \
+                else int(response.headers["content-length"])
+
+        started = time.perf_counter()
+        for _ in range(loads):
+            for path in paths:
+                client.get(path, headers=headers)
+        elapsed = time.perf_counter() - started
+    print(f"{name:<24} {elapsed / loads * 1000:8.2f}ms/page load  {wire_bytes / 1024:8.1f}KiB on the wire")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="静态资源基准测试")
+    parser.add_argument("--loads", type=int, default=200)
+    parser.add_argument("--brotli-quality", type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.isdir(STATIC_DIR):
+        sys.exit(f"frontend build not found: {STATIC_DIR}")
+    paths = page_load_paths()
+    print(f"{len(paths)} requests per page load")
+    measure("FileResponse", file_response_app(), paths, args.loads)
+    measure("in-memory index", indexed_app(args.brotli_quality), paths, args.loads)
+
+
+if __name__ == "__main__":
+    main()
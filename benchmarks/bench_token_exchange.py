@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+授权码换取令牌的查询次数与延迟基准测试
+
+对比旧的多次查询/两次提交流程与当前 OAuth2Service.exchange_code_for_tokens，
+在内存SQLite上运行，不依赖外部服务：
+
+    python benchmarks/bench_token_exchange.py --iterations 500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from fastapi import HTTPException
+from app.core.database import Base
+from app.core.security import security
+from app.models import User, ClientApplication, AuthorizationCode, OAuth2Token, UserAuthorization
+from app.services import OAuth2Service, ClientService
+from app.services.authorization_code_store import SQLAuthorizationCodeStore, AuthorizationCodeData
+
+
+def legacy_exchange(db, code, client_id, redirect_uri, code_verifier=None):
+    """重构前的换取流程，仅用于对比"""
+    auth_code = db.query(AuthorizationCode).filter(
+        AuthorizationCode.code == code,
+        AuthorizationCode.used == False
+    ).first()
+    if not auth_code:
+        raise HTTPException(status_code=400, detail="Invalid authorization code")
+    client = db.query(ClientApplication).filter(ClientApplication.client_id == client_id).first()
+    if auth_code.redirect_uri != redirect_uri or auth_code.client_id != client.client_id:
+        raise HTTPException(status_code=400, detail="Mismatch")
+    auth_code.used = True
+    db.commit()
+
+    user = db.query(User).filter(User.id == auth_code.user_id).first()
+    user_data = {
+        "id": user.id, "username": user.username, "email": user.email,
+        "full_name": user.full_name, "given_name": user.given_name,
+        "family_name": user.family_name, "middle_name": user.middle_name,
+        "nickname": user.nickname, "preferred_username": user.preferred_username,
+        "profile": user.profile, "picture": user.picture, "website": user.website,
+        "phone_number": user.phone_number, "phone_number_verified": user.phone_number_verified,
+        "email_verified": user.email_verified, "gender": user.gender,
+        "birthdate": user.birthdate, "zoneinfo": user.zoneinfo, "locale": user.locale
+    }
+    access_token = security.create_access_token({"sub": user.id, "client_id": client_id, "scope": auth_code.scope})
+    refresh_token = security.create_refresh_token({"sub": user.id, "client_id": client_id})
+    db.add(OAuth2Token(
+        access_token=access_token, refresh_token=refresh_token, scope=auth_code.scope,
+        user_id=user.id, client_id=client.client_id,
+        expires_at=datetime.utcnow() + timedelta(minutes=security.access_token_expire_minutes)
+    ))
+    existing_auth = db.query(UserAuthorization).filter(
+        UserAuthorization.user_id == user.id,
+        UserAuthorization.client_id == client.client_id
+    ).first()
+    if not existing_auth:
+        db.add(UserAuthorization(user_id=user.id, client_id=client.client_id, scope=auth_code.scope))
+    db.commit()
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "id_token": security.create_id_token(user_data, client_id, auth_code.nonce)
+    }
+
+
+def setup_database():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = Session()
+    user = User(email="bench@example.com", username="bench", hashed_password="x", full_name="Bench User")
+    db.add(user)
+    db.flush()
+    client = ClientApplication(
+        client_id="bench-client", client_secret="secret", client_name="Bench",
+        redirect_uris='["http://localhost/cb"]', owner_id=user.id
+    )
+    db.add(client)
+    db.commit()
+    user_id = user.id
+    db.close()
+    return engine, Session, user_id
+
+
+def issue_codes(Session, user_id, count):
+    store = SQLAuthorizationCodeStore()
+    db = Session()
+    codes = []
+    for _ in range(count):
+        data = AuthorizationCodeData(
+            code=security.generate_authorization_code(),
+            user_id=user_id,
+            client_id="bench-client",
+            redirect_uri="http://localhost/cb",
+            scope="openid profile email",
+            expires_at=datetime.utcnow() + timedelta(minutes=10)
+        )
+        store.save(db, data)
+        codes.append(data.code)
+    db.close()
+    return codes
+
+
+def run(name, engine, Session, codes, exchange):
+    counter = {"statements": 0}
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    latencies = []
+    try:
+        for code in codes:
+            db = Session()
+            started = time.perf_counter()
+            exchange(db, code)
+            latencies.append((time.perf_counter() - started) * 1000)
+            db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+
+    latencies.sort()
+    print(f"{name:<10} queries/exchange={counter['statements'] / len(codes):5.2f}  "
+          f"mean={statistics.mean(latencies):6.3f}ms  "
+          f"p50={latencies[len(latencies) // 2]:6.3f}ms  "
+          f"p99={latencies[int(len(latencies) * 0.99) - 1]:6.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark authorization code exchange")
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    engine, Session, user_id = setup_database()
+
+    def current(db, code):
+        # 与令牌端点一致：客户端已经由 get_client_by_id 加载
+        client = ClientService.get_client_by_id(db, "bench-client")
+        OAuth2Service.exchange_code_for_tokens(
+            db, code, "bench-client", "http://localhost/cb", client=client
+        )
+
+    def legacy(db, code):
+        ClientService.get_client_by_id(db, "bench-client")
+        legacy_exchange(db, code, "bench-client", "http://localhost/cb")
+
+    run("legacy", engine, Session, issue_codes(Session, user_id, args.iterations), legacy)
+    run("current", engine, Session, issue_codes(Session, user_id, args.iterations), current)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+用户搜索延迟基准测试
+
+在临时SQLite文件中生成大量用户（FTS5索引由触发器同步），随机抽取前缀、子串和
+完全匹配的查询词，报告 UserSearchService.search_users 的延迟分位数：
+
+    python benchmarks/bench_user_search.py --users 1000000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models import User, user_search_values
+from app.services.user_search_service import UserSearchService
+
+SYLLABLES = [
+    "an", "bo", "chen", "da", "el", "fa", "gu", "han", "li", "lin", "ma", "mei", "na", "ou",
+    "pe", "qi", "ra", "shu", "ta", "wei", "xi", "ya", "zhao", "zhou", "ka", "ro", "se", "vi"
+]
+DOMAINS = ["example.com", "corp.example", "mail.test", "university.edu", "dev.local"]
+
+
+def random_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def populate(session_factory, count: int, rng: random.Random) -> list:
+    """批量写入用户，返回采样的用户用于生成查询词"""
+    samples = []
+    with session_factory() as db:
+        batch = []
+        for i in range(count):
+            given, family = random_name(rng), random_name(rng)
+            values = {
+                "id": str(uuid.uuid4()),
+                "username": f"{given}{family}{i}",
+                "email": f"{given}.{family}{i}@{rng.choice(DOMAINS)}",
+                "full_name": f"{given.title()} {family.title()}",
+                "nickname": random_name(rng) if rng.random() < 0.3 else None,
+                "hashed_password": "x",
+                "is_active": True
+            }
+            values.update(user_search_values(values))
+            batch.append(values)
+            if rng.random() < 0.01:
+                samples.append(values)
+            if len(batch) == 10000:
+                db.execute(insert(User), batch)
+                batch = []
+        if batch:
+            db.execute(insert(User), batch)
+        db.commit()
+    return samples
+
+
+def build_queries(samples: list, count: int, rng: random.Random) -> list:
+    """前缀、子串、完全匹配三类查询各占三分之一"""
+    queries = []
+    for _ in range(count):
+        user = rng.choice(samples)
+        kind = rng.randrange(3)
+        if kind == 0:
+            queries.append(user["username"][:rng.randint(2, 6)])
+        elif kind == 1:
+            family = user["full_name"].split()[1]
+            queries.append(family[:rng.randint(3, len(family))] if len(family) > 3 else family)
+        else:
+            queries.append(user["email"])
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户搜索延迟基准测试")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'search.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+
+        started = time.perf_counter()
+        samples = populate(session_factory, args.users, rng)
+        print(f"populated {args.users} users in {time.perf_counter() - started:.1f}s")
+
+        queries = build_queries(samples, args.queries, rng)
+        latencies = []
+        with session_factory() as db:
+            for query in queries[:50]:
+                UserSearchService.search_users(db, query, args.limit)
+            for query in queries:
+                started = time.perf_counter()
+                UserSearchService.search_users(db, query, args.limit)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(f"queries={len(latencies)}  mean={statistics.mean(latencies):.2f}ms  "
+              f"p50={p50:.2f}ms  p99={p99:.2f}ms  max={latencies[-1]:.2f}ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+大规模合成数据集生成器：用户、客户端、权限组和单独授权、用户同意记录、令牌、授权码和多年的登录日志
+
+使用批量INSERT直接写表（不经过ORM对象和逐个bcrypt），分布接近生产环境：
+客户端的使用量和用户的活跃度都是长尾分布，登录集中在白天，大部分令牌和授权码已经过期。
+相同的 --seed 和 --end-date 生成相同的数据（bcrypt哈希的随机盐除外）：
+
+    python benchmarks/generate_dataset.py --database-url sqlite:///./bench.db
+    python benchmarks/generate_dataset.py --database-url postgresql://localhost/laaa_bench --users 5000000
+    python benchmarks/generate_dataset.py --database-url sqlite:///./small.db --users 10000 --clients 50 \\
+        --grants 2000 --consents 5000 --tokens 10000 --codes 1000 --logins 50000
+
+所有用户使用同一个密码（--password），第一个用户是管理员。
+令牌和授权码是随机字符串而不是签名的JWT，只能用于查询、内省和清理任务的测试。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+from random import Random
+from typing import Callable, Dict, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, insert, select, text
+from app.core.config import settings
+from app.core.database import Base
+from app.core.security import security
+from app.models import (
+    User, ClientApplication, ApplicationPermissionGroup, UserApplicationAccess, UserAuthorization,
+    OAuth2Token, AuthorizationCode, LoginLog, user_search_values
+)
+
+FIRST_NAMES = ["Wei", "Fang", "Min", "Jing", "Lei", "Yan", "Tao", "Hui", "Alex", "Sam", "Maria", "John",
+               "Anna", "David", "Emma", "Liam", "Noah", "Olivia", "Yuki", "Hana", "Ravi", "Priya", "Omar", "Lina"]
+LAST_NAMES = ["Wang", "Li", "Zhang", "Liu", "Chen", "Yang", "Huang", "Zhao", "Wu", "Zhou", "Smith", "Johnson",
+              "Brown", "Garcia", "Miller", "Davis", "Tanaka", "Sato", "Kim", "Park", "Singh", "Khan", "Nguyen"]
+LOCALES = (["zh-CN", "en-US", "zh-TW", "ja-JP", "en-GB", "ko-KR"], [60, 20, 6, 6, 5, 3])
+SCOPE_SETS = (["openid profile email", "openid profile", "openid email", "openid"], [70, 15, 10, 5])
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0",
+    "python-requests/2.31.0",
+]
+FAILURE_REASONS = (["Invalid credentials", "Account locked", "Permission denied", "Invalid client"], [80, 8, 8, 4])
+LOCATIONS = [("CN", "Beijing"), ("CN", "Shanghai"), ("CN", "Shenzhen"), ("CN", "Hangzhou"), ("CN", "Chengdu"),
+             ("US", "San Francisco"), ("US", "New York"), ("JP", "Tokyo"), ("SG", "Singapore"), ("DE", "Berlin")]
+# 登录时间的小时分布（UTC+8 白天多、凌晨少）
+HOUR_WEIGHTS = [2, 1, 1, 1, 1, 2, 4, 8, 14, 18, 18, 16, 12, 14, 17, 17, 15, 12, 10, 10, 9, 7, 5, 3]
+
+
+class Skewed:
+    """按权重抽取下标，用累计权重二分查找，百万级元素也只需 O(log n)"""
+
+    def __init__(self, weights: List[float]):
+        self.cumulative = list(accumulate(weights))
+        self.total = self.cumulative[-1]
+
+    def pick(self, rng: Random) -> int:
+        return bisect(self.cumulative, rng.random() * self.total)
+
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+class Generator:
+    def __init__(self, engine, args):
+        self.engine = engine
+        self.args = args
+        self.rng = Random(args.seed)
+        self.end = datetime.combine(args.end_date, datetime.min.time())
+        self.start = self.end - timedelta(days=args.days)
+        # 用户ID由编号推导（随机高位 + 编号低位），不需要在内存中保存上百万个字符串
+        self.user_id_base = self.rng.getrandbits(128) & ~((1 << 62) - 1)
+        # 每个用户的注册时间（距 start 的秒数），登录日志等不会早于注册时间
+        self.user_created: List[float] = []
+        self.client_ids: List[str] = []
+        self.group_ids: List[str] = []
+        self.client_popularity: Optional[Skewed] = None
+        self.hours = Skewed(HOUR_WEIGHTS)
+
+    def user_id(self, index: int) -> str:
+        return str(uuid.UUID(int=self.user_id_base | index, version=4))
+
+    def user_activity(self, rng: Random) -> int:
+        """按活跃度抽取用户编号：少数用户贡献大部分登录和令牌"""
+        return int(self.args.users * rng.random() ** 3)
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def token(self) -> str:
+        return f"{self.rng.getrandbits(256):064x}"
+
+    def write(self, table, total: int, rows: Callable[[], Iterator[Dict]]) -> None:
+        """按 --batch-size 分批执行多行INSERT，并打印进度"""
+        started = time.perf_counter()
+        written = 0
+        batch = []
+        with self.engine.connect() as conn:
+            for row in rows():
+                batch.append(row)
+                if len(batch) >= self.args.batch_size:
+                    conn.execute(insert(table), batch)
+                    conn.commit()
+                    written += len(batch)
+                    batch = []
+                    elapsed = time.perf_counter() - started
+                    print(f"\r  {table.name}: {written}/{total} ({written / elapsed:,.0f} rows/s)", end="", flush=True)
+            if batch:
+                conn.execute(insert(table), batch)
+                conn.commit()
+                written += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"\r  {table.name}: {written} rows in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)   ")
+
+    def random_time(self, rng: Random, after: float = 0.0, within_days: Optional[float] = None) -> datetime:
+        """在 [注册时间, end] 之间按日内小时分布抽取时间；within_days 限制为最近若干天"""
+        span = self.args.days * 86400
+        low = max(after, span - within_days * 86400) if within_days else after
+        day = int((low + rng.random() * (span - low)) // 86400)
+        seconds = day * 86400 + self.hours.pick(rng) * 3600 + rng.random() * 3600
+        return self.start + timedelta(seconds=min(max(seconds, low), span))
+
+    def users(self) -> Iterator[Dict]:
+        rng = self.rng
+        password_hash = security.get_password_hash(self.args.password)
+        span = self.args.days * 86400
+        prefix = self.args.prefix
+        for i in range(self.args.users):
+            # 用户数量逐年增长：注册时间偏向近期
+            created = span * (1 - rng.random() ** 2)
+            self.user_created.append(created)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            row = {
+                "id": self.user_id(i),
+                "username": f"{prefix}{i}",
+                "email": f"{prefix}{i}@example.com",
+                "hashed_password": password_hash,
+                "full_name": f"{first} {last}",
+                "given_name": first,
+                "family_name": last,
+                "nickname": f"{first.lower()}{rng.randrange(1000)}" if rng.random() < 0.4 else None,
+                "is_active": i == 0 or rng.random() < 0.97,
+                "is_admin": i == 0 or rng.random() < 0.0005,
+                "email_verified": rng.random() < 0.85,
+                "phone_number": f"+86 1{rng.randrange(30, 90)}{rng.randrange(10 ** 8):08d}" if rng.random() < 0.3 else None,
+                "locale": rng.choices(*LOCALES)[0],
+                "zoneinfo": "Asia/Shanghai",
+                "created_at": self.start + timedelta(seconds=created)
+            }
+            row.update(user_search_values(row))
+            yield row
+
+    def clients(self) -> Iterator[Dict]:
+        rng = self.rng
+        for i in range(self.args.clients):
+            client_id = f"{self.args.prefix}-client-{i:06d}"
+            self.client_ids.append(client_id)
+            # 客户端大多由少量开发者账号创建
+            owner = int(min(self.args.users, 1000) * rng.random() ** 2)
+            yield {
+                "id": self.new_id(),
+                "client_id": client_id,
+                "client_secret": self.token(),
+                "client_name": f"App {i}",
+                "redirect_uris": json.dumps([f"https://app{i}.example.com/callback"]),
+                "owner_id": self.user_id(owner),
+                "embed_claims_in_token": rng.random() < 0.1,
+                "is_active": rng.random() < 0.95,
+                "created_at": self.start + timedelta(seconds=self.user_created[owner] + rng.random() * 86400 * 30)
+            }
+        # 排名靠前的客户端承担大部分流量
+        self.client_popularity = Skewed(zipf_weights(len(self.client_ids), 1.1))
+
+    def permission_groups(self) -> Iterator[Dict]:
+        for client_id in self.client_ids:
+            group_id = self.new_id()
+            self.group_ids.append(group_id)
+            yield {
+                "id": group_id,
+                "client_id": client_id,
+                "name": "默认权限组",
+                "default_allowed": self.rng.random() < 0.7,
+                "allowed_scopes": json.dumps(["openid", "profile", "email"])
+            }
+
+    def pairs(self, count: int) -> Iterator[tuple]:
+        """不重复的 (用户编号, 客户端编号)，用户按活跃度、客户端按热度抽取"""
+        seen = set()
+        attempts = 0
+        while len(seen) < count and attempts < count * 10:
+            attempts += 1
+            pair = (self.user_activity(self.rng), self.client_popularity.pick(self.rng))
+            if pair not in seen:
+                seen.add(pair)
+                yield pair
+
+    def grants(self) -> Iterator[Dict]:
+        rng = self.rng
+        for user_index, client_index in self.pairs(self.args.grants):
+            granted = self.random_time(rng, self.user_created[user_index])
+            expires = None
+            if rng.random() < 0.2:
+                # 一部分临时授权，其中约一半已经过期
+                expires = granted + timedelta(days=rng.choice([7, 30, 90, 365]))
+            yield {
+                "id": self.new_id(),
+                "user_id": self.user_id(user_index),
+                "client_id": self.client_ids[client_index],
+                "permission_group_id": self.group_ids[client_index],
+                "access_type": rng.choices(["allowed", "denied"], [85, 15])[0],
+                "custom_scopes": json.dumps(["openid", "profile"]) if rng.random() < 0.1 else None,
+                "granted_by": self.user_id(0),
+                "granted_at": granted,
+                "expires_at": expires,
+                "created_at": granted
+            }
+
+    def consents(self) -> Iterator[Dict]:
+        for user_index, client_index in self.pairs(self.args.consents):
+            yield {
+                "id": self.new_id(),
+                "user_id": self.user_id(user_index),
+                "client_id": self.client_ids[client_index],
+                "scope": self.rng.choices(*SCOPE_SETS)[0],
+                "created_at": self.random_time(self.rng, self.user_created[user_index])
+            }
+
+    def tokens(self) -> Iterator[Dict]:
+        rng = self.rng
+        lifetime = timedelta(minutes=security.access_token_expire_minutes)
+        for _ in range(self.args.tokens):
+            user_index = self.user_activity(rng)
+            # 令牌表通常只保留最近一段时间的记录
+            created = self.random_time(rng, self.user_created[user_index], within_days=self.args.token_days)
+            yield {
+                "id": self.new_id(),
+                "access_token": self.token(),
+                "refresh_token": self.token(),
+                "token_type": "Bearer",
+                "scope": rng.choices(*SCOPE_SETS)[0],
+                "user_id": self.user_id(user_index),
+                "client_id": self.client_ids[self.client_popularity.pick(rng)],
+                "expires_at": created + lifetime,
+                "created_at": created,
+                "revoked": rng.random() < 0.1
+            }
+
+    def codes(self) -> Iterator[Dict]:
+        rng = self.rng
+        for _ in range(self.args.codes):
+            user_index = self.user_activity(rng)
+            created = self.random_time(rng, self.user_created[user_index], within_days=1)
+            client_index = self.client_popularity.pick(rng)
+            yield {
+                "id": self.new_id(),
+                "code": self.token(),
+                "user_id": self.user_id(user_index),
+                "client_id": self.client_ids[client_index],
+                "redirect_uri": f"https://app{client_index}.example.com/callback",
+                "scope": rng.choices(*SCOPE_SETS)[0],
+                "code_challenge": self.token()[:43] if rng.random() < 0.6 else None,
+                "code_challenge_method": "S256",
+                "expires_at": created + timedelta(minutes=10),
+                "used": rng.random() < 0.9,
+                "created_at": created
+            }
+
+    def logins(self) -> Iterator[Dict]:
+        rng = self.rng
+        for _ in range(self.args.logins):
+            user_index = self.user_activity(rng)
+            oauth = rng.random() < 0.45
+            success = rng.random() < 0.93
+            country, city = LOCATIONS[int(len(LOCATIONS) * rng.random() ** 2)]
+            yield {
+                "id": self.new_id(),
+                "user_id": self.user_id(user_index),
+                "login_time": self.random_time(rng, self.user_created[user_index]),
+                "ip_address": f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+                "user_agent": USER_AGENTS[int(len(USER_AGENTS) * rng.random() ** 1.5)],
+                "login_method": "oauth" if oauth else "password",
+                "success": success,
+                "failure_reason": None if success else rng.choices(*FAILURE_REASONS)[0],
+                "client_id": self.client_ids[self.client_popularity.pick(rng)] if oauth else None,
+                "country": country,
+                "city": city
+            }
+
+    def write_users(self) -> None:
+        """SQLite的全文索引由插入触发器逐行维护，批量写入时先去掉触发器，写完后一次性重建索引"""
+        trigger_sql = None
+        if self.engine.dialect.name == "sqlite":
+            with self.engine.begin() as conn:
+                trigger_sql = conn.execute(text(
+                    "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'users_fts_ai'"
+                )).scalar()
+                if trigger_sql:
+                    conn.execute(text("DROP TRIGGER users_fts_ai"))
+        try:
+            self.write(User.__table__, self.args.users, self.users)
+        finally:
+            if trigger_sql:
+                started = time.perf_counter()
+                with self.engine.begin() as conn:
+                    conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+                    conn.execute(text(trigger_sql))
+                print(f"  users_fts: rebuilt in {time.perf_counter() - started:.1f}s")
+
+    def run(self) -> None:
+        args = self.args
+        self.write_users()
+        self.write(ClientApplication.__table__, args.clients, self.clients)
+        self.write(ApplicationPermissionGroup.__table__, args.clients, self.permission_groups)
+        self.write(UserApplicationAccess.__table__, args.grants, self.grants)
+        self.write(UserAuthorization.__table__, args.consents, self.consents)
+        self.write(OAuth2Token.__table__, args.tokens, self.tokens)
+        self.write(AuthorizationCode.__table__, args.codes, self.codes)
+        self.write(LoginLog.__table__, args.logins, self.logins)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a large synthetic dataset")
+    parser.add_argument("--database-url", default=settings.database_url,
+                        help="目标数据库，默认 DATABASE_URL（注意不要写入正在使用的数据库）")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--clients", type=int, default=2_000)
+    parser.add_argument("--grants", type=int, default=200_000, help="用户对应用的单独授权/拒绝记录")
+    parser.add_argument("--consents", type=int, default=500_000, help="用户同意记录")
+    parser.add_argument("--tokens", type=int, default=1_000_000)
+    parser.add_argument("--codes", type=int, default=50_000)
+    parser.add_argument("--logins", type=int, default=5_000_000)
+    parser.add_argument("--days", type=int, default=3 * 365, help="数据覆盖的天数（登录日志历史长度）")
+    parser.add_argument("--token-days", type=int, default=30, help="令牌创建时间的范围（最近天数）")
+    parser.add_argument("--end-date", type=lambda value: datetime.strptime(value, "%Y-%m-%d").date(),
+                        default=datetime.utcnow().date(), help="数据的截止日期（YYYY-MM-DD），默认今天")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5_000)
+    parser.add_argument("--prefix", default="synthetic", help="用户名和客户端ID的前缀")
+    parser.add_argument("--password", default="password123", help="所有用户共用的密码")
+    args = parser.parse_args()
+
+    if args.users < 1 or args.clients < 1:
+        parser.error("--users and --clients must be at least 1")
+
+    engine = create_engine(args.database_url)
+    if engine.dialect.name == "sqlite":
+        # 生成数据时不需要每次提交都落盘
+        @event.listens_for(engine, "connect")
+        def _fast_sqlite(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA journal_mode=WAL")
+            # 大的页缓存让随机UUID主键和搜索列索引的插入少做磁盘读写
+            cursor.execute("PRAGMA cache_size=-524288")
+            cursor.close()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        if conn.execute(select(User.id).where(User.username == f"{args.prefix}0")).first():
+            print(f"用户 {args.prefix}0 已存在，请使用新的数据库或指定 --prefix")
+            sys.exit(1)
+
+    print(f"Generating into {engine.url.render_as_string(hide_password=True)} (seed={args.seed})")
+    started = time.perf_counter()
+    Generator(engine, args).run()
+    print(f"Done in {time.perf_counter() - started:.1f}s; admin login: {args.prefix}0 / {args.password}")
+
+
+if __name__ == "__main__":
+    main()
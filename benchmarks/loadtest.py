@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+OAuth 完整流程压测：按比例混合 authorize/token、refresh、userinfo、introspect、revoke，
+在目标并发下持续运行，按步骤输出吞吐量和延迟分位数
+
+测试用户和客户端通过公开API自行创建（注册、登录、创建客户端），不依赖已有数据：
+
+    python benchmarks/loadtest.py                      # 进程内ASGI，临时SQLite，无需启动服务
+    python benchmarks/loadtest.py --concurrency 64 --duration 30
+    python benchmarks/loadtest.py --url http://localhost:8000 --mix authorize=1,userinfo=10
+    python benchmarks/loadtest.py --json results.json
+
+流程（--mix 中的名称）：
+    authorize   POST /oauth/authorize 密码登录并签发授权码，随后 POST /oauth/token 换取令牌
+    refresh     使用刷新令牌换取新令牌（原令牌被撤销）
+    userinfo    GET /oauth/userinfo
+    introspect  GET /oauth/introspect
+    revoke      POST /oauth/revoke 撤销一个令牌
+
+对运行中的服务压测时，限流（RATE_LIMIT_ENABLED）会让大部分请求返回429，
+通常应关闭限流后再测；进程内模式默认关闭限流，--rate-limits 保留限流。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+FLOWS = ("authorize", "refresh", "userinfo", "introspect", "revoke")
+DEFAULT_MIX = "authorize=2,refresh=1,userinfo=6,introspect=2,revoke=1"
+PASSWORD = "loadtest-password"
+REDIRECT_URI = "http://loadtest.invalid/callback"
+SCOPE = "openid profile email"
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in FLOWS:
+            raise argparse.ArgumentTypeError(f"unknown flow {name!r}, expected one of {', '.join(FLOWS)}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("mix needs at least one flow with a positive weight")
+    return mix
+
+
+class Stats:
+    """按步骤记录延迟（毫秒）和状态码"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.flows: Counter = Counter()
+        self.failed_flows: Counter = Counter()
+
+    def record(self, step: str, status: int, started: float) -> None:
+        self.latencies[step].append((time.perf_counter() - started) * 1000)
+        self.statuses[step][status] += 1
+
+    def report(self, elapsed: float) -> List[dict]:
+        rows = []
+        for step in sorted(self.latencies):
+            latencies = sorted(self.latencies[step])
+            statuses = self.statuses[step]
+            errors = sum(count for status, count in statuses.items() if status >= 400 or status == 0)
+            rows.append({
+                "step": step,
+                "requests": len(latencies),
+                "errors": errors,
+                "rps": round(len(latencies) / elapsed, 1),
+                "mean_ms": round(sum(latencies) / len(latencies), 2),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p90_ms": round(percentile(latencies, 90), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "max_ms": round(latencies[-1], 2),
+                "statuses": {str(status): count for status, count in sorted(statuses.items())}
+            })
+        return rows
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoadTest:
+    def __init__(self, http: httpx.AsyncClient, args):
+        self.http = http
+        self.args = args
+        self.stats = Stats()
+        self.users: List[str] = []
+        self.clients: List[dict] = []
+        # 已签发、尚未撤销的令牌；使用时取出，用完放回，避免并发的 refresh/revoke 让其它请求拿到失效令牌
+        self.tokens: List[dict] = []
+
+    async def request(self, step: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(step, 0, started)
+            return None
+        self.stats.record(step, response.status_code, started)
+        return response
+
+    async def provision(self) -> None:
+        """注册测试用户，用第一个用户登录并创建客户端"""
+        run_id = uuid.uuid4().hex[:8]
+        for i in range(self.args.users):
+            username = f"lt{run_id}_{i}"
+            response = await self.http.post("/api/v1/users", json={
+                "username": username,
+                "email": f"{username}@example.com",
+                "password": PASSWORD,
+                "full_name": f"Load Test {i}"
+            })
+            response.raise_for_status()
+            self.users.append(username)
+
+        response = await self.http.post("/api/v1/auth/login", json={"username": self.users[0], "password": PASSWORD})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for i in range(self.args.clients):
+            response = await self.http.post("/api/v1/clients", headers=headers, json={
+                "client_name": f"loadtest-{run_id}-{i}",
+                "redirect_uris": [REDIRECT_URI]
+            })
+            response.raise_for_status()
+            client = response.json()
+            self.clients.append({"client_id": client["client_id"], "client_secret": client["client_secret"]})
+
+    async def flow_authorize(self, rng: random.Random) -> bool:
+        client = rng.choice(self.clients)
+        response = await self.request("authorize", "POST", "/oauth/authorize", data={
+            "username": rng.choice(self.users),
+            "password": PASSWORD,
+            "client_id": client["client_id"],
+            "redirect_uri": REDIRECT_URI,
+            "scope": SCOPE,
+            "state": "loadtest",
+            "consent": "true"
+        })
+        if response is None or response.status_code not in (302, 303, 307):
+            return False
+        code = parse_qs(urlparse(response.headers.get("location", "")).query).get("code")
+        if not code:
+            return False
+
+        response = await self.request("token", "POST", "/oauth/token", data={
+            "grant_type": "authorization_code",
+            "code": code[0],
+            "redirect_uri": REDIRECT_URI,
+            **client
+        })
+        if response is None or response.status_code != 200:
+            return False
+        body = response.json()
+        self.tokens.append({
+            "access_token": body["access_token"],
+            "refresh_token": body["refresh_token"],
+            "client": client
+        })
+        return True
+
+    async def take_token(self, rng: random.Random) -> Optional[dict]:
+        if not self.tokens:
+            await self.flow_authorize(rng)
+        if not self.tokens:
+            return None
+        return self.tokens.pop(rng.randrange(len(self.tokens)))
+
+    async def flow_refresh(self, rng: random.Random) -> bool:
+        token = await self.take_token(rng)
+        if token is None:
+            return False
+        response = await self.request("refresh", "POST", "/oauth/token", data={
+            "grant_type": "refresh_token",
+            "refresh_token": token["refresh_token"],
+            **token["client"]
+        })
+        if response is None or response.status_code != 200:
+            return False
+        body = response.json()
+        self.tokens.append(dict(token, access_token=body["access_token"], refresh_token=body["refresh_token"]))
+        return True
+
+    async def flow_userinfo(self, rng: random.Random) -> bool:
+        token = await self.take_token(rng)
+        if token is None:
+            return False
+        try:
+            response = await self.request("userinfo", "GET", "/oauth/userinfo", headers={
+                "Authorization": f"Bearer {token['access_token']}"
+            })
+        finally:
+            self.tokens.append(token)
+        return response is not None and response.status_code == 200
+
+    async def flow_introspect(self, rng: random.Random) -> bool:
+        token = await self.take_token(rng)
+        if token is None:
+            return False
+        try:
+            # 内省端点使用GET并从表单读取参数
+            response = await self.request("introspect", "GET", "/oauth/introspect", data={
+                "token": token["access_token"],
+                **token["client"]
+            })
+        finally:
+            self.tokens.append(token)
+        return response is not None and response.status_code == 200 and response.json().get("active") is True
+
+    async def flow_revoke(self, rng: random.Random) -> bool:
+        token = await self.take_token(rng)
+        if token is None:
+            return False
+        response = await self.request("revoke", "POST", "/oauth/revoke", data={
+            "token": token["access_token"],
+            **token["client"]
+        })
+        return response is not None and response.status_code == 200
+
+    async def worker(self, index: int, deadline: float, remaining: List[int]) -> None:
+        rng = random.Random(self.args.seed * 1000 + index)
+        names = list(self.args.mix)
+        weights = [self.args.mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            name = rng.choices(names, weights)[0]
+            self.stats.flows[name] += 1
+            if not await getattr(self, f"flow_{name}")(rng):
+                self.stats.failed_flows[name] += 1
+
+    async def run(self) -> dict:
+        await self.provision()
+        # 预先签发一批令牌，refresh/userinfo 等流程开始时就有令牌可用
+        warmup_rng = random.Random(self.args.seed)
+        for _ in range(min(self.args.concurrency, 50)):
+            await self.flow_authorize(warmup_rng)
+        self.stats = Stats()
+
+        remaining = [self.args.flows] if self.args.flows else None
+        started = time.perf_counter()
+        deadline = started + self.args.duration
+        await asyncio.gather(*(self.worker(i, deadline, remaining) for i in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - started
+        return {
+            "target": self.args.url or "in-process",
+            "concurrency": self.args.concurrency,
+            "elapsed_seconds": round(elapsed, 3),
+            "flows": dict(self.stats.flows),
+            "failed_flows": dict(self.stats.failed_flows),
+            "flows_per_second": round(sum(self.stats.flows.values()) / elapsed, 1),
+            "steps": self.stats.report(elapsed)
+        }
+
+
+def print_report(result: dict) -> None:
+    print(f"target={result['target']} concurrency={result['concurrency']} "
+          f"elapsed={result['elapsed_seconds']}s flows/s={result['flows_per_second']}")
+    for name, count in sorted(result["flows"].items()):
+        print(f"  flow {name:<11} {count:>7} runs  {result['failed_flows'].get(name, 0):>6} failed")
+    print()
+    print(f"{'step':<11} {'requests':>9} {'errors':>7} {'req/s':>8} {'mean':>8} "
+          f"{'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  statuses")
+    for row in result["steps"]:
+        statuses = " ".join(f"{status}x{count}" for status, count in row["statuses"].items())
+        print(f"{row['step']:<11} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8} "
+              f"{row['mean_ms']:>7.2f}ms {row['p50_ms']:>6.2f}ms {row['p90_ms']:>6.2f}ms "
+              f"{row['p99_ms']:>6.2f}ms {row['max_ms']:>6.2f}ms  {statuses}")
+
+
+async def run_remote(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as http:
+        return await LoadTest(http, args).run()
+
+
+async def run_in_process(args) -> dict:
+    from app.core.config import settings
+    import main
+
+    if not args.rate_limits:
+        settings.rate_limit_enabled = False
+        settings.login_throttle_enabled = False
+    # ASGITransport 不会触发 startup/shutdown 事件，手动进入应用的 lifespan
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app, client=("127.0.0.1", 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as http:
+            return await LoadTest(http, args).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OAuth flow load test")
+    parser.add_argument("--url", help="压测运行中的服务（如 http://localhost:8000）；不指定时在进程内运行应用")
+    parser.add_argument("--database-url", help="进程内模式使用的数据库，默认临时SQLite文件")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"流程权重，默认 {DEFAULT_MIX}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长（秒）")
+    parser.add_argument("--flows", type=int, help="总流程数上限，达到后提前结束")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rate-limits", action="store_true", help="进程内模式保留限流和登录节流")
+    parser.add_argument("--json", help="把结果写入JSON文件")
+    args = parser.parse_args()
+
+    if args.url:
+        result = asyncio.run(run_remote(args))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            # 必须在导入应用之前设置，数据库引擎在导入时创建
+            os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'loadtest.db')}"
+            result = asyncio.run(run_in_process(args))
+
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+启动耗时分析：导入耗时报告 + 每个worker的就绪时间
+
+导入耗时来自 `python -X importtime -c "import main"`，按顶层包汇总自身耗时并列出
+累计耗时最高的模块；就绪时间是从启动 uvicorn 到 /health 首次返回200的墙钟时间，
+分别在 AUTO_CREATE_TABLES 开启和关闭时测量：
+
+    python benchmarks/profile_startup.py --runs 5
+    python benchmarks/profile_startup.py --database-url postgresql://... --skip-imports
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_report(env: dict, top: int) -> None:
+    """运行 -X importtime 并打印按包汇总的自身耗时和累计耗时最高的模块"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    packages = defaultdict(int)
+    for name, self_us, _ in modules:
+        packages[name.split(".")[0]] += self_us
+    total = sum(packages.values())
+
+    print(f"import main: {total / 1000:.1f}ms total ({len(modules)} modules)")
+    print(f"\n{'package':<32}{'self ms':>10}{'share':>8}")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<32}{self_us / 1000:>10.1f}{self_us / total:>8.1%}")
+
+    print(f"\n{'module':<48}{'cumulative ms':>14}")
+    for name, _, cumulative_us in sorted(modules, key=lambda item: -item[2])[:top]:
+        print(f"{name:<48}{cumulative_us / 1000:>14.1f}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_ready(env: dict, timeout: float) -> float:
+    """启动一个uvicorn worker，返回 /health 首次可用的耗时（秒）"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError("worker did not become ready in time")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时分析")
+    parser.add_argument("--runs", type=int, default=5, help="每种配置启动的次数")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--database-url", help="默认使用临时SQLite文件")
+    parser.add_argument("--skip-imports", action="store_true", help="只测量就绪时间")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        env["ACCESS_EXPIRY_SCHEDULER_ENABLED"] = "false"
+
+        if not args.skip_imports:
+            import_report(env, args.top)
+            print()
+
+        # 先建好表，之后的启动都只是检查已有表结构
+        time_to_ready(dict(env, AUTO_CREATE_TABLES="true"), args.timeout)
+        for auto_create in ("true", "false"):
+            timings = [time_to_ready(dict(env, AUTO_CREATE_TABLES=auto_create), args.timeout) * 1000
+                       for _ in range(args.runs)]
+            print(f"AUTO_CREATE_TABLES={auto_create:<6} time-to-ready  "
+                  f"median={statistics.median(timings):.0f}ms  min={min(timings):.0f}ms  max={max(timings):.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
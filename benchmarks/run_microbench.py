@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+SecurityManager 和 OAuth2Service 热点路径的微基准测试
+
+在内存SQLite和固定随机种子生成的数据集上运行，结果写入JSON，
+可以与之前保存的结果对比，任一项变慢超过阈值时以非0状态退出：
+
+    python benchmarks/run_microbench.py --output baseline.json
+    python benchmarks/run_microbench.py --baseline baseline.json --threshold 0.15
+    python benchmarks/run_microbench.py --filter jwt --rounds 9
+
+每项先预热并校准每轮的调用次数，使一轮耗时约 --min-time 秒，
+再运行 --rounds 轮，取每次调用耗时的中位数作为比较依据。
+"""
+
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.database import Base
+from app.core.security import security
+from app.models import User, ClientApplication, ApplicationPermissionGroup, UserApplicationAccess
+from app.services import OAuth2Service, UserService
+from app.services.authorization_code_store import AuthorizationCodeData, get_authorization_code_store
+from app.services.permission_management_service import PermissionManagementService
+
+REDIRECT_URI = "http://localhost/cb"
+SCOPES = ["openid", "profile", "email"]
+
+
+class Dataset:
+    """内存SQLite中的测试数据：用户、客户端、权限组和一部分用户的单独授权"""
+
+    def __init__(self, users: int, clients: int, seed: int):
+        rng = random.Random(seed)
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        db = self.Session()
+
+        # 所有用户共用一个哈希，避免生成数据集时计算上千次bcrypt
+        self.password = "benchmark-password"
+        self.password_hash = security.get_password_hash(self.password)
+        self.user_ids = []
+        for i in range(users):
+            user = User(
+                email=f"bench{i}@example.com", username=f"bench{i}", hashed_password=self.password_hash,
+                full_name=f"Bench User {i}", given_name="Bench", family_name=f"User{i}",
+                nickname=f"b{i}", locale=rng.choice(["zh-CN", "en-US"]), email_verified=rng.random() < 0.8
+            )
+            db.add(user)
+            db.flush()
+            self.user_ids.append(user.id)
+
+        self.client_ids = []
+        for i in range(clients):
+            client_id = f"bench-client-{i}"
+            db.add(ClientApplication(
+                client_id=client_id, client_secret="secret", client_name=f"Bench {i}",
+                redirect_uris=json.dumps([REDIRECT_URI]), owner_id=self.user_ids[0]
+            ))
+            # 一半客户端默认允许所有用户，另一半只允许有单独授权的用户
+            group = ApplicationPermissionGroup(
+                client_id=client_id, default_allowed=i % 2 == 0, allowed_scopes=json.dumps(SCOPES)
+            )
+            db.add(group)
+            db.flush()
+            for user_id in rng.sample(self.user_ids, k=max(1, users // 10)):
+                db.add(UserApplicationAccess(
+                    user_id=user_id, client_id=client_id, permission_group_id=group.id,
+                    access_type=rng.choice(["allowed", "allowed", "denied"]),
+                    custom_scopes=json.dumps(["openid", "profile"]) if rng.random() < 0.3 else None
+                ))
+            self.client_ids.append(client_id)
+        db.commit()
+        db.close()
+
+        self.pairs = [(rng.choice(self.user_ids), rng.choice(self.client_ids)) for _ in range(1000)]
+
+
+def measure(func: Callable[[Any], Any], prepare: Optional[Callable[[], Any]],
+            rounds: int, min_time: float) -> Dict[str, float]:
+    """返回每次调用的耗时统计（微秒）；prepare 生成每次调用的参数，不计入耗时"""
+    def run_round(number: int) -> float:
+        args = [prepare() for _ in range(number)] if prepare else [None] * number
+        started = time.perf_counter()
+        for arg in args:
+            func(arg)
+        return time.perf_counter() - started
+
+    # 预热后按单次耗时校准每轮调用次数
+    run_round(1)
+    number = 1
+    while True:
+        elapsed = run_round(number)
+        if elapsed >= min_time / 10 or number >= 1_000_000:
+            break
+        number *= 10
+    number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+
+    per_call = [run_round(number) / number * 1e6 for _ in range(rounds)]
+    median = statistics.median(per_call)
+    return {
+        "median_us": round(median, 3),
+        "min_us": round(min(per_call), 3),
+        "stdev_us": round(statistics.stdev(per_call), 3) if rounds > 1 else 0.0,
+        "ops_per_sec": round(1e6 / median, 1),
+        "rounds": rounds,
+        "calls_per_round": number
+    }
+
+
+def build_benchmarks(data: Dataset) -> Dict[str, tuple]:
+    """名称 -> (被测函数, 生成参数的函数或None)"""
+    db = data.Session()
+    code_store = get_authorization_code_store()
+    user = db.get(User, data.user_ids[0])
+    user_data = {
+        "id": user.id, "username": user.username, "email": user.email, "full_name": user.full_name,
+        "given_name": user.given_name, "family_name": user.family_name, "nickname": user.nickname,
+        "email_verified": user.email_verified, "locale": user.locale
+    }
+    claims = {"sub": user.id, "client_id": data.client_ids[0], "scope": " ".join(SCOPES)}
+    access_token = security.create_access_token(claims)
+    code_verifier = base64.urlsafe_b64encode(os.urandom(32)).decode().rstrip("=")
+    code_challenge = base64.urlsafe_b64encode(hashlib.sha256(code_verifier.encode()).digest()).decode().rstrip("=")
+    pairs = itertools.cycle(data.pairs)
+
+    def issue_code():
+        user_id, client_id = next(pairs)
+        code = AuthorizationCodeData(
+            code=security.generate_authorization_code(), user_id=user_id, client_id=client_id,
+            redirect_uri=REDIRECT_URI, scope=" ".join(SCOPES),
+            expires_at=datetime.utcnow() + timedelta(minutes=10),
+            code_challenge=code_challenge, code_challenge_method="S256"
+        )
+        code_store.save(db, code)
+        return code
+
+    return {
+        "jwt.create_access_token": (lambda _: security.create_access_token(claims), None),
+        "jwt.create_refresh_token": (lambda _: security.create_refresh_token({"sub": user.id, "client_id": claims["client_id"]}), None),
+        "jwt.create_id_token": (lambda _: security.create_id_token(user_data, claims["client_id"], "nonce"), None),
+        "jwt.verify_token": (lambda _: security.verify_token(access_token), None),
+        "pkce.verify_s256": (lambda _: security.verify_pkce(code_verifier, code_challenge, "S256"), None),
+        "bcrypt.verify_password": (lambda _: security.verify_password(data.password, data.password_hash), None),
+        "permissions.check_user_access": (
+            lambda pair: PermissionManagementService.check_user_access(db, pair[0], pair[1], SCOPES),
+            lambda: next(pairs)
+        ),
+        "oauth.exchange_code_for_tokens": (
+            lambda code: OAuth2Service.exchange_code_for_tokens(
+                db, code.code, code.client_id, REDIRECT_URI, code_verifier=code_verifier
+            ),
+            issue_code
+        ),
+        "userinfo.get_user_info_claims": (lambda _: UserService.get_user_info_claims(user, SCOPES), None),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """打印与基线的对比，返回变慢超过阈值的项目"""
+    regressions = []
+    print(f"\n{'benchmark':<34} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"{name:<34} {'-':>12} {result['median_us']:>10.2f}us {'new':>9}")
+            continue
+        change = result["median_us"] / before["median_us"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<34} {before['median_us']:>10.2f}us {result['median_us']:>10.2f}us {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for security and OAuth hot paths")
+    parser.add_argument("--output", help="把结果写入JSON文件（可作为之后的 --baseline）")
+    parser.add_argument("--baseline", help="之前保存的结果，用于对比")
+    parser.add_argument("--threshold", type=float, default=0.15, help="中位数变慢超过该比例视为回退，默认0.15")
+    parser.add_argument("--filter", help="只运行名称包含该字符串的项目")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮的目标耗时（秒）")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    data = Dataset(args.users, args.clients, args.seed)
+    results = {}
+    print(f"{'benchmark':<34} {'median':>12} {'min':>12} {'ops/s':>12}")
+    for name, (func, prepare) in build_benchmarks(data).items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(func, prepare, args.rounds, args.min_time)
+        result = results[name]
+        print(f"{name:<34} {result['median_us']:>10.2f}us {result['min_us']:>10.2f}us {result['ops_per_sec']:>12.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "users": args.users,
+                    "clients": args.clients,
+                    "seed": args.seed
+                },
+                "benchmarks": results
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["benchmarks"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,10 +17,8 @@ function AuthorizeContent() {
   const [authRequest, setAuthRequest] = useState<AuthorizationRequest | null>(null);
   const [scopes, setScopes] = useState<string[]>([]);
   
-  // 从URL参数提取OAuth请求信息
-  const username = searchParams.get('username') || '';
-  const password = searchParams.get('password') || '';
-  const autoLogin = searchParams.get('auto_login') === 'true';
+  // 服务端签发的一次性同意票据，提交同意时必须带上
+  const consentToken = searchParams.get('consent_token');
 
   useEffect(() => {
     try {
@@ -28,7 +26,8 @@ function AuthorizeContent() {
       const clientId = searchParams.get('client_id');
       const redirectUri = searchParams.get('redirect_uri');
       
-      if (!responseType || !clientId || !redirectUri || !username || !password) {
+      // 用户由SSO会话或待同意句柄的cookie标识，URL中不包含用户名和密码
+      if (!responseType || !clientId || !redirectUri || !consentToken) {
         setError('缺少必要的授权参数');
         return;
       }
@@ -49,14 +48,7 @@ function AuthorizeContent() {
       
       // 获取客户端信息
       authApi.getClientInfo(clientId)
-        .then(client => {
-          setClientInfo(client);
-          
-          // 如果是自动登录（比如LAAA Dashboard），直接授权
-          if (autoLogin) {
-            handleAuthorize(true);
-          }
-        })
+        .then(setClientInfo)
         .catch(err => {
           console.error('Failed to fetch client info:', err);
           setError('无效的客户端应用');
@@ -64,7 +56,7 @@ function AuthorizeContent() {
     } catch (err) {
       setError('解析授权参数失败');
     }
-  }, [searchParams, username, password, autoLogin]);
+  }, [searchParams, consentToken]);
 
   const getScopeDescription = (scope: string): string => {
     const descriptions: Record<string, string> = {
@@ -90,8 +82,6 @@ function AuthorizeContent() {
     
     // 添加所有必需的表单字段
     const fields = {
-      username,
-      password,
       client_id: authRequest.client_id,
       redirect_uri: authRequest.redirect_uri,
       scope: authRequest.scope || 'openid',
@@ -100,6 +90,7 @@ function AuthorizeContent() {
       code_challenge_method: authRequest.code_challenge_method || '',
       nonce: authRequest.nonce || '',
       consent: consent.toString(),
+      consent_token: consentToken || '',
     };
 
     Object.entries(fields).forEach(([key, value]) => {
@@ -263,12 +254,6 @@ function AuthorizeContent() {
               {loading ? '处理中...' : '授权'}
             </button>
           </div>
-
-          <div className="mt-4 text-center">
-            <p className="text-xs text-gray-500">
-              作为 <span className="font-medium">{username}</span> 登录
-            </p>
-          </div>
         </div>
       </div>
     </div>
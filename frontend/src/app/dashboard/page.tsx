@@ -193,7 +193,13 @@ export default function DashboardPage() {
     }
   };
 
-  const logout = () => {
+  const logout = async () => {
+    // 同时结束服务端的SSO会话，否则之后的授权请求仍会以当前用户身份签发授权码
+    try {
+      await fetch('/oauth/logout', { method: 'POST', credentials: 'include' });
+    } catch (error) {
+      console.error('Failed to end SSO session:', error);
+    }
     document.cookie = 'access_token=; Max-Age=0; path=/';
     router.push('/login');
   };
@@ -1,13 +1,12 @@
 'use client';
 
 import { useState, useEffect } from 'react';
-import { useRouter, useSearchParams } from 'next/navigation';
+import { useSearchParams } from 'next/navigation';
 import { authApi } from '@/lib/api';
 import { ClientApplication, AuthorizationRequest } from '@/types';
 import Cookies from 'js-cookie';
 
 export default function LoginPage() {
-  const router = useRouter();
   const searchParams = useSearchParams();
   
   const [username, setUsername] = useState('');
@@ -55,36 +54,38 @@ export default function LoginPage() {
     setError('');
 
     try {
-      if (authRequest) {
-        // OAuth授权流程 - 重定向到授权同意页面
-        const params = new URLSearchParams({
-          ...Object.fromEntries(Object.entries(authRequest).filter(([_, v]) => v !== undefined)),
-          username,
-          password,
-        });
-        
-        router.push(`/authorize?${params.toString()}`);
-      } else {
-        // 仪表盘登录 - 使用OAuth授权流程
-        const dashboardClientId = process.env.NEXT_PUBLIC_LAAA_DASHBOARD_CLIENT_ID;
-        const redirectUri = `${window.location.origin}/callback`;
-        
-        const oauthParams = new URLSearchParams({
-          response_type: 'code',
-          client_id: dashboardClientId,
-          redirect_uri: redirectUri,
-          scope: 'openid profile email',
-          state: 'dashboard_login'
-        });
-        
-        // 添加登录信息作为查询参数，这样授权页面可以自动填充
-        oauthParams.append('username', username);
-        oauthParams.append('password', password);
-        oauthParams.append('auto_login', 'true');
-        
-        // 重定向到OAuth授权页面
-        window.location.href = `/oauth/authorize?${oauthParams.toString()}`;
-      }
+      // 仪表盘登录同样使用OAuth授权流程
+      const request: AuthorizationRequest = authRequest || {
+        response_type: 'code',
+        client_id: process.env.NEXT_PUBLIC_LAAA_DASHBOARD_CLIENT_ID || '',
+        redirect_uri: `${window.location.origin}/callback`,
+        scope: 'openid profile email',
+        state: 'dashboard_login',
+      };
+      
+      // 直接提交给授权端点，已同意过的作用域无需再经过同意页面
+      const form = document.createElement('form');
+      form.method = 'POST';
+      form.action = '/oauth/authorize';
+      
+      const fields: Record<string, string | undefined> = {
+        ...request,
+        username,
+        password,
+      };
+      
+      Object.entries(fields).forEach(([key, value]) => {
+        if (value && key !== 'response_type') {
+          const input = document.createElement('input');
+          input.type = 'hidden';
+          input.name = key;
+          input.value = value;
+          form.appendChild(input);
+        }
+      });
+      
+      document.body.appendChild(form);
+      form.submit();
     } catch (err: any) {
       setError(err.response?.data?.detail || '登录失败，请检查用户名和密码');
     } finally {
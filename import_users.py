@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+批量导入用户 - 从CSV或NDJSON文件导入用户
+
+    python import_users.py users.csv
+    python import_users.py users.ndjson --batch-size 2000 --workers 8
+
+每行需要 username、email，以及 password（明文）或 password_hash（旧系统的bcrypt/pbkdf2_sha256/sha512_crypt哈希）。
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import SessionLocal
+from app.services.bulk_import_service import BulkUserImporter, read_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入用户")
+    parser.add_argument("path", help="CSV 或 NDJSON 文件路径")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="文件格式，默认按扩展名判断")
+    parser.add_argument("--batch-size", type=int, help="每批写入的行数")
+    parser.add_argument("--workers", type=int, help="密码哈希进程数，1 表示不使用进程池")
+    args = parser.parse_args()
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            report = BulkUserImporter(db, args.batch_size, args.workers).run(read_rows(stream, fmt))
+    finally:
+        db.close()
+
+    result = report.to_dict()
+    print(f"共 {result['total']} 行：成功 {result['created']}，重复 {result['duplicates']}，失败 {result['failed']}")
+    for error in result["errors"]:
+        details = " ".join(f"{key}={value}" for key, value in error.items() if key not in ("row", "error"))
+        print(f"  第 {error['row']} 行: {error['error']} {details}".rstrip())
+
+
+if __name__ == "__main__":
+    main()
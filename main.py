@@ -1,25 +1,27 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.exc import SQLAlchemyError
 from app.core.config import settings
-from app.core.database import Base, engine
+from app.core.database import Base, engine, SessionLocal
 from app.api.v1 import router as api_router
-from app.api.v1.oauth import router as oauth_router
+from app.api.v1.oauth import router as oauth_router, openid_configuration
 from app.api.v1.permissions import router as permissions_router
 from app.api.v1.dashboard import router as dashboard_router
+from app.services.access_expiry_service import access_expiry_scheduler
+from app.core.discovery import refresh_discovery_document
+from app.core.static_assets import StaticAssetIndex
+from app.core.metrics import MetricsMiddleware, metrics, worker_snapshots
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.tracing import TracingMiddleware
 import logging
 import os
+import secrets
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# 创建数据库表
-Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="OAuth 2.0 / OIDC Authorization Server",
     description="A complete OAuth 2.0 and OpenID Connect implementation using FastAPI",
@@ -37,70 +39,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 按采样率记录bcrypt、JWT、权限检查等阶段的耗时
+app.add_middleware(TracingMiddleware)
+
+# 按请求统计SQL语句数量和耗时
+if settings.query_stats_enabled:
+    app.add_middleware(QueryStatsMiddleware)
+
+# 请求延迟指标（最外层，包含其它中间件的耗时）
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # 包含路由
 app.include_router(oauth_router)
 app.include_router(api_router)
 app.include_router(permissions_router)
 app.include_router(dashboard_router)
 
+# 标准位置的发现文档：{issuer}/.well-known/openid-configuration
+app.add_api_route("/.well-known/openid-configuration", openid_configuration, include_in_schema=False)
+
 # 静态文件服务
 static_dir = os.path.join(os.path.dirname(__file__), "frontend", "dist")
 if os.path.exists(static_dir):
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+    static_assets = StaticAssetIndex(static_dir)
+
+    @app.on_event("startup")
+    async def load_static_assets():
+        # serve.py 会在fork之前加载，worker之间共享同一份内存
+        if not static_assets.loaded:
+            static_assets.load()
+
+    @app.get("/static/{file_path:path}")
+    async def serve_static(request: Request, file_path: str):
+        return static_assets.response(request, file_path)
     
     @app.get("/login")
-    async def serve_login():
-        return FileResponse(os.path.join(static_dir, "login", "index.html"))
+    async def serve_login(request: Request):
+        return static_assets.response(request, "login")
     
     @app.get("/register")
-    async def serve_register():
-        return FileResponse(os.path.join(static_dir, "register", "index.html"))
+    async def serve_register(request: Request):
+        return static_assets.response(request, "register")
     
     @app.get("/authorize")
-    async def serve_authorize():
-        return FileResponse(os.path.join(static_dir, "authorize", "index.html"))
+    async def serve_authorize(request: Request):
+        return static_assets.response(request, "authorize")
     
     @app.get("/callback")
     @app.post("/callback")
-    async def serve_callback():
-        return FileResponse(os.path.join(static_dir, "callback", "index.html"))
+    async def serve_callback(request: Request):
+        return static_assets.response(request, "callback")
     
     @app.get("/permission-request")
-    async def serve_permission_request():
-        return FileResponse(os.path.join(static_dir, "permission-request", "index.html"))
+    async def serve_permission_request(request: Request):
+        return static_assets.response(request, "permission-request")
     
     @app.get("/dashboard")
-    async def serve_dashboard():
-        return FileResponse(os.path.join(static_dir, "dashboard", "index.html"))
+    async def serve_dashboard(request: Request):
+        return static_assets.response(request, "dashboard")
     
     @app.get("/admin/dashboard")
-    async def serve_admin_dashboard():
-        return FileResponse(os.path.join(static_dir, "admin", "dashboard", "index.html"))
+    async def serve_admin_dashboard(request: Request):
+        return static_assets.response(request, "admin/dashboard")
     
     @app.get("/admin/permissions")
-    async def serve_admin_permissions():
-        return FileResponse(os.path.join(static_dir, "admin", "permissions", "index.html"))
+    async def serve_admin_permissions(request: Request):
+        return static_assets.response(request, "admin/permissions")
     
     @app.get("/admin/users")
-    async def serve_admin_users():
-        return FileResponse(os.path.join(static_dir, "admin", "users", "index.html"))
+    async def serve_admin_users(request: Request):
+        return static_assets.response(request, "admin/users")
     
     @app.get("/admin/applications")
-    async def serve_admin_applications():
-        return FileResponse(os.path.join(static_dir, "admin", "applications", "index.html"))
+    async def serve_admin_applications(request: Request):
+        return static_assets.response(request, "admin/applications")
     
-    # 前端静态资源
+    # 前端静态资源（带内容哈希，长期缓存）
     @app.get("/_next/{file_path:path}")
-    async def serve_next_assets(file_path: str):
-        asset_path = os.path.join(static_dir, "_next", file_path)
-        if os.path.exists(asset_path):
-            return FileResponse(asset_path)
-        return {"error": "Not found"}, 404
+    async def serve_next_assets(request: Request, file_path: str):
+        return static_assets.response(request, f"_next/{file_path}")
     
     # 根路径服务前端
     @app.get("/")
-    async def serve_frontend():
-        return FileResponse(os.path.join(static_dir, "index.html"))
+    async def serve_frontend(request: Request):
+        return static_assets.response(request, "")
     
     logger.info(f"Frontend static files served from: {static_dir}")
 else:
@@ -133,6 +156,51 @@ async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     )
 
 
+@app.on_event("startup")
+async def create_tables():
+    # 每个worker启动时都会检查全部表；表结构由Alembic管理时可以关闭
+    if settings.auto_create_tables:
+        from app.core.migrations import upgrade_schema
+        Base.metadata.create_all(bind=engine)
+        # 已有的表补上新增的列、约束和索引
+        upgrade_schema(engine)
+    else:
+        logger.info("AUTO_CREATE_TABLES disabled, skipping schema creation")
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    refresh_discovery_document()
+    if settings.access_expiry_scheduler_enabled:
+        access_expiry_scheduler.start(SessionLocal)
+    if settings.metrics_enabled and settings.metrics_dir:
+        worker_snapshots.start(settings.metrics_dir, settings.metrics_snapshot_interval_seconds)
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    access_expiry_scheduler.stop()
+    worker_snapshots.stop()
+
+
+if settings.metrics_enabled:
+    if not settings.metrics_token:
+        logger.warning("METRICS_TOKEN is not set, /metrics is disabled")
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics(request: Request):
+        """Prometheus文本格式的指标，多worker时合并所有worker的快照"""
+        # 指标包含路由、登录结果等运行信息，未配置令牌时不对外提供
+        if not settings.metrics_token:
+            return PlainTextResponse("Not Found", status_code=404)
+        expected = f"Bearer {settings.metrics_token}"
+        if not secrets.compare_digest(request.headers.get("authorization", ""), expected):
+            return PlainTextResponse("Unauthorized", status_code=401)
+        return PlainTextResponse(
+            metrics.render(worker_snapshots.peers()), media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
 @app.get("/health")
 async def health_check():
     """健康检查端点"""
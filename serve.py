@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+生产环境启动器 - 预加载应用后fork多个uvicorn worker，共享同一个监听socket
+
+    python serve.py
+    python serve.py --workers 8 --port 8000 --limit-concurrency 1000
+
+默认只启动一个worker。SSO会话、待同意句柄、限流和授权码存储为memory时状态只在单个进程内有效，
+多worker需要把这些后端配置为redis，否则拒绝启动。
+主进程在fork之前完成导入、建表、静态资源索引和JWT/bcrypt后端的初始化，
+worker通过写时复制共享这些内存；收到SIGTERM后转发给所有worker，
+worker停止接受新连接并在 --graceful-timeout 内处理完已有请求后退出。
+"""
+
+import argparse
+import importlib.util
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import uvicorn
+from app.core.config import settings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("serve")
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """由主进程创建监听socket，所有worker在同一个socket上accept"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def per_process_state() -> list:
+    """返回仍使用进程内存储、多worker时各自独立的配置项"""
+    problems = []
+    if settings.sso_session_enabled and settings.sso_session_backend != "redis":
+        problems.append("SSO_SESSION_BACKEND（SSO会话和待同意句柄）")
+    if settings.rate_limit_enabled and settings.rate_limit_backend != "redis":
+        problems.append("RATE_LIMIT_BACKEND")
+    if settings.authorization_code_store == "memory":
+        problems.append("AUTHORIZATION_CODE_STORE")
+    return problems
+
+
+def preload():
+    """在fork之前完成导入和预热，返回ASGI应用"""
+    import main
+    from app.core.database import Base, engine
+    from app.core.discovery import refresh_discovery_document
+    from app.core.security import security
+
+    if settings.auto_create_tables:
+        from app.core.migrations import upgrade_schema
+        Base.metadata.create_all(bind=engine)
+        upgrade_schema(engine)
+    refresh_discovery_document()
+    static_assets = getattr(main, "static_assets", None)
+    if static_assets is not None:
+        static_assets.load()
+
+    # JWT和bcrypt后端在第一次使用时才初始化，提前完成避免第一个请求承担这部分开销
+    security.verify_token(security.create_access_token({"sub": "preload"}))
+    security.verify_password("preload", security.get_password_hash("preload"))
+
+    # 连接不能跨进程共享，fork之前关闭连接池
+    engine.dispose()
+    return main.app
+
+
+def run_worker(app, sock: socket.socket, args, index: int) -> None:
+    """worker进程：在继承的socket上运行uvicorn，SIGTERM/SIGINT时优雅退出"""
+    # 脱离主进程的进程组，终端的Ctrl+C只由主进程转发一次
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # 表已经由主进程创建；授权过期调度器只需要在一个worker中运行
+    settings.auto_create_tables = False
+    if index != 0:
+        settings.access_expiry_scheduler_enabled = False
+
+    config = uvicorn.Config(
+        app,
+        loop="uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        http="httptools" if importlib.util.find_spec("httptools") else "h11",
+        lifespan="on",
+        backlog=args.backlog,
+        limit_concurrency=args.limit_concurrency,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=args.proxy_headers,
+        access_log=args.access_log,
+        log_level=args.log_level
+    )
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多worker生产环境启动器")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.server_workers or 1)
+    parser.add_argument("--backlog", type=int, default=settings.server_backlog)
+    parser.add_argument("--limit-concurrency", type=int, default=settings.server_limit_concurrency,
+                        help="每个worker同时处理的连接上限，超出时返回503")
+    parser.add_argument("--keep-alive", type=int, default=5, help="空闲keep-alive连接的超时时间（秒）")
+    parser.add_argument("--graceful-timeout", type=int, default=settings.server_graceful_timeout_seconds,
+                        help="收到SIGTERM后等待处理中请求完成的时间（秒）")
+    parser.add_argument("--proxy-headers", action="store_true", help="信任反向代理的 X-Forwarded-* 头")
+    parser.add_argument("--access-log", action="store_true")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        problems = per_process_state()
+        if problems:
+            logger.error(
+                f"Refusing to start {args.workers} workers: {', '.join(problems)} keep state in each worker's "
+                "memory, so sessions, consent and limits would depend on which worker serves a request. "
+                "Configure the redis backends or run a single worker."
+            )
+            sys.exit(2)
+        if settings.login_throttle_enabled:
+            logger.warning(
+                f"Login throttling is tracked per worker: up to {args.workers}x the configured failures "
+                "are allowed before a lockout"
+            )
+
+    # worker之间通过共享目录交换指标快照，抓取任意一个worker都能得到全部worker的样本
+    metrics_dir = None
+    if args.workers > 1 and settings.metrics_enabled and not settings.metrics_dir:
+        metrics_dir = settings.metrics_dir = tempfile.mkdtemp(prefix="laaa-metrics-")
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    started = time.perf_counter()
+    app = preload()
+    logger.info(f"Preloaded application in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    if not hasattr(os, "fork"):
+        logger.warning("os.fork is not available on this platform, running a single worker")
+        run_worker(app, sock, args, 0)
+        return
+
+    workers = {}  # pid -> worker编号
+    stopping = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker(app, sock, args, index)
+            except BaseException:
+                logger.exception(f"Worker {index} crashed")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        workers[pid] = index
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info(f"Received {signal.Signals(signum).name}, draining {len(workers)} workers")
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # 超过优雅退出时间仍未结束的worker强制终止
+        signal.alarm(args.graceful_timeout + 5)
+
+    def force_kill(signum, frame):
+        for pid in list(workers):
+            logger.warning(f"Worker {pid} did not exit in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    for index in range(args.workers):
+        spawn(index)
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGALRM, force_kill)
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} workers (backlog={args.backlog})")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        if index is None or stopping:
+            continue
+        # worker意外退出时重新启动，避免崩溃循环占满CPU
+        logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+        time.sleep(1)
+        if not stopping:
+            spawn(index)
+
+    sock.close()
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,4 +21,4 @@ alembic upgrade head
 
 # 启动服务器
 echo "Starting server..."
-python main.py
\ No newline at end of file
+python serve.py
\ No newline at end of file